@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmarks of the database side of the tools: loading an export, creating
+the registered views and unloading them, on synthetic export folders of
+1M, 10M or 100M course_progress rows. Against a local Postgres that
+accepts the postgres user without a password:
+
+    python benchmarks/database.py --rows 1M,10M --host 127.0.0.1 --port 5432
+
+or, to include container initialization, through docker as
+`containers create` does:
+
+    python benchmarks/database.py --rows 1M --docker
+
+Results use the format of run.py, so `run.py compare` works on them too.
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+from run import result, save_results
+
+# rows of each table per course_progress row
+TABLE_SCALE = [
+    ('course_progress', 1.0),
+    ('course_memberships', 0.1),
+    ('users', 0.05),
+    ('course_grades', 0.02),
+    ('users_courses__certificate_payments', 0.01),
+    ('demographics_answers', 0.15),
+]
+COURSE_COUNT = 20
+DEMOGRAPHICS_QUESTIONS = range(11, 26)
+CHOICES_PER_QUESTION = 10
+USER_ID_COLUMN = 'benchmark_user_id'
+VIEWS = ['enrollments', 'demographic_survey']
+UNLOADED_RELATIONS = VIEWS + ['course_progress']
+COMPLETE_MARKER = '.complete'
+COUNT_UNITS = {'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9}
+
+SETUP_SQL = """
+CREATE TABLE users (
+    {user_id} VARCHAR NOT NULL,
+    country_cd VARCHAR(2),
+    user_join_ts TIMESTAMP
+);
+CREATE TABLE course_memberships (
+    {user_id} VARCHAR NOT NULL,
+    course_id VARCHAR NOT NULL,
+    course_membership_role VARCHAR,
+    course_membership_ts TIMESTAMP
+);
+CREATE TABLE course_progress (
+    course_id VARCHAR NOT NULL,
+    course_item_id VARCHAR NOT NULL,
+    {user_id} VARCHAR NOT NULL,
+    course_progress_state_type_id INT,
+    course_progress_ts TIMESTAMP
+);
+CREATE TABLE course_grades (
+    course_id VARCHAR NOT NULL,
+    {user_id} VARCHAR NOT NULL,
+    course_passing_state_id INT,
+    course_grade_overall_passed_items INT,
+    course_grade_overall FLOAT,
+    course_grade_verified FLOAT,
+    course_grade_ts TIMESTAMP
+);
+CREATE TABLE users_courses__certificate_payments (
+    {user_id} VARCHAR NOT NULL,
+    course_id VARCHAR NOT NULL,
+    met_payment_condition BOOL,
+    was_payment BOOL,
+    was_finaid_grant BOOL,
+    was_group_sponsored BOOL
+);
+CREATE TABLE demographics_questions (
+    question_id INT NOT NULL,
+    question_type VARCHAR,
+    question_desc VARCHAR
+);
+CREATE TABLE demographics_choices (
+    question_id INT NOT NULL,
+    choice_id INT NOT NULL,
+    choice_desc VARCHAR
+);
+CREATE TABLE demographics_answers (
+    question_id INT NOT NULL,
+    {user_id} VARCHAR NOT NULL,
+    submission_ts TIMESTAMP,
+    choice_id INT,
+    answer_int INT
+);
+""".format(user_id=USER_ID_COLUMN)
+
+LOAD_TABLES = [table for table, _ in TABLE_SCALE] + [
+    'demographics_questions', 'demographics_choices']
+
+
+def parse_count(count_string):
+    """
+    :param count_string: a number, optionally suffixed with K, M or G
+    :return count:
+    """
+    unit = COUNT_UNITS.get(count_string[-1:].upper())
+    if unit:
+        return int(float(count_string[:-1]) * unit)
+    return int(count_string)
+
+
+def table_rows(rows):
+    """
+    :param rows: course_progress rows
+    :return table_rows: {table: rows}
+    """
+    return dict((table, max(1, int(rows * scale)))
+                for table, scale in TABLE_SCALE)
+
+
+def generate_export(folder, rows, seed=0):
+    """
+    Write a synthetic tables export to folder: setup.sql, load.sql and a
+    csv file per table, shaped like the course_progress, course_memberships
+    and related tables the registered views read. A folder generated before
+    for the same number of rows is reused.
+    :param folder:
+    :param rows: course_progress rows; other tables are scaled from it
+    :param seed:
+    :return folder:
+    """
+    if os.path.exists(os.path.join(folder, COMPLETE_MARKER)):
+        return folder
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    logging.info('Generating {} rows of export data in {}'.format(
+        rows, folder))
+    rng = random.Random(seed)
+    counts = table_rows(rows)
+    users = ['{:016x}'.format(rng.getrandbits(64))
+             for _ in range(counts['users'])]
+    courses = ['course-{:02d}'.format(i) for i in range(COURSE_COUNT)]
+    timestamps = ['2016-{:02d}-{:02d} {:02d}:{:02d}:00'.format(
+        rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+        rng.randint(0, 59)) for _ in range(10000)]
+
+    def pick(values):
+        return values[int(rng.random() * len(values))]
+
+    def write(table, header, make_row, count):
+        with open(os.path.join(folder, table + '.csv'), 'w') as f:
+            f.write(','.join(header) + '\n')
+            for index in xrange(count):
+                f.write(','.join(make_row(index)) + '\n')
+
+    write('users', [USER_ID_COLUMN, 'country_cd', 'user_join_ts'],
+          lambda i: (users[i], pick(['US', 'IN', 'CN', 'BR']),
+                     pick(timestamps)),
+          counts['users'])
+    write('course_memberships',
+          [USER_ID_COLUMN, 'course_id', 'course_membership_role',
+           'course_membership_ts'],
+          lambda i: (pick(users), pick(courses),
+                     pick(['LEARNER', 'LEARNER', 'PRE_ENROLLED_LEARNER',
+                           'NOT_ENROLLED']),
+                     pick(timestamps)),
+          counts['course_memberships'])
+    write('course_progress',
+          ['course_id', 'course_item_id', USER_ID_COLUMN,
+           'course_progress_state_type_id', 'course_progress_ts'],
+          lambda i: (pick(courses), 'item{:03d}'.format(i % 200),
+                     pick(users), pick(['1', '2']), pick(timestamps)),
+          counts['course_progress'])
+    write('course_grades',
+          ['course_id', USER_ID_COLUMN, 'course_passing_state_id',
+           'course_grade_overall_passed_items', 'course_grade_overall',
+           'course_grade_verified', 'course_grade_ts'],
+          lambda i: (pick(courses), pick(users), pick(['0', '1', '2']),
+                     str(i % 40), '{:.2f}'.format(rng.random()),
+                     '{:.2f}'.format(rng.random()), pick(timestamps)),
+          counts['course_grades'])
+    write('users_courses__certificate_payments',
+          [USER_ID_COLUMN, 'course_id', 'met_payment_condition',
+           'was_payment', 'was_finaid_grant', 'was_group_sponsored'],
+          lambda i: (pick(users), pick(courses), pick(['t', 'f']),
+                     pick(['t', 'f']), pick(['t', 'f']), 'f'),
+          counts['users_courses__certificate_payments'])
+    write('demographics_questions',
+          ['question_id', 'question_type', 'question_desc'],
+          lambda i: (str(DEMOGRAPHICS_QUESTIONS[i]), 'MULTIPLE_CHOICE',
+                     'question {}'.format(DEMOGRAPHICS_QUESTIONS[i])),
+          len(DEMOGRAPHICS_QUESTIONS))
+    write('demographics_choices',
+          ['question_id', 'choice_id', 'choice_desc'],
+          lambda i: (str(DEMOGRAPHICS_QUESTIONS[i // CHOICES_PER_QUESTION]),
+                     str(i % CHOICES_PER_QUESTION),
+                     'choice {}'.format(i % CHOICES_PER_QUESTION)),
+          len(DEMOGRAPHICS_QUESTIONS) * CHOICES_PER_QUESTION)
+    write('demographics_answers',
+          ['question_id', USER_ID_COLUMN, 'submission_ts', 'choice_id',
+           'answer_int'],
+          lambda i: (str(pick(DEMOGRAPHICS_QUESTIONS)), pick(users),
+                     pick(timestamps),
+                     str(int(rng.random() * CHOICES_PER_QUESTION)),
+                     str(rng.randint(1940, 2000))),
+          counts['demographics_answers'])
+
+    with open(os.path.join(folder, 'setup.sql'), 'w') as f:
+        f.write(SETUP_SQL)
+    with open(os.path.join(folder, 'load.sql'), 'w') as f:
+        for table in LOAD_TABLES:
+            f.write("\\copy {table} FROM '{table}.csv' WITH CSV HEADER\n"
+                    .format(table=table))
+    open(os.path.join(folder, COMPLETE_MARKER), 'w').close()
+    return folder
+
+
+class LocalDatabase(object):
+    """
+    Database on a running Postgres server, loaded with psql the way the
+    container entrypoint script loads it.
+    """
+
+    def __init__(self, host, port, name):
+        self.host = host
+        self.port = port
+        self.name = name
+
+    def _run(self, command, cwd=None):
+        subprocess.check_call(
+            command + ['-h', self.host, '-p', str(self.port),
+                       '-U', 'postgres'],
+            cwd=cwd)
+
+    def create(self):
+        self._run(['dropdb', '--if-exists', self.name])
+        self._run(['createdb', self.name])
+
+    def load(self, folder):
+        for script in ['setup.sql', 'load.sql']:
+            self._run(['psql', '-q', '-v', 'ON_ERROR_STOP=1',
+                       '-d', self.name, '-f', script], cwd=folder)
+
+    def export_db(self):
+        from courseraresearchexports.models.ExportDb import ExportDb
+        return ExportDb(host_ip=self.host, host_port=self.port, db=self.name)
+
+    def remove(self):
+        self._run(['dropdb', '--if-exists', self.name])
+
+
+def create_registered_view(export_db, view_name):
+    """
+    The steps of db.create_registered_view on an ExportDb.
+    """
+    import pkg_resources
+    from courseraresearchexports.db import db
+
+    sql_text = pkg_resources.resource_string(
+        'courseraresearchexports', 'sql/{}.sql'.format(view_name))
+    export_db.create_view(
+        view_name, db.replace_user_id_placeholders(export_db, sql_text))
+
+
+def time_views_and_unloads(export_db, runs, unload_folder):
+    """
+    Create the registered views and unload them and a table, adding the
+    seconds of each step to runs.
+    :return rowcounts: {relation: rows}
+    """
+    for view in VIEWS:
+        started_at = time.time()
+        create_registered_view(export_db, view)
+        runs['create_view_' + view].append(time.time() - started_at)
+
+    rowcounts = {}
+    for relation in UNLOADED_RELATIONS:
+        started_at = time.time()
+        rowcounts[relation] = export_db.unload_relation(
+            relation, os.path.join(unload_folder, relation + '.csv'))
+        runs['unload_' + relation].append(time.time() - started_at)
+    return rowcounts
+
+
+def benchmark_local(folder, rows, args, runs):
+    database = LocalDatabase(args.host, args.port,
+                             'benchmark_{}'.format(rows))
+    unload_folder = tempfile.mkdtemp()
+    try:
+        database.create()
+        started_at = time.time()
+        database.load(folder)
+        runs['load'].append(time.time() - started_at)
+        return time_views_and_unloads(database.export_db(), runs,
+                                      unload_folder)
+    finally:
+        shutil.rmtree(unload_folder, ignore_errors=True)
+        database.remove()
+
+
+def benchmark_docker(folder, rows, args, runs):
+    from courseraresearchexports.containers import client
+    from courseraresearchexports.containers import utils as container_utils
+    from courseraresearchexports.models.ExportDb import ExportDb
+
+    docker_client = container_utils.docker_client(args.docker_url)
+    container_name = 'benchmark-{}'.format(rows)
+    unload_folder = tempfile.mkdtemp()
+    try:
+        started_at = time.time()
+        container_id = client.create_from_folder(
+            os.path.abspath(folder), docker_client,
+            container_name=container_name, database_name='benchmark')
+        runs['container_init'].append(time.time() - started_at)
+        # ContainerInfo reads the mapped port from the running container
+        return time_views_and_unloads(
+            ExportDb.from_container(container_id, docker_client), runs,
+            unload_folder)
+    finally:
+        shutil.rmtree(unload_folder, ignore_errors=True)
+        for container in docker_client.containers(
+                all=True, filters={'name': container_name}):
+            docker_client.stop(container)
+            docker_client.remove_container(container)
+
+
+def benchmark(args):
+    results = []
+    for rows in args.rows:
+        folder = generate_export(
+            os.path.join(args.data_dir, 'rows-{}'.format(rows)), rows)
+        counts = table_rows(rows)
+        runs = dict((step, []) for step in
+                    ['load', 'container_init'] +
+                    ['create_view_' + view for view in VIEWS] +
+                    ['unload_' + relation for relation in UNLOADED_RELATIONS])
+        rowcounts = {}
+        for _ in range(args.repeat):
+            if args.docker:
+                rowcounts = benchmark_docker(folder, rows, args, runs)
+            else:
+                rowcounts = benchmark_local(folder, rows, args, runs)
+
+        params = {'rows': rows, 'docker': args.docker}
+        loaded_rows = sum(counts.values())
+        for step, step_runs in sorted(runs.items()):
+            if not step_runs:
+                continue
+            if step in ('load', 'container_init'):
+                count = loaded_rows
+            elif step.startswith('unload_'):
+                count = rowcounts.get(step[len('unload_'):])
+            else:
+                count = None
+            results.append(result(step, params, step_runs, count=count,
+                                  unit='rows'))
+
+    save_results(args.output, results)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading, view creation and unloading of '
+        'synthetic research exports.')
+    parser.add_argument(
+        '--rows', type=lambda value: [parse_count(count)
+                                      for count in value.split(',')],
+        default=[10 ** 6],
+        help='Comma separated course_progress row counts, e.g. 1M,10M,100M.')
+    parser.add_argument(
+        '--data-dir', default=os.path.join(tempfile.gettempdir(),
+                                           'courseraresearchexports-bench'),
+        help='Folder the generated exports are kept in between runs.')
+    parser.add_argument(
+        '--output', default='benchmark_results.jsonl',
+        help='JSON lines file the results are appended to.')
+    parser.add_argument(
+        '--repeat', type=int, default=1,
+        help='Runs of each benchmark; the median is reported.')
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='Host of the local Postgres server.')
+    parser.add_argument(
+        '--port', type=int, default=5432,
+        help='Port of the local Postgres server.')
+    parser.add_argument(
+        '--docker', action='store_true',
+        help='Load the exports into docker containers instead, timing '
+        'container initialization.')
+    parser.add_argument(
+        '--docker-url',
+        help='The url of the docker demon.')
+    return parser
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    benchmark(build_parser().parse_args())
+
+
+if __name__ == '__main__':
+    main()
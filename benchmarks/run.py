@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Offline benchmarks of export downloads, job listing and scope lookups,
+run against the local stand-in API and CDN in standin.py. Results are
+appended to a JSON lines file, one object per benchmark, and two result
+files can be compared:
+
+    python benchmarks/run.py --output after.jsonl --archive-size 2G
+    python benchmarks/run.py compare before.jsonl after.jsonl
+"""
+
+from __future__ import print_function
+
+import argparse
+from datetime import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from standin import COURSE_COUNT, StandIn, course_id
+
+# run from a checkout without installing the package
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(size_string):
+    """
+    :param size_string: bytes, optionally suffixed with K, M or G
+    :return size: bytes
+    """
+    unit = SIZE_UNITS.get(size_string[-1:].upper())
+    if unit:
+        return int(float(size_string[:-1]) * unit)
+    return int(size_string)
+
+
+def parse_int_list(list_string):
+    return [int(value) for value in list_string.split(',')]
+
+
+def timed_runs(func, repeat, setup=None, teardown=None):
+    """
+    Time repeat calls of func, calling setup and teardown around each one
+    outside of the measurement.
+    :return seconds: [float]
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started_at = time.time()
+        try:
+            func()
+            runs.append(time.time() - started_at)
+        finally:
+            if teardown:
+                teardown()
+    return runs
+
+
+def result(name, params, runs, count=None, unit=None):
+    """
+    Summarize the runs of one benchmark.
+    :param name:
+    :param params: settings that must match for results to be compared
+    :param runs: seconds of each run
+    :param count: units of work per run, e.g. bytes or requests
+    :param unit: name of the unit, reported as UNIT_per_second
+    """
+    runs = sorted(runs)
+    median = runs[len(runs) // 2]
+    summary = {'benchmark': name, 'params': params, 'runs': runs,
+               'min': runs[0], 'median': median}
+    if count is not None and median > 0:
+        summary['{}_per_second'.format(unit)] = count / median
+    return summary
+
+
+def run_benchmarks(standin, args):
+    """
+    :return results: [dict]
+    """
+    # imported here so that the package picks up the stand-in's
+    # COURSERA_API_ROOT
+    from courseraresearchexports.exports import api, utils
+    from courseraresearchexports.models import utils as model_utils
+    from courseraresearchexports.models.ApiClient import ApiClient
+    from courseraresearchexports.models.ExportRequestWithMetadata import \
+        ExportRequestWithMetadata
+    from courseraresearchexports.models.JobIndex import JobIndex
+    from courseraresearchexports.models.LookupCache import LookupCache
+
+    ApiClient.configure(auth=lambda request: request)
+    LookupCache.configure(filename=None)
+    work_folder = tempfile.mkdtemp()
+    JobIndex.configure(filename=os.path.join(work_folder, 'jobs.sqlite'))
+    dest = os.path.join(work_folder, 'dest')
+
+    def clear_dest():
+        shutil.rmtree(dest, ignore_errors=True)
+
+    def reset_job_index():
+        JobIndex.configure(filename=os.path.join(
+            work_folder, 'jobs-{}.sqlite'.format(time.time())))
+
+    results = []
+    try:
+        tables_job = ExportRequestWithMetadata.from_json(standin.job(0))
+        for segments in args.segments:
+            runs = timed_runs(
+                lambda: utils.download(tables_job, dest, segments=segments,
+                                       use_cache=False),
+                args.repeat, teardown=clear_dest)
+            results.append(result(
+                'download_tables',
+                {'archive_size': standin.archive_size, 'segments': segments},
+                runs, count=standin.archive_size, unit='bytes'))
+
+        clickstream_job = ExportRequestWithMetadata.from_json(standin.job(1))
+        total_size = standin.clickstream_days * standin.clickstream_file_size
+        for parallel in args.parallel:
+            runs = timed_runs(
+                lambda: utils.download(clickstream_job, dest,
+                                       parallel=parallel, use_cache=False),
+                args.repeat, teardown=clear_dest)
+            results.append(result(
+                'download_clickstream',
+                {'days': standin.clickstream_days,
+                 'file_size': standin.clickstream_file_size,
+                 'parallel': parallel},
+                runs, count=total_size, unit='bytes'))
+
+        runs = timed_runs(api.get_all, args.repeat)
+        results.append(result('get_all', {'jobs': standin.jobs}, runs,
+                              count=1, unit='calls'))
+
+        runs = timed_runs(lambda: list(api.iter_all()), args.repeat)
+        results.append(result('iter_all', {'jobs': standin.jobs}, runs,
+                              count=standin.jobs, unit='jobs'))
+
+        job_ids = [standin.job(index)['id']
+                   for index in range(min(standin.jobs, args.lookups))]
+        runs = timed_runs(lambda: [api.get(job_id) for job_id in job_ids],
+                          args.repeat, setup=reset_job_index)
+        results.append(result('get_uncached', {'jobs': len(job_ids)}, runs,
+                              count=len(job_ids), unit='calls'))
+        runs = timed_runs(lambda: [api.get(job_id) for job_id in job_ids],
+                          args.repeat)
+        results.append(result('get_cached', {'jobs': len(job_ids)}, runs,
+                              count=len(job_ids), unit='calls'))
+
+        course_ids = [course_id(index) for index in range(COURSE_COUNT)]
+
+        def reset_lookup_cache():
+            LookupCache.configure(filename=None)
+
+        runs = timed_runs(
+            lambda: [model_utils.lookup_course_slug_by_id(course)
+                     for course in course_ids],
+            args.repeat, setup=reset_lookup_cache)
+        results.append(result('lookup_course_slug_by_id',
+                              {'courses': len(course_ids)}, runs,
+                              count=len(course_ids), unit='lookups'))
+        runs = timed_runs(
+            lambda: [model_utils.lookup_course_slug_by_id(course)
+                     for course in course_ids],
+            args.repeat)
+        results.append(result('lookup_course_slug_by_id_cached',
+                              {'courses': len(course_ids)}, runs,
+                              count=len(course_ids), unit='lookups'))
+
+        export_requests = [ExportRequestWithMetadata.from_json(
+            standin.job(index)) for index in range(standin.jobs)]
+        runs = timed_runs(
+            lambda: model_utils.resolve_scope_names(export_requests),
+            args.repeat, setup=reset_lookup_cache)
+        results.append(result('resolve_scope_names',
+                              {'jobs': len(export_requests)}, runs,
+                              count=len(export_requests), unit='jobs'))
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    return results
+
+
+def environment(**settings):
+    """
+    Settings shared by every result of a run.
+    :param settings: benchmark settings recorded with each result
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.STDOUT).decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    context = {'commit': commit,
+               'python': platform.python_version(),
+               'recorded_at': datetime.utcnow().isoformat()}
+    context.update(settings)
+    return context
+
+
+def save_results(filename, results, **settings):
+    """
+    Append results to a JSON lines file and print them.
+    :param filename:
+    :param results: [dict]
+    :param settings: see environment
+    """
+    context = environment(**settings)
+    with open(filename, 'a') as f:
+        for summary in results:
+            summary.update(context)
+            f.write(json.dumps(summary, sort_keys=True) + '\n')
+    print_results(results)
+
+
+def benchmark(args):
+    standin = StandIn(jobs=args.jobs, archive_size=args.archive_size,
+                      clickstream_days=args.clickstream_days,
+                      clickstream_file_size=args.clickstream_file_size,
+                      latency=args.latency, bandwidth=args.bandwidth)
+    with standin:
+        os.environ['COURSERA_API_ROOT'] = standin.api_root
+        results = run_benchmarks(standin, args)
+
+    save_results(args.output, results, latency=args.latency,
+                 bandwidth=args.bandwidth)
+
+
+def print_results(results):
+    for summary in results:
+        rates = ', '.join('{:.1f} {}'.format(value, key)
+                          for key, value in sorted(summary.items())
+                          if key.endswith('_per_second'))
+        print('{:<34} {:>9.3f}s  {}  {}'.format(
+            summary['benchmark'], summary['median'], rates,
+            json.dumps(summary['params'], sort_keys=True)))
+
+
+def load_results(filename):
+    """
+    Latest result of each benchmark and parameter set in a results file.
+    :return results: {(benchmark, params json): summary}
+    """
+    results = {}
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                summary = json.loads(line)
+                results[(summary['benchmark'], json.dumps(
+                    summary['params'], sort_keys=True))] = summary
+    return results
+
+
+def compare(args):
+    before = load_results(args.before)
+    after = load_results(args.after)
+    print('{:<34} {:>10} {:>10} {:>8}  {}'.format(
+        'benchmark', 'before', 'after', 'change', 'params'))
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key]['median'], after[key]['median']
+        change = (new - old) / old * 100 if old else 0
+        print('{:<34} {:>9.3f}s {:>9.3f}s {:>+7.1f}%  {}'.format(
+            key[0], old, new, change, key[1]))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the network side of courseraresearchexports '
+        'against a local stand-in API and CDN.')
+    subparsers = parser.add_subparsers()
+
+    parser_run = subparsers.add_parser('run', help='Run the benchmarks.')
+    parser_run.set_defaults(func=benchmark)
+    parser_run.add_argument(
+        '--output', default='benchmark_results.jsonl',
+        help='JSON lines file the results are appended to.')
+    parser_run.add_argument(
+        '--repeat', type=int, default=3,
+        help='Runs of each benchmark; the median is reported.')
+    parser_run.add_argument(
+        '--jobs', type=int, default=1000,
+        help='Export jobs in the stand-in user history.')
+    parser_run.add_argument(
+        '--lookups', type=int, default=100,
+        help='Export jobs fetched one by one.')
+    parser_run.add_argument(
+        '--archive-size', type=parse_size, default=parse_size('256M'),
+        help='Size of the tables export archive, e.g. 2G.')
+    parser_run.add_argument(
+        '--clickstream-days', type=int, default=7,
+        help='Day files in the clickstream export.')
+    parser_run.add_argument(
+        '--clickstream-file-size', type=parse_size,
+        default=parse_size('32M'),
+        help='Size of each clickstream day file.')
+    parser_run.add_argument(
+        '--segments', type=parse_int_list, default=[1, 4],
+        help='Comma separated segment counts to download the archive with.')
+    parser_run.add_argument(
+        '--parallel', type=parse_int_list, default=[1, 4],
+        help='Comma separated numbers of concurrent clickstream downloads.')
+    parser_run.add_argument(
+        '--latency', type=float, default=0.0,
+        help='Seconds added to every stand-in request.')
+    parser_run.add_argument(
+        '--bandwidth', type=parse_size,
+        help='Bytes per second of each file transfer, e.g. 20M.')
+
+    parser_compare = subparsers.add_parser(
+        'compare', help='Compare the medians of two result files.')
+    parser_compare.set_defaults(func=compare)
+    parser_compare.add_argument('before')
+    parser_compare.add_argument('after')
+
+    return parser
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ('run', 'compare', '-h', '--help'):
+        argv = ['run'] + argv
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local HTTP stand-in for the research export APIs and the CDN serving export
+files, so that the network side of the tools can be benchmarked without
+Coursera credentials. It serves:
+
+    GET  /api/onDemandExports.v2/?q=my[&limit=&start=]
+    GET  /api/onDemandExports.v2/<export_job_id>
+    POST /api/clickstreamExportsDownload.v1/?action=generateLinks
+    GET  /api/onDemandCourses.v1/[<course_id>][?ids=|?q=slug]
+    GET  /api/partners.v1/[<partner_id>][?ids=|?q=shortName]
+    GET  /cdn/tables/<export_job_id>.zip
+    GET  /cdn/clickstream/<scope>/<date>.csv.gz
+
+Export files are synthetic filler of the configured size, served with
+Content-length, ETag and byte range support. Every request is delayed by
+`latency` seconds and file transfers are paced to `bandwidth` bytes per
+second per connection.
+"""
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from datetime import datetime, timedelta
+import json
+import re
+from SocketServer import ThreadingMixIn
+import threading
+import time
+from urlparse import parse_qs, urlparse
+
+TABLES = 'RESEARCH_WITH_SCHEMAS'
+CLICKSTREAM = 'RESEARCH_EVENTING'
+COURSE_COUNT = 50
+PARTNER_COUNT = 10
+CHUNK_SIZE = 64 * 1024
+# bytes served for synthetic files, repeated as needed
+FILLER = bytes(bytearray(i % 251 for i in range(1024 * 1024)))
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandIn(object):
+    """
+    Stand-in API and CDN running on a background thread of this process.
+    :param jobs: number of export jobs in the user's history
+    :param archive_size: bytes of each tables export archive
+    :param clickstream_days: number of day files in each clickstream export
+    :param clickstream_file_size: bytes of each clickstream day file
+    :param latency: seconds added to every request
+    :param bandwidth: bytes per second per file transfer, or None
+    """
+
+    def __init__(self, jobs=1000, archive_size=64 * 1024 * 1024,
+                 clickstream_days=7, clickstream_file_size=8 * 1024 * 1024,
+                 latency=0.0, bandwidth=None):
+        self.jobs = jobs
+        self.archive_size = archive_size
+        self.clickstream_days = clickstream_days
+        self.clickstream_file_size = clickstream_file_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self._server = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                           _handler_class(self))
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def root(self):
+        return 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+
+    @property
+    def api_root(self):
+        """
+        Value for the COURSERA_API_ROOT environment variable.
+        """
+        return self.root + 'api/'
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def job(self, index):
+        """
+        Synthetic export job, alternating tables and clickstream exports
+        over COURSE_COUNT courses, most recent first.
+        """
+        job_id = 'benchmark-job-{:06d}'.format(index)
+        created_at = datetime(2016, 9, 1) - timedelta(hours=index)
+        json_job = {
+            'id': job_id,
+            'status': 'SUCCESSFUL',
+            'scope': {'typeName': 'courseContext',
+                      'definition': {'courseId': course_id(index)}},
+            'anonymityLevel': 'HASHED_IDS_NO_PII',
+            'statementOfPurpose': 'benchmark',
+            'metadata': {'createdAt': _unix_ms(created_at)}}
+        if index % 2 == 0:
+            json_job['exportType'] = TABLES
+            json_job['schemaNames'] = ['demographics', 'course_progress']
+            json_job['downloadLink'] = '{}cdn/tables/{}.zip'.format(
+                self.root, job_id)
+        else:
+            json_job['exportType'] = CLICKSTREAM
+            json_job['interval'] = {
+                'start': '2016-08-01',
+                'end': _date(datetime(2016, 8, 1) + timedelta(
+                    days=self.clickstream_days - 1))}
+        return json_job
+
+    def job_index(self, export_job_id):
+        match = re.match(r'benchmark-job-(\d+)$', export_job_id)
+        if match and int(match.group(1)) < self.jobs:
+            return int(match.group(1))
+        return None
+
+    def clickstream_links(self, scope, start, end):
+        start_date = datetime.strptime(start, '%Y-%m-%d')
+        days = (datetime.strptime(end, '%Y-%m-%d') - start_date).days + 1
+        return ['{}cdn/clickstream/{}/{}.csv.gz'.format(
+            self.root, scope, _date(start_date + timedelta(days=day)))
+            for day in range(days)]
+
+    def file_size(self, path):
+        if path.startswith('/cdn/tables/'):
+            return self.archive_size
+        elif path.startswith('/cdn/clickstream/'):
+            return self.clickstream_file_size
+        return None
+
+
+def course_id(index):
+    return 'benchmark-course-{:03d}'.format(index % COURSE_COUNT)
+
+
+def course_slug(course_id):
+    return course_id.replace('benchmark-course-', 'benchmark-slug-')
+
+
+def partner_short_name(partner_id):
+    return 'benchmark-partner-{}'.format(partner_id)
+
+
+def _unix_ms(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _date(dt):
+    return dt.strftime('%Y-%m-%d')
+
+
+def _handler_class(standin):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # write headers and body in one segment, otherwise Nagle's algorithm
+        # and delayed ACKs add tens of milliseconds to every response
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            self._dispatch('POST')
+
+        def _dispatch(self, method):
+            standin.count_request()
+            if standin.latency:
+                time.sleep(standin.latency)
+            url = urlparse(self.path)
+            params = dict((key, values[0])
+                          for key, values in parse_qs(url.query).items())
+            path = url.path
+
+            if path.startswith('/cdn/') and method == 'GET':
+                return self._send_file(path)
+            for prefix, route in [
+                    ('/api/onDemandExports.v2/', self._exports),
+                    ('/api/clickstreamExportsDownload.v1/',
+                     self._clickstream_links),
+                    ('/api/onDemandCourses.v1/', self._courses),
+                    ('/api/partners.v1/', self._partners)]:
+                if path.startswith(prefix):
+                    return route(method, path[len(prefix):], params)
+            self._send_json(404, {'message': 'Not found'})
+
+        def _exports(self, method, resource_id, params):
+            if method != 'GET':
+                return self._send_json(405, {'message': 'Not allowed'})
+            if resource_id:
+                index = standin.job_index(resource_id)
+                if index is None:
+                    return self._send_json(404, {'message': 'Not found'})
+                etag = '"{}"'.format(resource_id)
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send_empty(304, {'ETag': etag})
+                return self._send_json(
+                    200, {'elements': [standin.job(index)]}, {'ETag': etag})
+
+            start = int(params.get('start') or 0)
+            limit = int(params.get('limit') or 100)
+            end = min(start + limit, standin.jobs)
+            body = {'elements': [standin.job(index)
+                                 for index in range(start, end)],
+                    'paging': {'next': str(end)} if end < standin.jobs
+                    else {}}
+            self._send_json(200, body)
+
+        def _clickstream_links(self, method, resource_id, params):
+            start = params.get('startDate', '2016-08-01')
+            end = params.get('endDate', _date(
+                datetime(2016, 8, 1) +
+                timedelta(days=standin.clickstream_days - 1)))
+            self._send_json(200, standin.clickstream_links(
+                params.get('scope', 'scope'), start, end))
+
+        def _courses(self, method, resource_id, params):
+            if resource_id:
+                ids = [resource_id]
+            elif params.get('q') == 'slug':
+                ids = [params['slug'].replace('benchmark-slug-',
+                                              'benchmark-course-')]
+            else:
+                ids = params.get('ids', '').split(',')
+            self._send_json(200, {'elements': [
+                {'id': course, 'slug': course_slug(course)}
+                for course in ids if course]})
+
+        def _partners(self, method, resource_id, params):
+            if resource_id:
+                ids = [resource_id]
+            elif params.get('q') == 'shortName':
+                ids = [params['shortName'].replace('benchmark-partner-', '')]
+            else:
+                ids = params.get('ids', '').split(',')
+            self._send_json(200, {'elements': [
+                {'id': int(partner), 'shortName': partner_short_name(partner)}
+                for partner in ids if partner]})
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_empty(self, status, headers):
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+
+        def _send_file(self, path):
+            size = standin.file_size(path)
+            if size is None:
+                return self._send_json(404, {'message': 'Not found'})
+            start, end = 0, size - 1
+            status = 200
+            match = RANGE_PATTERN.match(self.headers.get('Range') or '')
+            if match:
+                if match.group(1):
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(int(match.group(2)), size - 1)
+                else:
+                    start = max(0, size - int(match.group(2)))
+                if start >= size:
+                    self.send_response(416)
+                    self.send_header('Content-Range', 'bytes */{}'.format(
+                        size))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 206
+
+            self.send_response(status)
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', '"synthetic-{}"'.format(size))
+            if status == 206:
+                self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                    start, end, size))
+            self.end_headers()
+            self._write_filler(start, end + 1)
+
+        def _write_filler(self, start, stop):
+            started_at = time.time()
+            sent = 0
+            position = start
+            while position < stop:
+                offset = position % len(FILLER)
+                chunk = FILLER[offset:offset + min(CHUNK_SIZE,
+                                                   stop - position)]
+                self.wfile.write(chunk)
+                position += len(chunk)
+                sent += len(chunk)
+                if standin.bandwidth:
+                    ahead = sent / float(standin.bandwidth) - (
+                        time.time() - started_at)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return Handler
@@ -16,10 +16,11 @@ from __future__ import print_function
 
 import logging
 
-from tabulate import tabulate
-
 from courseraresearchexports.containers import client
 from courseraresearchexports.containers import utils
+from courseraresearchexports.lazy import lazy_callable
+
+tabulate = lazy_callable('tabulate', 'tabulate')
 
 
 def create_container(args):
@@ -35,10 +36,14 @@ def create_container(args):
         kwargs['container_name'] = args.container_name
     if args.database_name:
         kwargs['database_name'] = args.database_name
+    if args.load_sessions:
+        kwargs['load_sessions'] = args.load_sessions
 
     if args.export_request_id:
-        container_id = client.create_from_export_request_id(
-            args.export_request_id, docker_client=d, **kwargs)
+        container_id = client.create_from_export_request_ids(
+            args.export_request_id, docker_client=d,
+            download_segments=args.segments, use_cache=not args.no_cache,
+            **kwargs)
     elif args.export_data_folder:
         container_id = client.create_from_folder(
             args.export_data_folder, docker_client=d, **kwargs)
@@ -123,7 +128,10 @@ def parser(subparsers):
 
     source_subparser.add_argument(
         '--export_request_id',
-        help='Export job to download and create containers')
+        nargs='+',
+        help='Export job to download and create containers. Pass the ids of '
+        'all parts of a tables export requested with --split_schemas or '
+        '--schema_groups to load them into one database.')
     source_subparser.add_argument(
         '--export_data_folder',
         help='Location of already downloaded export data')
@@ -134,6 +142,22 @@ def parser(subparsers):
     parser_create.add_argument(
         '--database_name',
         help='Name for database inside container.')
+    parser_create.add_argument(
+        '--segments',
+        type=int,
+        default=1,
+        help='Download the export archive as this many concurrent byte '
+        'ranges. Only used with --export_request_id.')
+    parser_create.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Download the export even if it is in the local download '
+        'cache. Only used with --export_request_id.')
+    parser_create.add_argument(
+        '--load_sessions',
+        type=int,
+        help='Load this many tables at once, each in its own database '
+        'session. Defaults to the number of cores.')
 
     parser_list = containers_subparsers.add_parser(
         'list',
@@ -16,10 +16,11 @@ from __future__ import print_function
 
 import logging
 
-from tabulate import tabulate
-
 import courseraresearchexports.db.db as db
 from courseraresearchexports.containers import utils
+from courseraresearchexports.lazy import lazy_callable
+
+tabulate = lazy_callable('tabulate', 'tabulate')
 
 
 def connect(args):
@@ -14,20 +14,38 @@
 
 from __future__ import print_function
 
+from datetime import datetime, timedelta
 import json
 import logging
+import os
 
 import argparse
-from tabulate import tabulate
 
 from courseraresearchexports.exports import api
+from courseraresearchexports.exports import batch
+from courseraresearchexports.exports import concurrent_api
+from courseraresearchexports.exports import shards
+from courseraresearchexports.exports import wait
 from courseraresearchexports.constants.api_constants import \
-    ANONYMITY_LEVEL_COORDINATOR, EXPORT_TYPE_CLICKSTREAM, \
-    EXPORT_TYPE_TABLES, SCHEMA_NAMES
+    ANONYMITY_LEVEL_COORDINATOR, CLICKSTREAM_SHARD_DAYS, \
+    CLICKSTREAM_SHARD_RETRIES, EXPORT_TYPE_CLICKSTREAM, \
+    EXPORT_TYPE_GRADEBOOK, EXPORT_TYPE_TABLES, REQUEST_BATCH_BURST, \
+    REQUEST_BATCH_RATE, SCHEMA_NAMES, WAIT_INITIAL_INTERVAL_SECONDS, \
+    WAIT_MAX_INTERVAL_SECONDS
 from courseraresearchexports.models.ClickstreamDownloadLinksRequest import \
     ClickstreamDownloadLinksRequest
 from courseraresearchexports.models.ExportRequest import ExportRequest
+from courseraresearchexports.models.JobIndex import JobIndex
+from courseraresearchexports.models.utils import resolve_scope_names
 from courseraresearchexports.exports import utils
+from courseraresearchexports.lazy import lazy_callable
+
+tabulate = lazy_callable('tabulate', 'tabulate')
+
+EXPORT_TYPES_BY_NAME = {
+    'tables': EXPORT_TYPE_TABLES,
+    'clickstream': EXPORT_TYPE_CLICKSTREAM,
+    'gradebook': EXPORT_TYPE_GRADEBOOK}
 
 
 def request_clickstream(args):
@@ -35,6 +53,13 @@ def request_clickstream(args):
     Create and send an clickstream data export request with Coursera. Only
     available for data coordinators.
     """
+    if not getattr(args, 'shard_by', None):
+        if getattr(args, 'wait', False) or getattr(args, 'dest', None):
+            raise ValueError('--wait/--dest require --shard_by.')
+        if getattr(args, 'parallel', None) is not None or \
+                getattr(args, 'retries', None) is not None:
+            raise ValueError('--parallel/--retries require --shard_by.')
+
     export_request = ExportRequest.from_args(
         course_id=args.course_id,
         course_slug=args.course_slug,
@@ -47,6 +72,10 @@ def request_clickstream(args):
         interval=args.interval,
         ignore_existing=args.ignore_existing)
 
+    if getattr(args, 'shard_by', None):
+        request_clickstream_shards(export_request, args)
+        return
+
     export_request_with_metadata = api.post(export_request)[0]
 
     logging.info('Successfully created clickstream export request {id}.'
@@ -56,6 +85,33 @@ def request_clickstream(args):
                       export_request_with_metadata.to_json(), indent=2)))
 
 
+def request_clickstream_shards(export_request, args):
+    """
+    Request a clickstream export as one export job per day or week of its
+    interval, optionally waiting for every shard to succeed.
+    """
+    if not export_request.interval:
+        raise ValueError('--shard_by requires --interval.')
+
+    shard_requests = shards.shard_interval(
+        export_request, CLICKSTREAM_SHARD_DAYS[args.shard_by])
+    jobs = shards.request(shard_requests)
+    logging.info('Requested {} shards: {}'.format(
+        len(shard_requests), ' '.join(
+            job.id for job in jobs if not isinstance(job, Exception))))
+
+    if args.wait or args.dest:
+        shards.wait_for_shards(
+            shard_requests, jobs,
+            retries=(CLICKSTREAM_SHARD_RETRIES if args.retries is None
+                     else args.retries),
+            dest=args.dest,
+            parallel=1 if args.parallel is None else args.parallel)
+        logging.info('All {} shards succeeded.'.format(len(shard_requests)))
+    elif any(isinstance(job, Exception) for job in jobs):
+        raise RuntimeError('Some shards could not be requested.')
+
+
 def request_tables(args):
     """
     Create and send a tables data export request with Coursera.
@@ -71,6 +127,21 @@ def request_tables(args):
         export_type=EXPORT_TYPE_TABLES,
         schema_names=args.schemas)
 
+    if getattr(args, 'split_schemas', False) or \
+            getattr(args, 'schema_groups', None):
+        request_tables_in_parts(export_request, args)
+        return
+
+    max_age = getattr(args, 'reuse_existing', None)
+    if max_age:
+        existing = api.find_existing(export_request, max_age)
+        if existing:
+            logging.info('Reusing {status} tables export request {id} created '
+                         'at {created_at}.'.format(
+                             status=existing.status, id=existing.id,
+                             created_at=existing.created_at.strftime('%c')))
+            return
+
     export_request_with_metadata = api.post(export_request)[0]
 
     logging.info('Successfully created tables export request {id}.'
@@ -80,11 +151,97 @@ def request_tables(args):
                       export_request_with_metadata.to_json(), indent=2)))
 
 
+def request_tables_in_parts(export_request, args):
+    """
+    Request a tables export as one export job per group of schemas. Small
+    schemas become available first, and the parts can be downloaded
+    concurrently and loaded into one database by containers create.
+    """
+    groups = shards.schema_groups(
+        export_request.schema_names or SCHEMA_NAMES,
+        None if args.split_schemas else args.schema_groups)
+    shard_requests = shards.shard_schemas(export_request, groups)
+
+    max_age = getattr(args, 'reuse_existing', None)
+    recent = api.get_all() if max_age else []
+    jobs = [api.find_existing(shard_request, max_age, recent)
+            if max_age else None for shard_request in shard_requests]
+    for shard_request, job in zip(shard_requests, jobs):
+        if job:
+            logging.info('Reusing {} export request {} for {}.'.format(
+                job.status, job.id, shards.describe(shard_request)))
+
+    missing = [index for index, job in enumerate(jobs) if job is None]
+    requested = shards.request([shard_requests[index] for index in missing])
+    for index, job in zip(missing, requested):
+        jobs[index] = job
+
+    created = [job.id for job in jobs if not isinstance(job, Exception)]
+    logging.info('Tables export requested in {} parts. Load them into one '
+                 'database with:\n\tcourseraresearchexports containers '
+                 'create --export_request_id {}'.format(
+                     len(jobs), ' '.join(created)))
+    if len(created) < len(jobs):
+        raise RuntimeError('{} of {} parts could not be requested.'.format(
+            len(jobs) - len(created), len(jobs)))
+
+
+def request_batch(args):
+    """
+    Create and send a data export request for every row of a CSV or YAML
+    manifest.
+    """
+    rows = batch.read_manifest(args.manifest)
+    results = batch.submit(
+        rows,
+        defaults={'export_type': args.export_type, 'purpose': args.purpose},
+        max_concurrency=args.parallel,
+        rate=args.rate,
+        burst=args.burst)
+
+    results_filename = args.results or \
+        os.path.splitext(args.manifest)[0] + '.results.csv'
+    batch.write_results(results, results_filename)
+
+    failed = [result for result in results if result['error']]
+    for result in failed:
+        logging.error('Row {row} ({scope}) failed: {error}'.format(**result))
+    logging.info('Created {created} of {total} export requests, results '
+                 'written to {filename}.'.format(
+                     created=len(results) - len(failed), total=len(results),
+                     filename=results_filename))
+    if failed:
+        raise RuntimeError('{} of {} export requests failed.'.format(
+            len(failed), len(results)))
+
+
 def get(args):
     """
-    Get the details and status of a data export request using a job id.
+    Get the details and status of data export requests using job ids.
     """
-    export_request = api.get(args.id)[0]
+    export_job_ids = args.id if isinstance(args.id, list) else [args.id]
+    if len(export_job_ids) > 1:
+        export_requests = concurrent_api.get(
+            export_job_ids, return_exceptions=True)
+        failed = []
+        for export_job_id, export_request in zip(
+                export_job_ids, export_requests):
+            if isinstance(export_request, Exception):
+                logging.error('Could not get export request {}: {}'.format(
+                    export_job_id, export_request))
+                failed.append(export_job_id)
+        found = [export_request for export_request in export_requests
+                 if not isinstance(export_request, Exception)]
+        if found:
+            print(tabulate(_export_requests_table(found),
+                           headers='firstrow'))
+        if failed:
+            raise RuntimeError('Could not get {} of {} export requests: {}'
+                               .format(len(failed), len(export_job_ids),
+                                       ', '.join(failed)))
+        return
+
+    export_request = api.get(export_job_ids[0])[0]
 
     export_request_info = [
         ['Export Job Id:', export_request.id],
@@ -115,10 +272,44 @@ def get_all(args):
     """
     Get the details and status of your data export requests.
     """
-    export_requests = api.get_all()
-
+    filters = {
+        'scope_id': getattr(args, 'scope_id', None),
+        'status': getattr(args, 'status', None),
+        'export_type': EXPORT_TYPES_BY_NAME.get(
+            getattr(args, 'export_type', None)),
+        'created_after': getattr(args, 'since', None),
+        'created_before': getattr(args, 'until', None)}
+
+    if getattr(args, 'all', False) or any(filters.values()):
+        job_index = JobIndex.default()
+        stale_ids = job_index.refresh(api.iter_all())
+        if stale_ids:
+            # jobs in progress the listing left out; fetching them updates
+            # the index
+            logging.debug('Fetching {} export requests missing from the '
+                          'listing.'.format(len(stale_ids)))
+            for export_job_id, export_request in zip(
+                    stale_ids, concurrent_api.get(
+                        stale_ids, return_exceptions=True, max_age=0)):
+                if isinstance(export_request, Exception):
+                    logging.warning('Could not refresh export request {}: {}'
+                                    .format(export_job_id, export_request))
+        export_requests = job_index.query(**filters)
+    else:
+        export_requests = api.get_all()
+
+    print(tabulate(_export_requests_table(export_requests),
+                   headers='firstrow'))
+
+
+def _export_requests_table(export_requests):
+    """
+    One row per export request, oldest first, with a header row.
+    """
+    resolve_scope_names(export_requests)
     export_requests_table = [['Created', 'Request Id', 'Status', 'Type',
-                              'User Id Hashing', 'Scope', 'Schemas']]
+                              'User Id Hashing', 'Scope', 'Scope Name',
+                              'Schemas']]
     for export_request in sorted(export_requests, key=lambda x: x.created_at):
         export_requests_table.append([
             export_request.created_at.strftime('%Y-%m-%d %H:%M'),
@@ -127,9 +318,10 @@ def get_all(args):
             export_request.export_type_display,
             export_request.formatted_anonymity_level,
             export_request.scope_id,
+            export_request.scope_name,
             export_request.schema_names_display])
 
-    print(tabulate(export_requests_table, headers='firstrow'))
+    return export_requests_table
 
 
 def download(args):
@@ -139,12 +331,31 @@ def download(args):
     try:
         export_request = api.get(args.id)[0]
         dest = args.dest
-        utils.download(export_request, dest)
+        utils.download(export_request, dest, parallel=args.parallel,
+                       segments=args.segments, use_cache=not args.no_cache)
     except Exception as err:
         logging.error('Download failed with exception:\n{}'.format(err))
         raise
 
 
+def wait_for_jobs(args):
+    """
+    Wait for data export requests to finish, optionally downloading each one
+    as soon as it completes.
+    """
+    finished = wait.wait(
+        args.id,
+        dest=args.dest,
+        parallel=args.parallel,
+        segments=args.segments,
+        use_cache=not args.no_cache,
+        initial_interval=args.interval,
+        max_interval=args.max_interval,
+        timeout=args.timeout)
+
+    logging.info('All {} export requests finished.'.format(len(finished)))
+
+
 def get_clickstream_links(args):
     """
     Generate links for clickstream data exports
@@ -166,6 +377,58 @@ def get_clickstream_links(args):
         tablefmt="plain"))
 
 
+def sync_clickstream(args):
+    """
+    Download only the clickstream days missing from a local folder.
+    """
+    end = args.end or (datetime.utcnow().date() - timedelta(days=1)).strftime(
+        '%Y-%m-%d')
+    clickstream_links_request = ClickstreamDownloadLinksRequest.from_args(
+        course_id=args.course_id,
+        course_slug=args.course_slug,
+        partner_id=args.partner_id,
+        partner_short_name=args.partner_short_name,
+        group_id=args.group_id,
+        interval=[args.start, end])
+
+    downloaded = utils.sync_clickstream(
+        clickstream_links_request, args.dest, parallel=args.parallel)
+
+    logging.info('Downloaded {} new clickstream files to {}.'.format(
+        len(downloaded), args.dest))
+
+
+def parse_date(date_string):
+    return datetime.strptime(date_string, '%Y-%m-%d')
+
+
+def parse_schema_group(schema_group_string):
+    """
+    Parse a comma separated group of schema names.
+    """
+    schema_group = schema_group_string.split(',')
+    unknown_schemas = set(schema_group) - set(SCHEMA_NAMES)
+    if unknown_schemas:
+        raise argparse.ArgumentTypeError('Unknown schemas: {}'.format(
+            ', '.join(sorted(unknown_schemas))))
+    return schema_group
+
+
+def parse_max_age(max_age_string):
+    """
+    Parse an age such as 36h or 7d; plain numbers are days.
+    """
+    units = {'h': 'hours', 'd': 'days'}
+    unit = units.get(max_age_string[-1:].lower())
+    number = max_age_string[:-1] if unit else max_age_string
+    try:
+        return timedelta(**{unit or 'days': float(number)})
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'Expected an age such as 36h or 7d, got {}'.format(
+                max_age_string))
+
+
 def parser(subparsers):
     parser_jobs = subparsers.add_parser(
         'jobs',
@@ -183,12 +446,93 @@ def parser(subparsers):
 
     create_request_parser(jobs_subparsers)
 
+    parser_request_batch = jobs_subparsers.add_parser(
+        'request_batch',
+        help=request_batch.__doc__,
+        description=request_batch.__doc__)
+    parser_request_batch.set_defaults(func=request_batch)
+
+    parser_request_batch.add_argument(
+        '--manifest',
+        required=True,
+        help='CSV file with a header row, or YAML file with a list of '
+        'mappings. Columns: export_type (tables or clickstream), one of '
+        'course_id, course_slug, partner_id, partner_short_name or group_id, '
+        'purpose, user_id_hashing, schemas (space separated), '
+        'interval_start, interval_end and ignore_existing.')
+
+    parser_request_batch.add_argument(
+        '--results',
+        help='CSV file mapping each row to its export request id. Defaults '
+        'to the manifest name with a .results.csv extension.')
+
+    parser_request_batch.add_argument(
+        '--export_type',
+        choices=['tables', 'clickstream'],
+        default='tables',
+        help='Export type for rows without an export_type.')
+
+    parser_request_batch.add_argument(
+        '--purpose',
+        help='Statement of purpose for rows without a purpose.')
+
+    parser_request_batch.add_argument(
+        '--parallel',
+        type=int,
+        help='Number of requests sent concurrently. Defaults to the HTTP '
+        'pool size.')
+
+    parser_request_batch.add_argument(
+        '--rate',
+        type=float,
+        default=REQUEST_BATCH_RATE,
+        help='Average number of requests sent per second.')
+
+    parser_request_batch.add_argument(
+        '--burst',
+        type=int,
+        default=REQUEST_BATCH_BURST,
+        help='Number of requests that may be sent at once before --rate '
+        'applies.')
+
     parser_get_all = jobs_subparsers.add_parser(
         'get_all',
         help=get_all.__doc__,
         description=get_all.__doc__)
     parser_get_all.set_defaults(func=get_all)
 
+    parser_get_all.add_argument(
+        '--all',
+        action='store_true',
+        help='List your whole export history instead of the 100 most recent '
+        'requests. Every run walks the whole history; a local index stores '
+        'new and changed requests and refetches running requests missing '
+        'from the listing. Implied by any of the filters below.')
+
+    parser_get_all.add_argument(
+        '--scope_id',
+        help='Only list requests for this course id, partner id or group id.')
+
+    parser_get_all.add_argument(
+        '--status',
+        help='Only list requests with this status (e.g. PENDING).')
+
+    parser_get_all.add_argument(
+        '--export_type',
+        choices=sorted(EXPORT_TYPES_BY_NAME.keys()),
+        help='Only list requests of this type.')
+
+    parser_get_all.add_argument(
+        '--since',
+        type=parse_date,
+        help='Only list requests created on or after this date (i.e. '
+        '2016-08-01).')
+
+    parser_get_all.add_argument(
+        '--until',
+        type=parse_date,
+        help='Only list requests created before this date.')
+
     parser_get = jobs_subparsers.add_parser(
         'get',
         help=get.__doc__,
@@ -197,7 +541,9 @@ def parser(subparsers):
 
     parser_get.add_argument(
         'id',
-        help='Export request ID')
+        nargs='+',
+        help='Export request ID(s). Several ids are fetched concurrently and '
+        'summarized in a table.')
 
     parser_download = jobs_subparsers.add_parser(
         'download',
@@ -214,6 +560,78 @@ def parser(subparsers):
         default='.',
         help='Destination folder')
 
+    parser_download.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='Number of files to download concurrently. Useful for '
+        'clickstream exports, which are split into one file per day.')
+
+    parser_download.add_argument(
+        '--segments',
+        type=int,
+        default=1,
+        help='Split a tables export archive into this many byte ranges and '
+        'download them concurrently.')
+
+    parser_download.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Always download from Coursera instead of reusing files from '
+        'the local download cache.')
+
+    parser_wait = jobs_subparsers.add_parser(
+        'wait',
+        help=wait_for_jobs.__doc__,
+        description=wait_for_jobs.__doc__)
+    parser_wait.set_defaults(func=wait_for_jobs)
+
+    parser_wait.add_argument(
+        'id',
+        nargs='+',
+        help='Export request ID(s)')
+
+    parser_wait.add_argument(
+        '--dest',
+        help='If set, download each completed export to this folder.')
+
+    parser_wait.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='Number of completed exports to download concurrently.')
+
+    parser_wait.add_argument(
+        '--segments',
+        type=int,
+        default=1,
+        help='Split each tables export archive into this many byte ranges '
+        'and download them concurrently.')
+
+    parser_wait.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Always download from Coursera instead of reusing files from '
+        'the local download cache.')
+
+    parser_wait.add_argument(
+        '--interval',
+        type=float,
+        default=WAIT_INITIAL_INTERVAL_SECONDS,
+        help='Seconds between the first polls of each request. The interval '
+        'doubles after every poll that finds the request still running.')
+
+    parser_wait.add_argument(
+        '--max_interval',
+        type=float,
+        default=WAIT_MAX_INTERVAL_SECONDS,
+        help='Upper bound on the seconds between polls of a request.')
+
+    parser_wait.add_argument(
+        '--timeout',
+        type=float,
+        help='Give up after this many seconds.')
+
     parser_clickstream_links = jobs_subparsers.add_parser(
         'clickstream_download_links',
         help='Get download links for completed eventing exports.')
@@ -228,6 +646,38 @@ def parser(subparsers):
         help='Interval of exported clickstream data, inclusive. '
         '(i.e. 2016-08-01 2016-08-04).')
 
+    parser_sync_clickstream = jobs_subparsers.add_parser(
+        'sync_clickstream',
+        help=sync_clickstream.__doc__,
+        description=sync_clickstream.__doc__ + ' A manifest in the '
+        'destination folder records which days were already downloaded, so '
+        'running this nightly only fetches new days.')
+    parser_sync_clickstream.set_defaults(func=sync_clickstream)
+
+    create_scope_subparser(parser_sync_clickstream)
+
+    parser_sync_clickstream.add_argument(
+        '--start',
+        required=True,
+        help='First day of clickstream data to keep in sync (i.e. '
+        '2016-08-01).')
+
+    parser_sync_clickstream.add_argument(
+        '--end',
+        help='Last day of clickstream data to keep in sync, inclusive. By '
+        'default this will be yesterday.')
+
+    parser_sync_clickstream.add_argument(
+        '--dest',
+        default='.',
+        help='Destination folder')
+
+    parser_sync_clickstream.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='Number of files to download concurrently.')
+
     return parser_jobs
 
 
@@ -295,6 +745,35 @@ def create_request_parser(subparsers):
         'different schemas and cannot be linked. Only data coordinators have '
         'access to \'linked\' users_ids to restrict PII.')
 
+    schema_parts_group = parser_tables.add_mutually_exclusive_group()
+
+    schema_parts_group.add_argument(
+        '--split_schemas',
+        action='store_true',
+        help='Request every schema as a separate export, so that small '
+        'schemas are ready first and the parts download in parallel. Use '
+        'containers create with all part ids to load them as one export.')
+
+    schema_parts_group.add_argument(
+        '--schema_groups',
+        nargs='+',
+        type=parse_schema_group,
+        metavar='SCHEMA[,SCHEMA...]',
+        help='Like --split_schemas, but request each comma separated group '
+        'of schemas as one export. Schemas not in any group are requested '
+        'together (e.g. --schema_groups course_progress '
+        'demographics,users).')
+
+    parser_tables.add_argument(
+        '--reuse_existing',
+        nargs='?',
+        const=timedelta(days=7),
+        type=parse_max_age,
+        metavar='MAX_AGE',
+        help='Instead of creating a new export, reuse a completed or running '
+        'export request for the same scope, schemas and user id hashing '
+        'created within MAX_AGE (e.g. 36h or 7d, by default 7d).')
+
     parser_tables.add_argument(
         '--schemas',
         choices=SCHEMA_NAMES,
@@ -324,3 +803,32 @@ def create_request_parser(subparsers):
         action='store_true',
         help='If flag is set, we will recompute clickstream data for all dates'
         'in the interval. Otherwise, previously computed days are skipped.')
+
+    parser_clickstream.add_argument(
+        '--shard_by',
+        choices=sorted(CLICKSTREAM_SHARD_DAYS.keys()),
+        help='Split the interval into one export request per day or per '
+        'week (7 days), processed independently.')
+
+    parser_clickstream.add_argument(
+        '--wait',
+        action='store_true',
+        help='With --shard_by, wait for every shard and request the ones '
+        'that failed again.')
+
+    parser_clickstream.add_argument(
+        '--dest',
+        help='With --shard_by, download the files of each shard to this '
+        'folder as soon as it completes. Implies --wait.')
+
+    parser_clickstream.add_argument(
+        '--parallel',
+        type=int,
+        help='With --shard_by, number of completed shards to download '
+        'concurrently. Defaults to 1.')
+
+    parser_clickstream.add_argument(
+        '--retries',
+        type=int,
+        help='With --shard_by, number of times a failed shard is requested '
+        'again. Defaults to {}.'.format(CLICKSTREAM_SHARD_RETRIES))
@@ -15,7 +15,18 @@
 import logging
 import sys
 
-import requests
+from courseraresearchexports.constants.api_constants import \
+    API_MAX_BACKOFF_SECONDS, API_MAX_RETRIES, HTTP_POOL_SIZE, \
+    JOB_CACHE_TTL_SECONDS, LOOKUP_CACHE_MAX_AGE_SECONDS
+from courseraresearchexports.lazy import lazy_module
+from courseraresearchexports.models.ApiClient import ApiClient
+from courseraresearchexports.models.JobIndex import JobIndex
+from courseraresearchexports.models.LookupCache import LookupCache
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+from courseraresearchexports.models.Profiler import Profiler
+from courseraresearchexports.models.RetryPolicy import RetryPolicy
+
+requests = lazy_module('requests')
 
 
 def add_logging_parser(main_parser):
@@ -77,3 +88,110 @@ def set_logging_level(args):
     if args.silence_urllib3:
         # See: https://urllib3.readthedocs.org/en/latest/security.html
         requests.packages.urllib3.disable_warnings()
+
+
+def add_api_client_parser(main_parser):
+    """Build argparse arguments for the shared API client."""
+
+    main_parser.set_defaults(setup_api_client=configure_api_client)
+
+    main_parser.add_argument(
+        '--http-pool-size',
+        type=int,
+        default=HTTP_POOL_SIZE,
+        help='Number of keep-alive connections to hold open per host.')
+
+    main_parser.add_argument(
+        '--no-adaptive-concurrency',
+        action='store_true',
+        help='Keep sending --http-pool-size concurrent requests even while '
+        'the API is throttling them.')
+
+    main_parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=API_MAX_RETRIES,
+        help='Number of times a request that was throttled or hit a server '
+        'error is retried.')
+
+    main_parser.add_argument(
+        '--max-retry-delay',
+        type=float,
+        default=API_MAX_BACKOFF_SECONDS,
+        help='Longest wait in seconds before retrying a request.')
+
+    main_parser.add_argument(
+        '--job-cache-ttl',
+        type=int,
+        default=JOB_CACHE_TTL_SECONDS,
+        help='Seconds to reuse the cached metadata of an export job that is '
+        'still running. Finished jobs are always served from the cache.')
+
+    main_parser.add_argument(
+        '--lookup-cache-ttl',
+        type=int,
+        default=LOOKUP_CACHE_MAX_AGE_SECONDS,
+        help='Seconds to reuse cached course and partner slug and id '
+        'lookups.')
+
+    return main_parser
+
+
+def configure_api_client(args):
+    """Configures the shared API client from the parsed arguments."""
+    ApiClient.configure(
+        pool_size=args.http_pool_size,
+        adaptive_concurrency=not args.no_adaptive_concurrency)
+    RetryPolicy.configure(max_retries=args.max_retries,
+                          max_delay=args.max_retry_delay)
+    JobIndex.configure(ttl=args.job_cache_ttl)
+    LookupCache.configure(max_age=args.lookup_cache_ttl)
+
+
+def add_metrics_parser(main_parser):
+    """Build argparse arguments for performance metrics output."""
+
+    main_parser.set_defaults(setup_metrics=configure_metrics)
+
+    main_parser.add_argument(
+        '--metrics-file',
+        help='Append performance metrics for API calls, downloads, archive '
+        'extraction, container startup and unloads to this file as JSON '
+        'lines.')
+
+    return main_parser
+
+
+def configure_metrics(args):
+    """Configures the shared metrics recorder from the parsed arguments."""
+    if args.metrics_file:
+        MetricsRecorder.configure(filename=args.metrics_file)
+
+
+def add_profiling_parser(main_parser):
+    """Build argparse arguments for profiling a subcommand."""
+
+    main_parser.set_defaults(setup_profiler=build_profiler)
+
+    main_parser.add_argument(
+        '--profile',
+        metavar='FILENAME',
+        help='Profile the subcommand, writing cProfile stats to FILENAME and '
+        'collapsed stacks for flamegraph.pl to FILENAME.collapsed.')
+
+    main_parser.add_argument(
+        '--profile-interval',
+        type=float,
+        metavar='SECONDS',
+        help='With --profile, sample the stacks of every thread at this '
+        'interval for the collapsed stacks, e.g. 0.01 for long running '
+        'commands such as containers create or db unload_to_csv.')
+
+    return main_parser
+
+
+def build_profiler(args):
+    """Profiler for the subcommand, or None if profiling is off."""
+    if not args.profile:
+        return None
+    return Profiler(args.profile, sample_interval=args.profile_interval)
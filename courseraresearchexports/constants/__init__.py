@@ -1,7 +1,8 @@
 __all__ = [
     "api_constants",
     "db_constants",
-    "container_constants"
+    "container_constants",
+    "download_constants"
 ]
 
 from . import *  # noqa
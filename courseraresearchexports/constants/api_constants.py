@@ -12,12 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 
 RESEARCH_EXPORTS_APP = 'manage_research_exports'
-RESEARCH_EXPORTS_API = 'https://www.coursera.org/api/onDemandExports.v2/'
-COURSE_API = 'https://www.coursera.org/api/onDemandCourses.v1/'
-PARTNER_API = 'https://www.coursera.org/api/partners.v1/'
-CLICKSTREAM_API = 'https://www.coursera.org/api/clickstreamExportsDownload.v1/'
+# overridden to point the tools at a stand-in API, e.g. for benchmarks
+API_ROOT = os.environ.get('COURSERA_API_ROOT',
+                          'https://www.coursera.org/api/')
+RESEARCH_EXPORTS_API = API_ROOT + 'onDemandExports.v2/'
+COURSE_API = API_ROOT + 'onDemandCourses.v1/'
+PARTNER_API = API_ROOT + 'partners.v1/'
+CLICKSTREAM_API = API_ROOT + 'clickstreamExportsDownload.v1/'
 ANONYMITY_LEVEL_COORDINATOR = 'HASHED_IDS_NO_PII'
 ANONYMITY_LEVEL_ISOLATED = 'HASHED_IDS_WITH_ISOLATED_UGC_NO_PII'
 ANONYMITY_LEVELS = [ANONYMITY_LEVEL_COORDINATOR, ANONYMITY_LEVEL_ISOLATED]
@@ -42,3 +46,28 @@ SCHEMA_NAMES = [
     'ecb',
     'notebooks',
     'transactions']
+HTTP_POOL_SIZE = 10
+EXPORT_STATUS_PENDING = 'PENDING'
+EXPORT_STATUS_IN_PROGRESS = 'IN_PROGRESS'
+EXPORT_STATUS_TERMINATED = 'TERMINATED'
+EXPORT_STATUSES_IN_PROGRESS = [EXPORT_STATUS_PENDING,
+                               EXPORT_STATUS_IN_PROGRESS]
+WAIT_INITIAL_INTERVAL_SECONDS = 30
+WAIT_MAX_INTERVAL_SECONDS = 15 * 60
+# failed polls in a row after which jobs wait gives up on a job
+WAIT_MAX_CONSECUTIVE_ERRORS = 5
+JOBS_PAGE_SIZE = 100
+JOB_INDEX_FILENAME = os.path.expanduser('~/.coursera/export_jobs.sqlite')
+JOB_CACHE_TTL_SECONDS = 60
+LOOKUP_CACHE_FILENAME = os.path.expanduser(
+    '~/.coursera/scope_lookups.json')
+LOOKUP_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+SCOPE_LOOKUP_BATCH_SIZE = 100
+REQUEST_BATCH_RATE = 1.0
+REQUEST_BATCH_BURST = 5
+API_MAX_RETRIES = 5
+API_BACKOFF_SECONDS = 1
+API_MAX_BACKOFF_SECONDS = 60
+EXPORT_STATUS_SUCCESSFUL = 'SUCCESSFUL'
+CLICKSTREAM_SHARD_DAYS = {'day': 1, 'week': 7}
+CLICKSTREAM_SHARD_RETRIES = 2
@@ -3,5 +3,17 @@ import os
 COURSERA_DOCKER_LABEL = 'courseraResearchExport'
 COURSERA_LOCAL_FOLDER = os.path.expanduser('~/.coursera/exports/')
 POSTGRES_DOCKER_IMAGE = 'postgres:9.5'
+# scripts copied here are run by the postgres image's entrypoint
+INIT_SCRIPTS_FOLDER = '/docker-entrypoint-initdb.d/'
+# export data folders are mounted here, read only
+EXPORT_DATA_MOUNT = '/mnt/exportData'
 POSTGRES_INIT_MSG = 'PostgreSQL init process complete; ready for start up.'
 POSTGRES_READY_MSG = 'database system is ready to accept connections'
+
+# readiness probes of a starting container back off exponentially between
+# these delays, in seconds
+READINESS_PROBE_INITIAL_DELAY = 0.005
+READINESS_PROBE_MAX_DELAY = 1.0
+POSTGRES_PROTOCOL_VERSION = 196608  # 3.0
+# sqlstate of 'the database system is starting up'
+POSTGRES_CANNOT_CONNECT_NOW = '57P03'
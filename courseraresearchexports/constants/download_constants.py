@@ -0,0 +1,25 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_BACKOFF_SECONDS = 2
+PARTIAL_DOWNLOAD_SUFFIX = '.part'
+DOWNLOAD_STATE_SUFFIX = '.json'
+DOWNLOAD_CACHE_FOLDER = os.path.expanduser('~/.coursera/cache/downloads/')
+DOWNLOAD_CACHE_MAX_BYTES = 50 * 1024 * 1024 * 1024
+DOWNLOAD_MANIFEST_SUFFIX = '.verified.json'
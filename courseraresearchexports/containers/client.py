@@ -17,8 +17,11 @@ Coursera's tools for managing docker containers configured with a
 postgres database.
 """
 
+import io
 import logging
+import multiprocessing
 import os
+import re
 import shutil
 import time
 
@@ -26,11 +29,14 @@ from courseraresearchexports import exports
 from courseraresearchexports.constants.api_constants import \
     EXPORT_TYPE_TABLES
 from courseraresearchexports.constants.container_constants import \
-    COURSERA_DOCKER_LABEL, COURSERA_LOCAL_FOLDER, POSTGRES_DOCKER_IMAGE, \
-    POSTGRES_INIT_MSG, POSTGRES_READY_MSG
+    COURSERA_DOCKER_LABEL, COURSERA_LOCAL_FOLDER, EXPORT_DATA_MOUNT, \
+    INIT_SCRIPTS_FOLDER, POSTGRES_DOCKER_IMAGE, POSTGRES_INIT_MSG, \
+    POSTGRES_READY_MSG, READINESS_PROBE_INITIAL_DELAY, \
+    READINESS_PROBE_MAX_DELAY
 from courseraresearchexports.containers import utils as container_utils
 from courseraresearchexports.exports import utils as export_utils
 from courseraresearchexports.models.ContainerInfo import ContainerInfo
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
 
 
 def list_all(docker_client):
@@ -47,21 +53,15 @@ def list_all(docker_client):
 def start(container_name, docker_client):
     """
     Start a docker container containing a research export database. Waits until
+    the database accepts connections.
     """
     try:
         logging.debug('Starting container {}...'.format(container_name))
-        docker_client.start(container_name)
-
-        # poll logs to see if database is ready to accept connections
-        while POSTGRES_READY_MSG not in docker_client.logs(
-                container_name, tail=4):
-
-            logging.debug('Polling container for database connection...')
-            if not container_utils.is_container_running(
-                    container_name, docker_client):
-                raise RuntimeError('Container failed to start.')
-
-            time.sleep(10)
+        with MetricsRecorder.default().timed(
+                'container_ready', container=container_name, phase='start'):
+            docker_client.start(container_name)
+            wait_for_database(container_name, docker_client,
+                              POSTGRES_READY_MSG)
 
         logging.info('Started container {}.'.format(container_name))
 
@@ -95,16 +95,12 @@ def initialize(container_name, docker_client):
         logging.info('Initializing container {}...'.format(
             container_name))
 
-        docker_client.start(container_name)
-        while POSTGRES_INIT_MSG not in docker_client.logs(
-                container_name, tail=20):
-
-            logging.debug('Polling data for entrypoint initialization...')
-            if not container_utils.is_container_running(container_name,
-                                                        docker_client):
-                raise RuntimeError('Container initialization failed.')
-
-            time.sleep(10)
+        with MetricsRecorder.default().timed(
+                'container_ready', container=container_name,
+                phase='initialize'):
+            docker_client.start(container_name)
+            wait_for_database(container_name, docker_client,
+                              POSTGRES_INIT_MSG, require_message=True)
 
         logging.info('Initialized container {}.'.format(container_name))
 
@@ -117,10 +113,63 @@ def initialize(container_name, docker_client):
         raise
 
 
+def wait_for_database(container_name, docker_client, log_message,
+                      require_message=False):
+    """
+    Wait until the database of a started container accepts connections.
+    Readiness is probed with exponential backoff from a few milliseconds,
+    and the container's log stream is followed so that the probe runs as
+    soon as `log_message` is logged and a container that stops is noticed
+    right away.
+    :param container_name:
+    :param docker_client:
+    :param log_message: message logged once the database is ready
+    :param require_message: only trust the probe once log_message has been
+        logged, e.g. while the entrypoint scripts run on a temporary server
+    """
+    watcher = container_utils.LogWatcher(container_name, docker_client,
+                                         log_message)
+    watcher.start()
+    container_info = None
+    delay = READINESS_PROBE_INITIAL_DELAY
+
+    while True:
+        if watcher.ended.is_set():
+            if not container_utils.is_container_running(container_name,
+                                                        docker_client):
+                raise RuntimeError(
+                    'Container stopped before its database was ready.')
+            # the log stream closed early, fall back to reading the logs
+            if not watcher.seen.is_set() and log_message in \
+                    docker_client.logs(container_name, tail=20):
+                watcher.seen.set()
+
+        if watcher.seen.is_set() or not require_message:
+            if container_info is None:
+                container_info = ContainerInfo.from_container(
+                    container_name, docker_client)
+            if container_utils.is_database_ready(
+                    container_info.host_ip or '127.0.0.1',
+                    container_info.host_port,
+                    container_info.database_name):
+                return
+
+        logging.debug('Waiting {:.3f}s for the database of {}...'.format(
+            delay, container_name))
+        if watcher.seen.is_set() or watcher.ended.is_set():
+            time.sleep(delay)
+        elif watcher.seen.wait(delay):
+            # probe right away, and quickly, once the message is logged
+            delay = READINESS_PROBE_INITIAL_DELAY
+            continue
+        delay = min(delay * 2, READINESS_PROBE_MAX_DELAY)
+
+
 def create_from_folder(export_data_folder, docker_client,
                        container_name='coursera-exports',
                        database_name='coursera-exports',
-                       database_password=''):
+                       database_password='', part_folders=None,
+                       load_sessions=None):
     """
     Using a folder containing a Coursera research export, create a docker
      container with the export data loaded into a data base and start the
@@ -130,6 +179,10 @@ def create_from_folder(export_data_folder, docker_client,
     :param container_name:
     :param database_name:
     :param database_password:
+    :param part_folders: subfolders of export_data_folder holding the parts
+        of an export requested in several parts, loaded in order
+    :param load_sessions: concurrent database sessions loading tables, the
+        number of cores by default
     :return container_id:
     """
     logging.debug('Creating containers from {folder}'.format(
@@ -139,9 +192,9 @@ def create_from_folder(export_data_folder, docker_client,
            else {'POSTGRES_HOST_AUTH_METHOD': 'trust'})
     create_container_args = {
         'environment': env,
-        'volumes': ['/mnt/exportData'],
+        'volumes': [EXPORT_DATA_MOUNT],
         'host_config': docker_client.create_host_config(
-            binds=['{}:/mnt/exportData:ro'.format(export_data_folder)],
+            binds=['{}:{}:ro'.format(export_data_folder, EXPORT_DATA_MOUNT)],
             port_bindings={
                 5432: ('127.0.0.1',
                        container_utils.get_next_available_port(list_all(
@@ -153,19 +206,24 @@ def create_from_folder(export_data_folder, docker_client,
 
     container_id = container['Id']
 
-    # copy containers initialization script to entrypoint
-    database_setup_script = """
-        createdb -U {user} {db}
-        cd /mnt/exportData
-        psql -e -U {user} -d {db} -f setup.sql
-        psql -e -U {user} -d {db} -f load.sql
-    """.format(user='postgres', db=database_name)
+    load_plan = plan_table_loads(export_data_folder, part_folders)
+    if load_plan:
+        load_files, copy_jobs, finish_jobs = load_plan
+    else:
+        logging.info('Could not split load.sql, loading tables serially.')
+        load_files, copy_jobs, finish_jobs = {}, None, None
 
+    # copy containers initialization script to entrypoint
     docker_client.put_archive(
         container_id,  # using a named argument causes NullResource error
-        path='/docker-entrypoint-initdb.d/',
+        path=INIT_SCRIPTS_FOLDER,
         data=container_utils.create_tar_archive(
-            database_setup_script, name='init-user-db.sh'))
+            database_setup_script(
+                database_name, part_folders, copy_jobs=copy_jobs,
+                finish_jobs=finish_jobs,
+                load_sessions=load_sessions or multiprocessing.cpu_count()),
+            name='init-user-db.sh',
+            files=load_files))
 
     logging.info('Created container with id: {}'.format(container_id))
 
@@ -174,6 +232,104 @@ def create_from_folder(export_data_folder, docker_client,
     return container_id
 
 
+def database_setup_script(database_name, part_folders=None, copy_jobs=None,
+                          finish_jobs=None, load_sessions=1):
+    """
+    Entrypoint script creating the database and loading every part of the
+    export into it.
+    :param database_name:
+    :param part_folders: subfolders of the export folder, or None if the
+        export is in the folder itself
+    :param copy_jobs: scripts copying one table each, in the order they
+        should start (see plan_table_loads), or None to run each part's
+        load.sql in a single session
+    :param finish_jobs: scripts run after all copies
+    :param load_sessions: number of copy jobs run at once
+    :return script:
+    """
+    script = """
+        createdb -U {user} {db}
+    """.format(user='postgres', db=database_name)
+    for folder in part_folders or ['.']:
+        script += """
+        cd {mount}/{folder}
+        psql -e -U {user} -d {db} -f setup.sql
+    """.format(mount=EXPORT_DATA_MOUNT, folder=folder, user='postgres',
+               db=database_name)
+        if copy_jobs is None:
+            script += """
+        psql -e -U {user} -d {db} -f load.sql
+    """.format(user='postgres', db=database_name)
+
+    if copy_jobs:
+        script += """
+        printf '%s\\n' {jobs} |
+            xargs -P {sessions} -n 1 psql -e -U {user} -d {db} -f
+    """.format(jobs=' '.join(INIT_SCRIPTS_FOLDER + job for job in copy_jobs),
+               sessions=load_sessions, user='postgres', db=database_name)
+    for job in finish_jobs or []:
+        script += """
+        psql -e -U {user} -d {db} -f {job}
+    """.format(user='postgres', db=database_name,
+               job=INIT_SCRIPTS_FOLDER + job)
+    return script
+
+
+def plan_table_loads(export_data_folder, part_folders=None):
+    """
+    Split the load.sql script of every part of an export into a script per
+    COPY statement, so that tables can be loaded in concurrent sessions,
+    and a script per part with the statements that follow its copies. The
+    copies are ordered by the size of their source files, largest first, so
+    that the longest copies do not start last.
+    :param export_data_folder:
+    :param part_folders: see database_setup_script
+    :return load_files, copy_jobs, finish_jobs: scripts by path relative to
+        the entrypoint folder and the paths of the copy and finish scripts,
+        or None if a load.sql can not be split or must run in one session
+    """
+    load_files = {}
+    copies = []
+    finish_jobs = []
+    for part_index, folder in enumerate(part_folders or ['.']):
+        host_folder = os.path.join(export_data_folder, folder)
+        load_script = os.path.join(host_folder, 'load.sql')
+        if not os.path.isfile(load_script):
+            return None
+        with io.open(load_script, 'r', encoding='utf8') as f:
+            preamble, part_copies, postamble = \
+                container_utils.split_load_script(f.read())
+        if not part_copies or any(source is None
+                                  for _, source, _ in part_copies):
+            return None
+        if not container_utils.can_load_concurrently(preamble, postamble):
+            logging.info('Loading {} in one session.'.format(load_script))
+            return None
+
+        # every session runs in the part's folder with its settings
+        header = [u'\\cd {}/{}'.format(EXPORT_DATA_MOUNT, folder)] + preamble
+        for copy_index, (table, source, statement) in enumerate(part_copies):
+            job = 'load/{:03d}-{:04d}-{}.sql'.format(
+                part_index, copy_index, re.sub(r'\W', '_', table))
+            load_files[job] = u'\n'.join(header + [statement]) + u'\n'
+            if source.startswith(EXPORT_DATA_MOUNT + '/'):
+                # server side COPY reads from the mount in the container
+                source_file = os.path.join(
+                    export_data_folder, source[len(EXPORT_DATA_MOUNT) + 1:])
+            else:
+                source_file = os.path.join(host_folder, source)
+            copies.append((os.path.getsize(source_file)
+                           if os.path.isfile(source_file) else 0, job))
+        if postamble:
+            job = 'load/{:03d}-finish.sql'.format(part_index)
+            load_files[job] = u'\n'.join(header + postamble) + u'\n'
+            finish_jobs.append(job)
+
+    copy_jobs = [job for _, job in
+                 sorted(copies, key=lambda copy: copy[0], reverse=True)]
+    return load_files, copy_jobs, finish_jobs
+
+
 def create_postgres_container(docker_client, container_name, database_name,
                               create_container_args):
     if not docker_client.images(name=POSTGRES_DOCKER_IMAGE):
@@ -198,7 +354,10 @@ def create_postgres_container(docker_client, container_name, database_name,
 def create_from_export_request_id(export_request_id, docker_client,
                                   container_name=None,
                                   database_name=None,
-                                  database_password=''):
+                                  database_password='',
+                                  download_segments=1,
+                                  use_cache=True,
+                                  load_sessions=None):
     """
     Create a docker container containing the export data from a given
     export request. Container and database name will be inferred as the
@@ -208,24 +367,82 @@ def create_from_export_request_id(export_request_id, docker_client,
     :param container_name:
     :param database_name:
     :param database_password:
+    :param download_segments: concurrent byte ranges for the archive download
+    :param use_cache: reuse a previously downloaded archive
+    :param load_sessions: concurrent database sessions loading tables
     :return container_id:
     """
-    export_request = exports.api.get(export_request_id)[0]
-
-    if export_request.export_type != EXPORT_TYPE_TABLES:
-        raise ValueError('Invalid Export Type. (Only tables exports supported.'
-                         'Given [{}])'.format(export_request.export_type))
-
-    logging.info('Downloading export {}'.format(export_request_id))
-    downloaded_files = export_utils.download(
-        export_request, dest=COURSERA_LOCAL_FOLDER)
-    dest = os.path.join(COURSERA_LOCAL_FOLDER, export_request_id)
-    for f in downloaded_files:
-        container_utils.extract_zip_archive(
-            archive=f,
-            dest=dest,
-            delete_archive=True)
-
+    return create_from_export_request_ids(
+        [export_request_id], docker_client,
+        container_name=container_name,
+        database_name=database_name,
+        database_password=database_password,
+        download_segments=download_segments,
+        use_cache=use_cache,
+        load_sessions=load_sessions)
+
+
+def create_from_export_request_ids(export_request_ids, docker_client,
+                                   container_name=None,
+                                   database_name=None,
+                                   database_password='',
+                                   download_segments=1,
+                                   use_cache=True,
+                                   parallel=None,
+                                   load_sessions=None):
+    """
+    Create a docker container with the data of a tables export that was
+    requested in several parts (see jobs request tables --split_schemas),
+    loading every part into the same database. The parts are downloaded
+    concurrently.
+    :param export_request_ids: parts of one export, all for the same scope
+    :param docker_client:
+    :param container_name:
+    :param database_name:
+    :param database_password:
+    :param download_segments: concurrent byte ranges for each archive
+    :param use_cache: reuse previously downloaded archives
+    :param parallel: number of parts downloaded at once, all by default
+    :param load_sessions: concurrent database sessions loading tables, the
+        number of cores by default
+    :return container_id:
+    """
+    export_requests = exports.concurrent_api.get(export_request_ids)
+
+    for export_request in export_requests:
+        if export_request.export_type != EXPORT_TYPE_TABLES:
+            raise ValueError(
+                'Invalid Export Type. (Only tables exports supported.'
+                'Given [{}])'.format(export_request.export_type))
+    if len(set(export_request.scope_id
+               for export_request in export_requests)) > 1:
+        raise ValueError('Export requests {} are for different scopes.'
+                         .format(', '.join(export_request_ids)))
+
+    dest = os.path.join(COURSERA_LOCAL_FOLDER, export_request_ids[0])
+    if len(export_requests) > 1:
+        dest += '-parts'
+
+    def download_part(export_request):
+        logging.info('Downloading export {}'.format(export_request.id))
+        part_dest = (os.path.join(dest, export_request.id)
+                     if len(export_requests) > 1 else dest)
+        downloaded_files = export_utils.download(
+            export_request, dest=part_dest,
+            segments=download_segments, use_cache=use_cache)
+        for f in downloaded_files:
+            container_utils.extract_zip_archive(
+                archive=f,
+                dest=part_dest,
+                delete_archive=True)
+
+    results = export_utils.parallel_map(
+        download_part, export_requests, parallel or len(export_requests))
+    for export_request, _, error in results:
+        if error:
+            raise error
+
+    export_request = export_requests[0]
     container_id = create_from_folder(
         export_data_folder=dest,
         docker_client=docker_client,
@@ -234,7 +451,11 @@ def create_from_export_request_id(export_request_id, docker_client,
         container_name=(container_name if container_name
                         else export_request.scope_name),
         database_password=(database_password if database_password
-                           else '')
+                           else ''),
+        part_folders=([export_request.id
+                       for export_request in export_requests]
+                      if len(export_requests) > 1 else None),
+        load_sessions=load_sessions
     )
 
     shutil.rmtree(dest)
@@ -16,11 +16,20 @@ import argparse
 from io import BytesIO
 import logging
 import os
+import re
+import socket
+import struct
 import tarfile
+import threading
 import time
 import zipfile
 
-from docker import Client
+from courseraresearchexports.constants.container_constants import \
+    POSTGRES_CANNOT_CONNECT_NOW, POSTGRES_PROTOCOL_VERSION
+from courseraresearchexports.lazy import lazy_callable
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+
+Client = lazy_callable('docker', 'Client')
 
 
 def extract_zip_archive(archive, dest, delete_archive=True):
@@ -33,8 +42,11 @@ def extract_zip_archive(archive, dest, delete_archive=True):
     """
     try:
         logging.debug('Extracting archive to {}'.format(dest))
-        with zipfile.ZipFile(archive, 'r') as z:
-            z.extractall(dest)
+        with MetricsRecorder.default().timed(
+                'extract', rates=['bytes'], archive=os.path.basename(archive),
+                bytes=os.path.getsize(archive)):
+            with zipfile.ZipFile(archive, 'r') as z:
+                z.extractall(dest)
         if delete_archive:
             os.remove(archive)
     except:
@@ -43,26 +55,97 @@ def extract_zip_archive(archive, dest, delete_archive=True):
         raise
 
 
-def create_tar_archive(str, name='init-user-db.sh'):
+COPY_STATEMENT_PATTERN = re.compile(
+    r'^\\?copy\s+("[^"]+"|[\w.]+)', re.IGNORECASE)
+COPY_SOURCE_PATTERN = re.compile(r"\sfrom\s+'([^']+)'", re.IGNORECASE)
+SETTING_PATTERN = re.compile(r'^set\s', re.IGNORECASE)
+TRANSACTION_CONTROL_PATTERN = re.compile(
+    r'^(abort|begin|commit|end|prepare\s+transaction|release|rollback|'
+    r'savepoint|start\s+transaction)\b|^\\set\s+autocommit\b',
+    re.IGNORECASE)
+
+
+def create_tar_archive(str, name='init-user-db.sh', files=None):
     """
     Creates tar archive to load single file as suggested by
     https://gist.github.com/zbyte64/6800eae10ce082bb78f0b7a2cca5cbc2
+    :param str: contents of the file
+    :param name: name of the file
+    :param files: more files to add, {path: contents}
     """
     archive_tarstream = BytesIO()
     archive_file = tarfile.TarFile(fileobj=archive_tarstream, mode='w')
 
-    file_data = str.encode('utf8')
-    file_info = tarfile.TarInfo(name)
-    file_info.size = len(file_data)
-    file_info.mtime = time.time()
+    for file_name, contents in [(name, str)] + sorted((files or {}).items()):
+        file_data = contents.encode('utf8')
+        file_info = tarfile.TarInfo(file_name)
+        file_info.size = len(file_data)
+        file_info.mtime = time.time()
+        archive_file.addfile(file_info, BytesIO(file_data))
 
-    archive_file.addfile(file_info, BytesIO(file_data))
     archive_file.close()
     archive_tarstream.seek(0)
 
     return archive_tarstream
 
 
+def split_load_script(sql_text):
+    """
+    Split the load.sql script of an export into its COPY statements, which
+    can run in separate sessions, and the statements around them.
+    :param sql_text:
+    :return preamble, copies, postamble: statements before the first COPY,
+        [(table, source file, statement)] and statements after the last COPY
+    """
+    statements = []
+    buffered = []
+    for line in sql_text.splitlines():
+        stripped = line.strip()
+        if not buffered and (not stripped or stripped.startswith('--')):
+            continue
+        if not buffered and stripped.startswith('\\'):
+            # psql meta-commands, such as \copy, end with the line
+            statements.append(stripped)
+            continue
+        buffered.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(buffered))
+            buffered = []
+    if buffered:
+        statements.append('\n'.join(buffered))
+
+    preamble, copies, postamble = [], [], []
+    for statement in statements:
+        copy_match = COPY_STATEMENT_PATTERN.match(statement.strip())
+        if copy_match:
+            source_match = COPY_SOURCE_PATTERN.search(statement)
+            copies.append((copy_match.group(1).strip('"'),
+                           source_match.group(1) if source_match else None,
+                           statement))
+        elif copies:
+            # including statements between copies, which run after them
+            postamble.append(statement)
+        else:
+            preamble.append(statement)
+    return preamble, copies, postamble
+
+
+def can_load_concurrently(preamble, postamble):
+    """
+    Whether the copies of a load.sql script split by split_load_script can
+    run in separate sessions: every session repeats the preamble, so it may
+    only change settings, and a transaction around the copies would be lost.
+    :param preamble:
+    :param postamble:
+    :return canLoadConcurrently: Boolean
+    """
+    if not all(SETTING_PATTERN.match(statement.strip())
+               for statement in preamble):
+        return False
+    return not any(TRANSACTION_CONTROL_PATTERN.match(statement.strip())
+                   for statement in preamble + postamble)
+
+
 def get_next_available_port(containers_info):
     """
     Find next available port to map postgres port to host.
@@ -86,6 +169,86 @@ def is_container_running(container_name, docker_client):
     return container_details['State']['Running']
 
 
+class LogWatcher(threading.Thread):
+    """
+    Follows the log stream of a container on a background thread and sets
+    `seen` once `message` is logged, or `ended` if the stream closes first,
+    e.g. because the container stopped. The stream is read until it closes,
+    so the thread is a daemon.
+    """
+
+    def __init__(self, container_name, docker_client, message):
+        threading.Thread.__init__(self, name='log-watcher')
+        self.daemon = True
+        self.container_name = container_name
+        self.docker_client = docker_client
+        self.message = message
+        self.seen = threading.Event()
+        self.ended = threading.Event()
+
+    def run(self):
+        try:
+            # keep the end of the previous chunk, the message may be split
+            tail = ''
+            for chunk in self.docker_client.logs(
+                    self.container_name, stream=True, follow=True):
+                tail = tail[-len(self.message):] + chunk
+                if self.message in tail:
+                    self.seen.set()
+                    return
+        except Exception as e:
+            logging.debug('Log stream of {} failed: {}'.format(
+                self.container_name, e))
+        finally:
+            self.ended.set()
+
+
+def is_database_ready(host, port, database_name, timeout=1.0):
+    """
+    Probe a postgres server the way pg_isready does: connect and send a
+    startup message. The server is ready if it answers with anything but
+    the error of a database that is still starting up, including errors
+    about authentication.
+    :param host:
+    :param port:
+    :param database_name:
+    :param timeout: seconds
+    :return is_ready: Boolean
+    """
+    parameters = 'user\0postgres\0database\0{}\0\0'.format(
+        database_name).encode('utf8')
+    try:
+        connection = socket.create_connection((host, port), timeout)
+    except socket.error:
+        return False
+    try:
+        connection.sendall(struct.pack(
+            '!ii', len(parameters) + 8, POSTGRES_PROTOCOL_VERSION) +
+            parameters)
+        header = _receive(connection, 5)
+        if len(header) < 5:
+            return False
+        if header[0:1] != b'E':
+            return True
+        length, = struct.unpack('!i', header[1:])
+        fields = _receive(connection, length - 4).split(b'\0')
+        return ('C' + POSTGRES_CANNOT_CONNECT_NOW).encode('utf8') not in fields
+    except socket.error:
+        return False
+    finally:
+        connection.close()
+
+
+def _receive(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
 def docker_client_arg_parser():
     """Builds an argparse parser for docker client connection flags."""
     # The following subcommands operate on a single containers. We centralize
@@ -14,16 +14,18 @@
 
 import os
 import logging
-import pkg_resources
 import subprocess
 
 from courseraresearchexports.constants.container_constants import \
     POSTGRES_DOCKER_IMAGE
 from courseraresearchexports.models.ContainerInfo import ContainerInfo
+from courseraresearchexports.lazy import lazy_module
 from courseraresearchexports.models.ExportDb import ExportDb
 from courseraresearchexports.constants.db_constants import \
     HASHED_USER_ID_COLUMN_TO_SOURCE_TABLE
 
+pkg_resources = lazy_module('pkg_resources')
+
 
 def replace_user_id_placeholders(export_db, sql_text):
     """
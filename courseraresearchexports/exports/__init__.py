@@ -1,6 +1,11 @@
 __all__ = [
     "api",
-    "utils"
+    "utils",
+    "cache",
+    "concurrent_api",
+    "wait",
+    "batch",
+    "shards"
 ]
 
 from . import *  # noqa
@@ -16,27 +16,66 @@
 Coursera's wrapper for data exports API.
 """
 
-import requests
-from courseraoauth2client import oauth2
+from datetime import datetime
+
+from courseraresearchexports.lazy import lazy_module
+from courseraresearchexports.models.ApiClient import ApiClient
 from courseraresearchexports.models.utils import requests_response_to_model
 from courseraresearchexports.constants.api_constants import \
-    RESEARCH_EXPORTS_APP, RESEARCH_EXPORTS_API, CLICKSTREAM_API
+    RESEARCH_EXPORTS_API, CLICKSTREAM_API, EXPORT_STATUS_SUCCESSFUL, \
+    EXPORT_STATUSES_IN_PROGRESS, JOBS_PAGE_SIZE
 from courseraresearchexports.models.ExportRequestWithMetadata import \
     ExportRequestWithMetadata
+from courseraresearchexports.models.JobIndex import JobIndex
 
+requests = lazy_module('requests')
 
-@requests_response_to_model(ExportRequestWithMetadata.from_response)
-def get(export_job_id):
+
+def get(export_job_id, max_age=None, refresh=False):
     """
     Use Coursera's Research Export Resource to get a data export job given an
-    export job id.
+    export job id. Responses are kept in the local job index: finished jobs
+    are served from it, jobs still running are served from it for max_age
+    seconds and then revalidated with a conditional request.
     :param export_job_id:
+    :param max_age: defaults to the TTL of the default JobIndex
+    :param refresh: skip the index and fetch the job again
     :return export_request_with_metadata: [ExportRequestWithMetaData]
     """
-    auth = oauth2.build_oauth2(app=RESEARCH_EXPORTS_APP).build_authorizer()
-    response = requests.get(
+    job_index = JobIndex.default()
+    cached, fetched_at, etag = job_index.get_cached(export_job_id)
+    if cached is not None and not refresh:
+        if job_index.is_fresh(cached, fetched_at, max_age):
+            return [cached]
+    else:
+        etag = None
+
+    export_requests, etag = _get(export_job_id, etag)
+    if export_requests is None:
+        job_index.touch(export_job_id)
+        return [cached]
+
+    job_index.upsert(export_requests, etags={export_job_id: etag})
+    return export_requests
+
+
+@requests_response_to_model(
+    lambda response: (
+        None if response.status_code == requests.codes.not_modified
+        else ExportRequestWithMetadata.from_response(response),
+        response.headers.get('ETag')))
+def _get(export_job_id, etag=None):
+    """
+    Fetch a data export job, conditionally if etag is given.
+    :param export_job_id:
+    :param etag: ETag of the cached job
+    :return (export_requests, etag): export_requests is None if the job did
+        not change
+    """
+    headers = {'If-None-Match': etag} if etag else None
+    response = ApiClient.default().get(
         url=requests.compat.urljoin(RESEARCH_EXPORTS_API, export_job_id),
-        auth=auth)
+        headers=headers)
 
     return response
 
@@ -48,15 +87,77 @@ def get_all():
     requests created by a user. Limited to the 100 most recent requests.
     :return export_requests: [ExportRequestWithMetaData]
     """
-    auth = oauth2.build_oauth2(app=RESEARCH_EXPORTS_APP).build_authorizer()
-    response = requests.get(
+    response = ApiClient.default().get(
         url=RESEARCH_EXPORTS_API,
-        auth=auth,
         params={'q': 'my'})
 
     return response
 
 
+def find_existing(export_request, max_age, candidates=None):
+    """
+    Most recent of a user's recent export jobs created within max_age that
+    asks for the same data as export_request (see ExportRequest.matches).
+    Completed jobs are preferred over jobs still running; failed jobs are
+    never returned.
+    :param export_request: ExportRequest
+    :param max_age: timedelta
+    :param candidates: jobs to search, by default the result of get_all()
+    :return export_request_with_metadata: ExportRequestWithMetadata, or None
+    """
+    if candidates is None:
+        candidates = get_all()
+    created_after = datetime.now() - max_age
+    matching = sorted(
+        [existing for existing in candidates
+         if existing.created_at >= created_after and
+         existing.matches(export_request)],
+        key=lambda existing: existing.created_at, reverse=True)
+
+    for statuses in [[EXPORT_STATUS_SUCCESSFUL], EXPORT_STATUSES_IN_PROGRESS]:
+        for existing in matching:
+            if existing.status in statuses:
+                return existing
+    return None
+
+
+def iter_all(page_size=JOBS_PAGE_SIZE):
+    """
+    Lazily walk every data export job request created by a user, fetching
+    one page of page_size requests at a time. Requests come in the order the
+    API lists them, which is not documented.
+    :param page_size:
+    :return export_requests: generator of ExportRequestWithMetadata
+    """
+    start = None
+    while True:
+        export_requests, start = _get_all_page(start, page_size)
+        for export_request in export_requests:
+            yield export_request
+        if not start or not export_requests:
+            return
+
+
+@requests_response_to_model(
+    lambda response: (ExportRequestWithMetadata.from_response(response),
+                      response.json().get('paging', {}).get('next')))
+def _get_all_page(start, page_size):
+    """
+    One page of a user's data export job requests.
+    :param start: cursor from the previous page, or None for the first page
+    :param page_size:
+    :return (export_requests, next_start):
+    """
+    params = {'q': 'my', 'limit': page_size}
+    if start:
+        params['start'] = start
+    response = ApiClient.default().get(
+        url=RESEARCH_EXPORTS_API,
+        params=params)
+
+    return response
+
+
 @requests_response_to_model(ExportRequestWithMetadata.from_response)
 def post(export_request):
     """
@@ -64,11 +165,9 @@ def post(export_request):
     :param export_request:
     :return export_request_with_metadata: [ExportRequestWithMetadata]
     """
-    auth = oauth2.build_oauth2(app=RESEARCH_EXPORTS_APP).build_authorizer()
-    response = requests.post(
+    response = ApiClient.default().post(
         url=RESEARCH_EXPORTS_API,
-        json=export_request.to_json(),
-        auth=auth)
+        json=export_request.to_json())
 
     return response
 
@@ -79,10 +178,8 @@ def get_clickstream_download_links(clickstream_download_links_request):
     Return the download links for clickstream exports in a given scope.
     :param clickstream_download_links_request: ClickstreamDownloadLinksRequest
     """
-    auth = oauth2.build_oauth2(app=RESEARCH_EXPORTS_APP).build_authorizer()
-    response = requests.post(
+    response = ApiClient.default().post(
         url=CLICKSTREAM_API,
-        params=clickstream_download_links_request.to_url_params(),
-        auth=auth)
+        params=clickstream_download_links_request.to_url_params())
 
     return response
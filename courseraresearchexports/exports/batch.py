@@ -0,0 +1,175 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Submission of many export requests described in a manifest file.
+"""
+
+import csv
+
+from courseraresearchexports.constants.api_constants import \
+    ANONYMITY_LEVEL_COORDINATOR, EXPORT_TYPE_CLICKSTREAM, \
+    EXPORT_TYPE_TABLES, REQUEST_BATCH_BURST, REQUEST_BATCH_RATE, SCHEMA_NAMES
+from courseraresearchexports.exports import concurrent_api
+from courseraresearchexports.exports.utils import parallel_map
+from courseraresearchexports.models.ApiClient import ApiClient
+from courseraresearchexports.models.ExportRequest import ExportRequest
+from courseraresearchexports.models.TokenBucket import TokenBucket
+
+SCOPE_COLUMNS = ['course_id', 'course_slug', 'partner_id',
+                 'partner_short_name', 'group_id']
+RESULT_COLUMNS = ['row', 'export_type', 'scope', 'scope_id', 'job_id',
+                  'error']
+
+
+def read_manifest(filename):
+    """
+    Rows of a CSV manifest with a header row, or of a YAML manifest holding a
+    list of mappings. Each row describes one export request with the columns
+    export_type (tables or clickstream), one of SCOPE_COLUMNS, purpose,
+    user_id_hashing, schemas (space separated), interval_start, interval_end
+    and ignore_existing. Empty values are treated as missing.
+    :param filename: .csv, .yaml or .yml file
+    :return rows: [dict]
+    """
+    if filename.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('Reading YAML manifests requires PyYAML, '
+                             'install it with: pip install pyyaml')
+        with open(filename, 'r') as f:
+            rows = yaml.safe_load(f) or []
+    else:
+        with open(filename, 'rb') as f:
+            rows = list(csv.DictReader(f))
+
+    return [dict((key.strip(), value) for key, value in row.items()
+                 if key and value not in (None, ''))
+            for row in rows]
+
+
+def export_request_from_row(row, defaults=None):
+    """
+    Build the export request described by a manifest row. Course slugs and
+    partner short names are resolved through the lookup cache.
+    :param row: dict, see read_manifest
+    :param defaults: values used for columns missing from the row
+    :return export_request: ExportRequest
+    """
+    values = dict(defaults or {})
+    values.update(row)
+
+    if not any(values.get(column) for column in SCOPE_COLUMNS):
+        raise ValueError('Row needs one of the columns: {}'.format(
+            ', '.join(SCOPE_COLUMNS)))
+    if not values.get('purpose'):
+        raise ValueError('Row needs a purpose.')
+
+    scope_args = dict((column, values.get(column))
+                      for column in SCOPE_COLUMNS)
+    export_type = values.get('export_type', 'tables')
+
+    if export_type == 'tables':
+        schemas = values.get('schemas') or SCHEMA_NAMES
+        if isinstance(schemas, basestring):
+            schemas = schemas.split()
+        unknown_schemas = set(schemas) - set(SCHEMA_NAMES)
+        if unknown_schemas:
+            raise ValueError('Unknown schemas: {}'.format(
+                ', '.join(sorted(unknown_schemas))))
+        return ExportRequest.from_args(
+            user_id_hashing=values.get('user_id_hashing', 'isolated'),
+            statement_of_purpose=values['purpose'],
+            export_type=EXPORT_TYPE_TABLES,
+            schema_names=schemas,
+            **scope_args)
+
+    elif export_type == 'clickstream':
+        interval = None
+        if values.get('interval_start') or values.get('interval_end'):
+            interval = [str(values.get('interval_start')),
+                        str(values.get('interval_end'))]
+        return ExportRequest.from_args(
+            anonymity_level=ANONYMITY_LEVEL_COORDINATOR,
+            statement_of_purpose=values['purpose'],
+            export_type=EXPORT_TYPE_CLICKSTREAM,
+            interval=interval,
+            ignore_existing=str(values.get('ignore_existing')).lower() in
+            ('true', 'yes', '1'),
+            **scope_args)
+
+    raise ValueError('Unknown export_type {}, expected tables or '
+                     'clickstream.'.format(export_type))
+
+
+def submit(rows, defaults=None, max_concurrency=None,
+           rate=REQUEST_BATCH_RATE, burst=REQUEST_BATCH_BURST):
+    """
+    Create one export request per manifest row from a single process. Rows
+    are turned into requests concurrently, then posted on a worker pool
+    through a token bucket so that large sweeps stay under the API's rate
+    limits. A row that fails does not stop the others.
+    :param rows: [dict], see read_manifest
+    :param defaults: see export_request_from_row
+    :param max_concurrency: defaults to the API client's pool size
+    :param rate: average number of requests posted per second
+    :param burst: number of requests that may be posted at once
+    :return results: [dict] with the RESULT_COLUMNS of each row
+    """
+    if max_concurrency is None:
+        max_concurrency = ApiClient.default().pool_size
+
+    built = parallel_map(lambda row: export_request_from_row(row, defaults),
+                         rows, max_concurrency)
+    to_post = [(index, export_request)
+               for index, (_, export_request, error) in enumerate(built)
+               if not error]
+    posted = concurrent_api.post(
+        [export_request for _, export_request in to_post],
+        max_concurrency=max_concurrency,
+        return_exceptions=True,
+        rate_limiter=TokenBucket(rate, burst))
+    posted_by_index = dict(zip([index for index, _ in to_post], posted))
+
+    default_export_type = (defaults or {}).get('export_type', 'tables')
+    results = []
+    for index, (row, export_request, error) in enumerate(built):
+        created = posted_by_index.get(index, error)
+        failed = isinstance(created, Exception)
+        results.append({
+            'row': index + 1,
+            'export_type': row.get('export_type', default_export_type),
+            'scope': next((row[column] for column in SCOPE_COLUMNS
+                           if row.get(column)), None),
+            'scope_id': export_request.scope_id if export_request else None,
+            'job_id': None if failed else created.id,
+            'error': str(created) if failed else None})
+    return results
+
+
+def write_results(results, filename):
+    """
+    Write submission results as CSV, one row per manifest row.
+    :param results: see submit
+    :param filename:
+    """
+    with open(filename, 'wb') as f:
+        writer = csv.DictWriter(f, RESULT_COLUMNS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow(dict(
+                (column, value.encode('utf8')
+                 if isinstance(value, unicode) else value)
+                for column, value in result.items()))
@@ -0,0 +1,177 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local cache of downloaded export files, shared between `jobs download` and
+`containers create`.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from courseraresearchexports.constants.download_constants import \
+    DOWNLOAD_CACHE_FOLDER, DOWNLOAD_CACHE_MAX_BYTES
+
+
+class DownloadCache:
+    """
+    Files keyed by export request id and file name. The files of an export
+    request never change, so entries are only removed by least recently used
+    eviction once the cache grows past max_bytes. A lock file serializes
+    access between concurrent processes.
+    """
+
+    INDEX_FILENAME = 'index.json'
+    LOCK_FILENAME = '.lock'
+
+    def __init__(self, folder=DOWNLOAD_CACHE_FOLDER,
+                 max_bytes=DOWNLOAD_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._thread_lock = threading.Lock()
+
+    @staticmethod
+    def key(export_request_id, filename):
+        return hashlib.sha1('{}/{}'.format(
+            export_request_id, filename).encode('utf8')).hexdigest()
+
+    def fetch(self, export_request_id, filename, dest_filename):
+        """
+        Place a cached copy of the file at dest_filename.
+        :param export_request_id:
+        :param filename: file name from the download link
+        :param dest_filename:
+        :return hit: whether the file was found in the cache
+        """
+        key = self.key(export_request_id, filename)
+        with self._locked():
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return False
+            cached_filename = os.path.join(self.folder, entry['path'])
+            if not os.path.exists(cached_filename):
+                del index[key]
+                self._save_index(index)
+                return False
+
+            _link_or_copy(cached_filename, dest_filename)
+            entry['last_access'] = time.time()
+            self._save_index(index)
+
+        logging.info('Using cached copy of {}'.format(filename))
+        return True
+
+    def store(self, export_request_id, filename, src_filename):
+        """
+        Add a downloaded file to the cache, evicting least recently used
+        entries to stay under max_bytes.
+        :param export_request_id:
+        :param filename: file name from the download link
+        :param src_filename: downloaded file, left in place
+        """
+        size = os.path.getsize(src_filename)
+        if size > self.max_bytes:
+            logging.debug('{} is larger than the download cache.'.format(
+                filename))
+            return
+
+        key = self.key(export_request_id, filename)
+        path = os.path.join(key, filename)
+        with self._locked():
+            index = self._load_index()
+            cached_filename = os.path.join(self.folder, path)
+            if not os.path.exists(os.path.dirname(cached_filename)):
+                os.makedirs(os.path.dirname(cached_filename))
+            _link_or_copy(src_filename, cached_filename)
+            index[key] = {
+                'export_request_id': export_request_id,
+                'path': path,
+                'size': size,
+                'last_access': time.time()}
+            self._evict(index, keep=key)
+            self._save_index(index)
+
+    def _evict(self, index, keep=None):
+        total = sum(entry['size'] for entry in index.values())
+        by_age = sorted(index.items(), key=lambda item: item[1]['last_access'])
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            logging.debug('Evicting {} from download cache.'.format(
+                entry['path']))
+            shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
+            total -= entry['size']
+            del index[key]
+
+    @contextmanager
+    def _locked(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        with self._thread_lock:
+            with open(os.path.join(self.folder, self.LOCK_FILENAME),
+                      'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        index_filename = os.path.join(self.folder, self.INDEX_FILENAME)
+        if not os.path.exists(index_filename):
+            return {}
+        try:
+            with open(index_filename, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            logging.warning('Download cache index is unreadable, starting '
+                            'with an empty cache.')
+            return {}
+
+    def _save_index(self, index):
+        index_filename = os.path.join(self.folder, self.INDEX_FILENAME)
+        with open(index_filename + '.tmp', 'w') as f:
+            json.dump(index, f)
+        if os.path.exists(index_filename):
+            os.remove(index_filename)
+        os.rename(index_filename + '.tmp', index_filename)
+
+
+def _link_or_copy(src, dest):
+    """
+    Hard link src to dest so the cache costs no extra disk space, copying
+    when linking is not possible (e.g. across file systems).
+    """
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except (AttributeError, OSError):
+        shutil.copy2(src, dest)
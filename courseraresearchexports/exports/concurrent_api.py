@@ -0,0 +1,97 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Concurrent variants of the data exports API wrappers for working with many
+export jobs at once. Calls run on a bounded thread pool and share the
+connection pool and authorizer of the default ApiClient.
+"""
+
+import logging
+
+from courseraresearchexports.exports import api
+from courseraresearchexports.exports.utils import parallel_map
+from courseraresearchexports.models.ApiClient import ApiClient
+
+
+def get(export_job_ids, max_concurrency=None, return_exceptions=False,
+        max_age=None):
+    """
+    Get several data export jobs given their export job ids.
+    :param export_job_ids:
+    :param max_concurrency: defaults to the API client's pool size
+    :param return_exceptions: return the exception raised for a job in its
+        place instead of raising once every job has been fetched
+    :param max_age: see exports.api.get
+    :return export_requests: [ExportRequestWithMetadata] in the order of
+        export_job_ids
+    """
+    return _gather(lambda export_job_id: api.get(
+        export_job_id, max_age=max_age)[0],
+                   export_job_ids, max_concurrency, return_exceptions)
+
+
+def post(export_requests, max_concurrency=None, return_exceptions=False,
+         rate_limiter=None):
+    """
+    Create several data export jobs.
+    :param export_requests: [ExportRequest]
+    :param max_concurrency: defaults to the API client's pool size
+    :param return_exceptions: return the exception raised for a request in
+        its place instead of raising once every request has been sent
+    :param rate_limiter: TokenBucket acquired before each request, if given
+    :return export_requests_with_metadata: [ExportRequestWithMetadata] in the
+        order of export_requests
+    """
+    def post_one(export_request):
+        if rate_limiter:
+            rate_limiter.acquire()
+        return api.post(export_request)[0]
+
+    return _gather(post_one, export_requests, max_concurrency,
+                   return_exceptions)
+
+
+def get_clickstream_download_links(clickstream_download_links_requests,
+                                   max_concurrency=None,
+                                   return_exceptions=False):
+    """
+    Return the download links for several clickstream scopes or intervals.
+    :param clickstream_download_links_requests:
+        [ClickstreamDownloadLinksRequest]
+    :param max_concurrency: defaults to the API client's pool size
+    :param return_exceptions: return the exception raised for a request in
+        its place instead of raising once every request has been sent
+    :return download_links: [[link]] in the order of the requests
+    """
+    return _gather(api.get_clickstream_download_links,
+                   clickstream_download_links_requests, max_concurrency,
+                   return_exceptions)
+
+
+def _gather(func, items, max_concurrency, return_exceptions):
+    if max_concurrency is None:
+        max_concurrency = ApiClient.default().pool_size
+
+    results = parallel_map(func, items, max_concurrency)
+
+    failures = [(item, error) for item, _, error in results if error]
+    if failures and not return_exceptions:
+        for item, error in failures:
+            logging.error('Request for {item} failed:\n{error}'.format(
+                item=item, error=error))
+        raise RuntimeError('{failed} of {total} requests failed.'.format(
+            failed=len(failures), total=len(results)))
+
+    return [error if error else result for _, result, error in results]
@@ -0,0 +1,150 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Export requests split into shards that are requested and tracked as
+independent export jobs: clickstream requests by days of their interval,
+tables requests by groups of schemas.
+"""
+
+import logging
+
+from courseraresearchexports.constants.api_constants import \
+    CLICKSTREAM_SHARD_RETRIES, EXPORT_STATUS_TERMINATED
+from courseraresearchexports.exports import concurrent_api
+from courseraresearchexports.exports import wait
+from courseraresearchexports.models.ClickstreamManifest import \
+    split_interval
+from courseraresearchexports.models.ExportRequest import ExportRequest
+
+
+def shard_interval(export_request, days):
+    """
+    Copies of a clickstream export request, one per shard of its interval.
+    :param export_request: ExportRequest with an interval
+    :param days: shard length
+    :return shards: [ExportRequest]
+    """
+    if not export_request.interval:
+        raise ValueError('Only export requests with an interval can be '
+                         'sharded.')
+    shards = []
+    for start, end in split_interval(
+            export_request.interval[0], export_request.interval[1], days):
+        json_request = export_request.to_json()
+        json_request['interval'] = {'start': start, 'end': end}
+        shards.append(ExportRequest.from_json(json_request))
+    return shards
+
+
+def schema_groups(schema_names, groups=None):
+    """
+    Split schema_names into groups.
+    :param schema_names: schemas of the logical request
+    :param groups: [[schema_name]] to request together, schemas not in any
+        group are requested together as a last group; by default every
+        schema is requested on its own
+    :return groups: [[schema_name]], without empty groups
+    """
+    if groups is None:
+        return [[schema_name] for schema_name in schema_names]
+    grouped = [[schema_name for schema_name in group
+                if schema_name in schema_names] for group in groups]
+    in_groups = set(sum(grouped, []))
+    grouped.append([schema_name for schema_name in schema_names
+                    if schema_name not in in_groups])
+    return [group for group in grouped if group]
+
+
+def shard_schemas(export_request, groups):
+    """
+    Copies of a tables export request, one per group of schemas.
+    :param export_request: ExportRequest
+    :param groups: [[schema_name]], see schema_groups
+    :return shards: [ExportRequest]
+    """
+    shards = []
+    for group in groups:
+        json_request = export_request.to_json()
+        json_request['schemaNames'] = group
+        shards.append(ExportRequest.from_json(json_request))
+    return shards
+
+
+def describe(shard_request):
+    """
+    Short description of what part of the logical request a shard covers.
+    """
+    if shard_request.interval:
+        return ' to '.join(shard_request.interval)
+    return ', '.join(shard_request.schema_names or [])
+
+
+def request(shards, max_concurrency=None):
+    """
+    Create an export job per shard.
+    :param shards: [ExportRequest]
+    :param max_concurrency: see concurrent_api.post
+    :return jobs: [ExportRequestWithMetadata or Exception] in the order of
+        shards
+    """
+    jobs = concurrent_api.post(shards, max_concurrency=max_concurrency,
+                               return_exceptions=True)
+    for shard_request, job in zip(shards, jobs):
+        if isinstance(job, Exception):
+            logging.error('Requesting shard {} failed: {}'.format(
+                describe(shard_request), job))
+        else:
+            logging.info('Requested shard {} as export request {}.'.format(
+                describe(shard_request), job.id))
+    return jobs
+
+
+def wait_for_shards(shards, jobs, retries=CLICKSTREAM_SHARD_RETRIES,
+                    **wait_kwargs):
+    """
+    Wait for the jobs of every shard, requesting shards again, on their own,
+    if their job was terminated or could not be created. With a `dest` in
+    wait_kwargs, the files of each shard are downloaded to the same folder
+    as soon as its job finishes, so the folder ends up with the whole
+    interval.
+    :param shards: [ExportRequest]
+    :param jobs: result of request(shards)
+    :param retries: number of times a shard is requested again
+    :param wait_kwargs: see exports.wait.wait
+    :return jobs: [ExportRequestWithMetadata] of the successful shards
+    """
+    pending = list(zip(shards, jobs))
+    done = []
+    for attempt in range(retries + 1):
+        finished = wait.wait(
+            [job.id for _, job in pending if not isinstance(job, Exception)],
+            raise_on_terminated=False, **wait_kwargs)
+        failed = [shard_request for shard_request, job in pending
+                  if isinstance(job, Exception) or
+                  finished[job.id].status == EXPORT_STATUS_TERMINATED]
+        done.extend(finished[job.id] for _, job in pending
+                    if not isinstance(job, Exception) and
+                    finished[job.id].status != EXPORT_STATUS_TERMINATED)
+
+        if not failed:
+            return done
+        if attempt < retries:
+            logging.warning('Requesting {} failed shards again (retry {} of '
+                            '{}).'.format(len(failed), attempt + 1, retries))
+            pending = list(zip(failed, request(failed)))
+
+    raise RuntimeError('{} of {} shards failed: {}'.format(
+        len(failed), len(shards), '; '.join(
+            describe(shard_request) for shard_request in failed)))
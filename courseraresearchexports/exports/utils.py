@@ -12,24 +12,54 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import logging
+from multiprocessing.pool import ThreadPool
 import os
+import re
+import time
 from urlparse import urlparse
 
-from tqdm import tqdm
-import requests
-
 from courseraresearchexports.constants.api_constants import \
+    EXPORT_STATUS_TERMINATED, EXPORT_STATUSES_IN_PROGRESS, \
     EXPORT_TYPE_CLICKSTREAM, EXPORT_TYPE_TABLES
+from courseraresearchexports.constants.download_constants import \
+    DOWNLOAD_BACKOFF_SECONDS, DOWNLOAD_CHUNK_SIZE, \
+    DOWNLOAD_MIN_SEGMENT_SIZE, DOWNLOAD_RETRIES, DOWNLOAD_STATE_SUFFIX, \
+    PARTIAL_DOWNLOAD_SUFFIX
 
 from courseraresearchexports.exports import api
+from courseraresearchexports.exports.cache import DownloadCache
+from courseraresearchexports.lazy import lazy_callable, lazy_module
 from courseraresearchexports.models.ClickstreamDownloadLinksRequest import \
     ClickstreamDownloadLinksRequest
+from courseraresearchexports.models.ClickstreamManifest import \
+    ClickstreamManifest, contiguous_intervals, date_range
+from courseraresearchexports.models.DownloadManifest import DownloadManifest
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+
+requests = lazy_module('requests')
+tqdm = lazy_callable('tqdm', 'tqdm')
 
+CLICKSTREAM_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+# S3 ETags of objects uploaded in a single part are the MD5 of the content
+MD5_ETAG_PATTERN = re.compile(r'^"?([0-9a-f]{32})"?$')
 
-def download(export_request, dest):
+
+def download(export_request, dest, parallel=1, segments=1, use_cache=True):
     """
-    Download a data export job using a request id.
+    Download a data export job using a request id. Verified files are
+    recorded in a manifest in dest, and files that are still as recorded are
+    not downloaded again.
+    :param export_request: ExportRequestWithMetadata
+    :param dest: destination folder
+    :param parallel: maximum number of files downloaded concurrently
+    :param segments: number of concurrent byte ranges used to fetch a
+        tables export archive
+    :param use_cache: reuse files from, and add files to, the local
+        download cache
+    :return filenames:
     """
     try:
         is_table_export = export_request.export_type == EXPORT_TYPE_TABLES
@@ -42,8 +72,25 @@ def download(export_request, dest):
             logging.info('Creating destination folder: {}'.format(dest))
             os.makedirs(dest)
 
+        cache = DownloadCache() if use_cache else None
+        manifest = DownloadManifest.load(dest, export_request.id)
+
         if is_table_export:
-            return [download_url(export_request.download_link, dest)]
+            try:
+                return [_download_cached(
+                    export_request.download_link, dest, export_request.id,
+                    cache, manifest=manifest, segments=segments)]
+            except requests.exceptions.HTTPError as err:
+                if not _is_client_error(err):
+                    raise
+                # the job may come from the metadata cache, and download
+                # links expire even though the job itself does not change
+                logging.info('Download link of {} was rejected, fetching a '
+                             'new one.'.format(export_request.id))
+                export_request = api.get(export_request.id, refresh=True)[0]
+                return [_download_cached(
+                    export_request.download_link, dest, export_request.id,
+                    cache, manifest=manifest, segments=segments)]
         elif is_clickstream_export:
             links_request = ClickstreamDownloadLinksRequest.from_args(
                 course_id=export_request.course_id,
@@ -56,7 +103,9 @@ def download(export_request, dest):
                     'means no data was available for the dates in '
                     'the specified interval: {interval}'
                     .format(interval=export_request.interval))
-            return [download_url(link, dest) for link in download_links]
+            return download_urls(download_links, dest, parallel=parallel,
+                                 export_request_id=export_request.id,
+                                 cache=cache, manifest=manifest)
         else:
             raise ValueError('Require export_type is one of {} or {}'.format(
                 EXPORT_TYPE_TABLES,
@@ -67,25 +116,475 @@ def download(export_request, dest):
         raise
 
 
-def download_url(url, dest_folder):
+def download_urls(urls, dest_folder, parallel=1, export_request_id=None,
+                  cache=None, manifest=None):
+    """
+    Download several urls into dest_folder with at most `parallel` downloads
+    in flight. A failed url does not stop the others; failures are logged
+    once every url has been attempted and then raised together.
+    :param urls:
+    :param dest_folder:
+    :param parallel:
+    :param export_request_id: key for the download cache
+    :param cache: DownloadCache, or None to always download
+    :param manifest: DownloadManifest of files already verified in
+        dest_folder, which are not downloaded again
+    :return filenames:
+    """
+    results = parallel_map(
+        lambda url: _download_cached(url, dest_folder, export_request_id,
+                                     cache, manifest=manifest),
+        urls, parallel)
+    _raise_download_failures(results)
+
+    return [filename for _, filename, _ in results]
+
+
+def sync_clickstream(links_request, dest, parallel=1):
+    """
+    Download the clickstream day files in links_request.interval that are
+    not yet in dest. A manifest in dest records the files downloaded for each
+    day of the scope, and download links are only requested for the runs of
+    days missing from it.
+    :param links_request: ClickstreamDownloadLinksRequest with an interval
+    :param dest: destination folder
+    :param parallel: maximum number of files downloaded concurrently
+    :return filenames: newly downloaded files
+    """
+    if not os.path.exists(dest):
+        logging.info('Creating destination folder: {}'.format(dest))
+        os.makedirs(dest)
+
+    manifest = ClickstreamManifest.load(dest, links_request.scope)
+    missing_dates = manifest.missing_dates(
+        links_request.interval[0], links_request.interval[1], dest)
+    logging.info('{} of {} days missing from {}.'.format(
+        len(missing_dates), len(date_range(*links_request.interval)), dest))
+
+    downloaded = []
+    for interval in contiguous_intervals(missing_dates):
+        missing_request = ClickstreamDownloadLinksRequest(
+            course_id=links_request.course_id,
+            partner_id=links_request.partner_id,
+            interval=interval)
+        download_links = api.get_clickstream_download_links(missing_request)
+        if not download_links:
+            logging.info('No clickstream data available for {} to {}.'
+                         .format(*interval))
+            continue
+
+        results = parallel_map(
+            lambda url: download_url(url, dest), download_links, parallel)
+        filenames = [os.path.basename(filename)
+                     for _, filename, error in results if not error]
+        _record_clickstream_files(manifest, interval, filenames)
+        manifest.save(dest)
+        _raise_download_failures(results)
+        downloaded.extend(os.path.join(dest, filename)
+                          for filename in filenames)
+
+    return downloaded
+
+
+def _record_clickstream_files(manifest, interval, filenames):
+    """
+    Attribute downloaded files to the days named in their file names. If no
+    file names carry a date, the files cover the whole interval.
+    """
+    dated = [(CLICKSTREAM_DATE_PATTERN.search(filename), filename)
+             for filename in filenames]
+    if any(match for match, _ in dated):
+        for match, filename in dated:
+            if match:
+                manifest.record(match.group(0), [filename])
+    elif filenames:
+        for date in date_range(*interval):
+            manifest.record(date, filenames)
+
+
+def _raise_download_failures(results):
+    """
+    Log every failed download from parallel_map results, then raise.
+    """
+    failures = [(url, error) for url, _, error in results if error]
+    for url, error in failures:
+        logging.error('Failed to download {url}:\n{error}'.format(
+            url=url, error=error))
+    if failures:
+        raise RuntimeError('{failed} of {total} downloads failed.'.format(
+            failed=len(failures), total=len(results)))
+
+
+def _download_cached(url, dest_folder, export_request_id, cache,
+                     manifest=None, **kwargs):
+    """
+    download_url, short-circuited by the manifest when the file is already
+    verified in dest_folder, and by the download cache when the file of this
+    export request was fetched before.
+    """
+    filename = urlparse(url).path.split('/')[-1]
+    full_filename = os.path.join(dest_folder, filename)
+    if manifest is not None:
+        if manifest.is_verified(dest_folder, filename):
+            logging.info('{} is already downloaded and verified.'.format(
+                filename))
+            return full_filename
+        kwargs['manifest'] = manifest
+
+    if cache is None or export_request_id is None:
+        return download_url(url, dest_folder, **kwargs)
+
+    if cache.fetch(export_request_id, filename, full_filename):
+        # cached files were verified when they were first downloaded
+        if manifest is not None:
+            manifest.record(dest_folder, filename)
+        return full_filename
+
+    full_filename = download_url(url, dest_folder, **kwargs)
+    cache.store(export_request_id, filename, full_filename)
+    return full_filename
+
+
+def parallel_map(func, items, max_workers):
+    """
+    Apply func to every item on a pool of at most max_workers threads.
+    Exceptions are captured per item instead of aborting the batch.
+    :param func: function(item) -> Any
+    :param items:
+    :param max_workers:
+    :return results: [(item, result or None, exception or None)] in the
+        order of items
+    """
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as err:
+            return item, None, err
+
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    pool = ThreadPool(min(max_workers, len(items)))
+    try:
+        # map_async with a timeout keeps the main thread responsive to
+        # KeyboardInterrupt, which a bare map() would swallow.
+        return pool.map_async(call, items).get(60 * 60 * 24 * 365)
+    finally:
+        pool.terminate()
+
+
+def download_url(url, dest_folder, retries=DOWNLOAD_RETRIES, segments=1,
+                 manifest=None):
     """
     Download url to dest_folder/FILENAME, where FILENAME is the last
-    part of the url path.
+    part of the url path. Data is written to FILENAME.part until the transfer
+    is complete, so an interrupted download resumes with a Range request from
+    the last byte written, whether on one of `retries` automatic retries or
+    on a later call. With segments > 1 the file is split into that many byte
+    ranges fetched concurrently, if the server accepts range requests.
+
+    The byte count of every transfer is checked against the size announced
+    by the server. Single stream downloads are also hashed as they are
+    written and compared with the ETag when it is an MD5 digest, as it is
+    for S3 objects uploaded in one part.
+    :param manifest: DownloadManifest to record the verified file in
     """
     filename = urlparse(url).path.split('/')[-1]
     full_filename = os.path.join(dest_folder, filename)
-    response = requests.get(url, stream=True)
-    chunk_size = 1024 * 1024
+    partial_filename = full_filename + PARTIAL_DOWNLOAD_SUFFIX
+    state_filename = partial_filename + DOWNLOAD_STATE_SUFFIX
     logging.debug('Writing to file: {}'.format(full_filename))
 
-    with open(full_filename, 'wb') as f:
+    with MetricsRecorder.default().timed(
+            'download', rates=['bytes'], filename=filename,
+            segments=segments) as metrics:
+        checksum = _Checksum()
+        md5 = None
+        attempt = 0
+        while True:
+            try:
+                if segments <= 1 or not _download_segmented(
+                        url, partial_filename, state_filename, segments,
+                        desc=filename):
+                    _download_to_partial(url, partial_filename, state_filename,
+                                         desc=filename, checksum=checksum)
+                    md5 = checksum.hexdigest()
+                break
+            except (requests.exceptions.RequestException, IOError) as err:
+                if attempt >= retries or _is_client_error(err):
+                    raise
+                delay = DOWNLOAD_BACKOFF_SECONDS * 2 ** attempt
+                attempt += 1
+                logging.warning(
+                    'Download of {filename} interrupted ({err}), resuming in '
+                    '{delay}s (retry {attempt} of {retries}).'.format(
+                        filename=filename, err=err, delay=delay,
+                        attempt=attempt, retries=retries))
+                time.sleep(delay)
+
+        if os.path.exists(full_filename):
+            os.remove(full_filename)
+        os.rename(partial_filename, full_filename)
+        os.remove(state_filename)
+        if manifest is not None:
+            manifest.record(dest_folder, filename, md5=md5)
+        metrics['bytes'] = os.path.getsize(full_filename)
+        metrics['retries'] = attempt
+    return full_filename
+
+
+def _is_client_error(err):
+    """
+    Whether err is an HTTP error that retrying the same request won't fix.
+    """
+    response = getattr(err, 'response', None)
+    return (isinstance(err, requests.exceptions.HTTPError) and
+            response is not None and 400 <= response.status_code < 500 and
+            response.status_code not in (requests.codes.request_timeout,
+                                         requests.codes.too_many_requests))
+
+
+def _download_to_partial(url, partial_filename, state_filename, desc=None,
+                         checksum=None):
+    """
+    Fetch url into partial_filename, continuing from its current size if the
+    saved state shows it belongs to the same remote file. Bytes are counted
+    and hashed into `checksum` as they are written; a checksum kept from an
+    earlier attempt in this process is continued rather than recomputed from
+    the partial file. Raises IOError if the transfer ends before
+    Content-length bytes were written, or if the file does not match an MD5
+    ETag, in which case the partial file is discarded.
+    """
+    if checksum is None:
+        checksum = _Checksum()
+    state = _load_download_state(state_filename)
+    offset = 0
+    if state is not None and 'segments' not in state and \
+            os.path.exists(partial_filename):
+        offset = os.path.getsize(partial_filename)
+
+    if offset:
+        response = requests.get(
+            url, stream=True, headers={'Range': 'bytes={}-'.format(offset)})
+        if response.status_code == 416 and offset == state.get('size'):
+            logging.debug('{} was already fully downloaded.'.format(desc))
+            checksum.catch_up(partial_filename, offset)
+            _verify_md5(checksum, state, partial_filename, state_filename,
+                        desc)
+            return
+
+        if response.status_code == 206 and \
+                _content_range_total(response) == state.get('size') and \
+                response.headers.get('ETag') == state.get('etag'):
+            logging.debug('Resuming {} from byte {}'.format(desc, offset))
+        else:
+            logging.debug('Cannot resume {}, restarting download.'.format(
+                desc))
+            response.close()
+            offset = 0
+
+    if not offset:
+        response = requests.get(url, stream=True)
+        response.raise_for_status()
+        content_length = response.headers.get('Content-length')
+        state = {'size': int(content_length) if content_length else None,
+                 'etag': response.headers.get('ETag')}
+        _save_download_state(state_filename, state)
+
+    size = state['size']
+    checksum.catch_up(partial_filename, offset)
+    with open(partial_filename, 'ab' if offset else 'wb') as f:
         for data in tqdm(
-                iterable=response.iter_content(chunk_size),
-                total=int(response.headers['Content-length']) / chunk_size,
+                iterable=response.iter_content(DOWNLOAD_CHUNK_SIZE),
+                initial=offset / DOWNLOAD_CHUNK_SIZE,
+                total=size / DOWNLOAD_CHUNK_SIZE if size else None,
                 unit='MB',
-                desc=filename):
+                desc=desc):
             f.write(data)
-    return full_filename
+            checksum.update(data)
+
+    if size is not None and checksum.size != size:
+        raise IOError('Incomplete download of {}: received {} of {} bytes.'
+                      .format(desc, checksum.size, size))
+    _verify_md5(checksum, state, partial_filename, state_filename, desc)
+
+
+def _verify_md5(checksum, state, partial_filename, state_filename, desc):
+    """
+    Compare a complete download with the ETag it was fetched with, if that is
+    an MD5 digest. On mismatch the partial file and its state are removed so
+    the next attempt starts over.
+    """
+    match = MD5_ETAG_PATTERN.match(state.get('etag') or '')
+    md5 = checksum.hexdigest()
+    if match is None or match.group(1) == md5:
+        return
+    os.remove(partial_filename)
+    os.remove(state_filename)
+    checksum.reset()
+    raise IOError('Corrupt download of {}: MD5 {} does not match ETag {}.'
+                  .format(desc, md5, match.group(1)))
+
+
+class _Checksum(object):
+    """
+    Running MD5 digest and byte count of a file as it is written.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def update(self, data):
+        self.md5.update(data)
+        self.size += len(data)
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+    def catch_up(self, filename, offset):
+        """
+        Make the checksum cover the first `offset` bytes of filename, reading
+        them only when they were not hashed by an earlier attempt, e.g. when
+        resuming a download left by another process.
+        """
+        if self.size == offset:
+            return
+        self.reset()
+        if not offset:
+            return
+        with open(filename, 'rb') as f:
+            while self.size < offset:
+                data = f.read(min(DOWNLOAD_CHUNK_SIZE, offset - self.size))
+                if not data:
+                    break
+                self.update(data)
+
+
+def _download_segmented(url, partial_filename, state_filename, segments,
+                        desc=None):
+    """
+    Fetch url as concurrent byte ranges written into a preallocated
+    partial_filename. Progress of each range is kept in the saved state so
+    only unfinished ranges are fetched again after a failure.
+    :return handled: False if the server does not advertise range support
+        and the caller should fall back to a single stream
+    """
+    probe = requests.get(url, stream=True, headers={'Range': 'bytes=0-0'})
+    probe.close()
+    size = _content_range_total(probe)
+    if probe.status_code != 206 or size is None or \
+            probe.headers.get('Accept-Ranges', 'bytes') != 'bytes':
+        logging.debug('Range requests not supported for {}, using a single '
+                      'stream.'.format(desc))
+        return False
+    if size < 2 * DOWNLOAD_MIN_SEGMENT_SIZE:
+        logging.debug('{} is too small to split, using a single stream.'
+                      .format(desc))
+        return False
+    etag = probe.headers.get('ETag')
+
+    state = _load_download_state(state_filename)
+    if state is None or 'segments' not in state or \
+            state.get('size') != size or state.get('etag') != etag or \
+            not os.path.exists(partial_filename):
+        state = {'size': size, 'etag': etag,
+                 'segments': _plan_segments(size, segments)}
+        with open(partial_filename, 'wb') as f:
+            f.truncate(size)
+        _save_download_state(state_filename, state)
+
+    remaining = [segment for segment in state['segments']
+                 if segment[0] + segment[2] <= segment[1]]
+    progress = tqdm(
+        total=size,
+        initial=size - sum(end - start + 1 - written
+                           for start, end, written in remaining),
+        unit='B',
+        unit_scale=True,
+        desc=desc)
+    try:
+        results = parallel_map(
+            lambda segment: _download_segment(
+                url, partial_filename, segment, progress),
+            remaining, segments)
+    finally:
+        progress.close()
+        _save_download_state(state_filename, state)
+
+    errors = [error for _, _, error in results if error]
+    if errors:
+        raise errors[0]
+    return True
+
+
+def _plan_segments(size, segments):
+    """
+    Split [0, size) into at most `segments` inclusive byte ranges of at least
+    DOWNLOAD_MIN_SEGMENT_SIZE bytes.
+    :return segments: [[start, end, bytes_written]]
+    """
+    count = max(1, min(segments, size // DOWNLOAD_MIN_SEGMENT_SIZE))
+    segment_size = -(-size // count)
+    return [[start, min(start + segment_size, size) - 1, 0]
+            for start in range(0, size, segment_size)]
+
+
+def _download_segment(url, partial_filename, segment, progress):
+    """
+    Fetch the unwritten remainder of one [start, end, written] byte range
+    into its place in partial_filename, updating `written` as bytes land.
+    """
+    start, end, _ = segment
+    response = requests.get(url, stream=True, headers={
+        'Range': 'bytes={}-{}'.format(start + segment[2], end)})
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise IOError('Server ignored range request for bytes {}-{}'.format(
+            start + segment[2], end))
+
+    with open(partial_filename, 'r+b') as f:
+        f.seek(start + segment[2])
+        for data in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            f.write(data)
+            segment[2] += len(data)
+            progress.update(len(data))
+
+    if start + segment[2] != end + 1:
+        raise IOError('Incomplete download of bytes {}-{}: received {} of '
+                      '{} bytes.'.format(start, end, segment[2],
+                                         end - start + 1))
+
+
+def _content_range_total(response):
+    """
+    Total size of the remote file from a `Content-Range: bytes a-b/total`
+    header, or None if the server did not send one.
+    """
+    content_range = response.headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+def _load_download_state(state_filename):
+    if not os.path.exists(state_filename):
+        return None
+    try:
+        with open(state_filename, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        logging.debug('Ignoring unreadable download state {}'.format(
+            state_filename))
+        return None
+
+
+def _save_download_state(state_filename, state):
+    with open(state_filename, 'w') as f:
+        json.dump(state, f)
 
 
 def _validate(export_request):
@@ -93,14 +592,14 @@ def _validate(export_request):
         export_request.export_type == EXPORT_TYPE_CLICKSTREAM
 
     if not export_request.download_link:
-        if export_request.status in ['PENDING', 'IN_PROGRESS']:
+        if export_request.status in EXPORT_STATUSES_IN_PROGRESS:
             logging.error(
                 'Export request {} is currently {} and is not ready for'
                 'download. Please wait until the request is completed.'
                 .format(export_request.id, export_request.status))
             raise ValueError(
                 'Export request is not yet ready for download')
-        elif export_request.status == 'TERMINATED':
+        elif export_request.status == EXPORT_STATUS_TERMINATED:
             logging.error(
                 'Export request has been TERMINATED. Please contact '
                 'data-support@coursera.org if we have not resolved this '
@@ -0,0 +1,170 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Polling of many export jobs from a single process until they finish.
+"""
+
+import heapq
+import logging
+from multiprocessing.pool import ThreadPool
+import random
+import time
+
+from courseraresearchexports.constants.api_constants import \
+    EXPORT_STATUS_TERMINATED, EXPORT_STATUSES_IN_PROGRESS, \
+    WAIT_INITIAL_INTERVAL_SECONDS, WAIT_MAX_CONSECUTIVE_ERRORS, \
+    WAIT_MAX_INTERVAL_SECONDS
+from courseraresearchexports.exports import concurrent_api
+from courseraresearchexports.exports import utils
+
+
+def wait(export_job_ids, dest=None, parallel=1, segments=1, use_cache=True,
+         initial_interval=WAIT_INITIAL_INTERVAL_SECONDS,
+         max_interval=WAIT_MAX_INTERVAL_SECONDS, timeout=None,
+         raise_on_terminated=True, max_errors=WAIT_MAX_CONSECUTIVE_ERRORS):
+    """
+    Poll export jobs until each one is no longer pending or in progress.
+    Every job has its own polling interval, which starts at initial_interval
+    and doubles up to max_interval, with jitter so that jobs submitted
+    together are not polled in lockstep. If dest is given, each completed
+    job is downloaded in the background as soon as it finishes. A job whose
+    poll is rejected with a client error, e.g. 404 for an unknown id, or
+    fails max_errors times in a row is no longer polled and counts as
+    failed.
+    :param export_job_ids:
+    :param dest: download folder, or None to only wait
+    :param parallel: maximum number of jobs downloaded concurrently
+    :param segments: see exports.utils.download
+    :param use_cache: see exports.utils.download
+    :param initial_interval: seconds before a job is polled again
+    :param max_interval: upper bound on the per-job polling interval
+    :param timeout: seconds to wait before giving up, or None
+    :param raise_on_terminated: if False, terminated jobs are only returned
+        and just failed polls and downloads raise
+    :param max_errors: consecutive failed polls after which a job is given
+        up on
+    :return export_requests: {export_job_id: ExportRequestWithMetadata} for
+        the finished jobs
+    """
+    started_at = time.time()
+    schedule = [(started_at, export_job_id, initial_interval)
+                for export_job_id in set(export_job_ids)]
+    heapq.heapify(schedule)
+    total = len(schedule)
+    finished = {}
+    errors = {}
+    consecutive_errors = {}
+    downloads = {}
+    download_pool = ThreadPool(max(1, parallel)) if dest else None
+
+    try:
+        while schedule:
+            now = time.time()
+            if timeout is not None and schedule[0][0] - started_at > timeout:
+                raise RuntimeError(
+                    'Timed out after {}s waiting for {} export jobs.'.format(
+                        timeout, len(schedule)))
+            if schedule[0][0] > now:
+                time.sleep(schedule[0][0] - now)
+                continue
+
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule))
+
+            export_requests = concurrent_api.get(
+                [export_job_id for _, export_job_id, _ in due],
+                return_exceptions=True, max_age=0)
+
+            for (_, export_job_id, interval), export_request in zip(
+                    due, export_requests):
+                if isinstance(export_request, Exception):
+                    consecutive_errors[export_job_id] = \
+                        consecutive_errors.get(export_job_id, 0) + 1
+                    if utils._is_client_error(export_request) or \
+                            consecutive_errors[export_job_id] >= max_errors:
+                        logging.error('Polling {} failed: {}'.format(
+                            export_job_id, export_request))
+                        errors[export_job_id] = export_request
+                        continue
+                    logging.warning('Polling {} failed, will retry: {}'.format(
+                        export_job_id, export_request))
+                elif export_request.status not in EXPORT_STATUSES_IN_PROGRESS:
+                    finished[export_job_id] = export_request
+                    _log_finished(export_request, len(finished), total)
+                    if download_pool and \
+                            export_request.status != EXPORT_STATUS_TERMINATED:
+                        downloads[export_job_id] = download_pool.apply_async(
+                            utils.download, (export_request, dest),
+                            {'segments': segments, 'use_cache': use_cache})
+                    continue
+                else:
+                    consecutive_errors.pop(export_job_id, None)
+
+                heapq.heappush(schedule, (
+                    now + _jittered(interval), export_job_id,
+                    min(interval * 2, max_interval)))
+
+        _raise_failures(finished, downloads, raise_on_terminated, errors)
+        return finished
+
+    finally:
+        if download_pool:
+            download_pool.close()
+            download_pool.join()
+
+
+def _jittered(interval):
+    """
+    Equal jitter: half the interval plus a random share of the other half.
+    """
+    return interval / 2.0 + random.uniform(0, interval / 2.0)
+
+
+def _log_finished(export_request, finished_count, total_count):
+    logging.info('Export request {id} finished with status {status} '
+                 '({finished} of {total} done).'.format(
+                     id=export_request.id, status=export_request.status,
+                     finished=finished_count, total=total_count))
+
+
+def _raise_failures(finished, downloads, raise_on_terminated=True,
+                    errors=None):
+    """
+    Wait for background downloads, then raise if any job could not be
+    polled, failed to download or, with raise_on_terminated, was terminated.
+    :param errors: {export_job_id: exception} of jobs given up on
+    """
+    failed = [export_job_id for export_job_id, export_request
+              in finished.items()
+              if export_request.status == EXPORT_STATUS_TERMINATED]
+    for export_job_id in failed:
+        logging.error('Export request {} was TERMINATED.'.format(
+            export_job_id))
+    if not raise_on_terminated:
+        failed = []
+    failed.extend(errors or {})
+
+    for export_job_id, download in downloads.items():
+        try:
+            download.get(60 * 60 * 24 * 365)
+        except Exception as err:
+            logging.error('Download of {} failed:\n{}'.format(
+                export_job_id, err))
+            failed.append(export_job_id)
+
+    if failed:
+        raise RuntimeError('{} of {} export jobs failed.'.format(
+            len(failed), len(finished) + len(errors or {})))
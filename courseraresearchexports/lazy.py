@@ -0,0 +1,73 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deferred imports of heavy third party modules, so that parsing the command
+line, tab completion and subcommands such as `version` do not pay for
+docker, sqlalchemy or requests. Modules are imported on first use.
+"""
+
+import importlib
+import threading
+
+_import_lock = threading.RLock()
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module, imported on first attribute access. Attributes
+    set on the stand-in, e.g. by mock.patch, take precedence over the
+    module's.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        with _import_lock:
+            if self._module is None:
+                self.__dict__['_module'] = importlib.import_module(
+                    self._name)
+            return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        return '<lazy module {}>'.format(self._name)
+
+
+def lazy_module(name):
+    """
+    :param name: dotted module name, e.g. 'dateutil.parser'
+    :return module: LazyModule
+    """
+    return LazyModule(name)
+
+
+def lazy_callable(module_name, name):
+    """
+    Function or class `name` of a module, imported when it is first called.
+    :param module_name:
+    :param name:
+    :return callable:
+    """
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, name)(*args, **kwargs)
+
+    call.__name__ = name
+    return call
@@ -22,13 +22,14 @@ Coursera's tools for interacting with research data exports.
 You may install it from source, or via pip.
 """
 
-import argcomplete
 import argparse
 import logging
+import os
 import sys
 
 from courseraresearchexports import commands
 from courseraresearchexports.commands import utils
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
 
 
 def build_parser():
@@ -47,6 +48,9 @@ def build_parser():
         https://github.com/coursera/courseraresarchexports""")
 
     utils.add_logging_parser(parser)
+    utils.add_api_client_parser(parser)
+    utils.add_metrics_parser(parser)
+    utils.add_profiling_parser(parser)
 
     # We have a number of subcommands. These subcommands have their own
     # subparsers. Each subcommand should set a default value for the 'func'
@@ -76,19 +80,34 @@ def main():
     logging.captureWarnings(True)
     parser = build_parser()
 
-    argcomplete.autocomplete(parser)
+    # argcomplete only acts, and then exits, when invoked by the shell's
+    # completion hook
+    if '_ARGCOMPLETE' in os.environ:
+        import argcomplete
+        argcomplete.autocomplete(parser)
 
     args = parser.parse_args()
     # Configure logging
     args.setup_logging(args)
+    # Configure the shared API client
+    args.setup_api_client(args)
+    # Configure performance metrics output
+    args.setup_metrics(args)
+    profiler = args.setup_profiler(args)
     # Dispatch into the appropriate subcommand function.
     try:
-        return args.func(args)
+        with MetricsRecorder.default().timed(
+                'command', command=args.func.__name__):
+            if profiler:
+                return profiler.run(args.func, args)
+            return args.func(args)
     except SystemExit:
         raise
     except:
         logging.exception('Problem when running command. Sorry!')
         sys.exit(1)
+    finally:
+        MetricsRecorder.default().close()
 
 
 if __name__ == "__main__":
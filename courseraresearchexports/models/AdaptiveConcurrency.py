@@ -0,0 +1,65 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+
+
+class AdaptiveConcurrency:
+    """
+    Limit on the number of requests in flight, adjusted by additive increase
+    and multiplicative decrease: it halves when the API throttles a request
+    and grows back by one after a limit's worth of successful requests.
+    Requests that were already in flight when the limit was halved do not
+    halve it again.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self._in_flight = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait for a free slot.
+        :return generation: pass to release
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+            return self._generation
+
+    def release(self, generation, throttled=False, succeeded=True):
+        """
+        Free a slot and adjust the limit to the outcome of the request.
+        :param generation: returned by acquire
+        :param throttled: the API asked us to slow down
+        :param succeeded: the request got a non throttled response
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                if generation == self._generation:
+                    self._generation += 1
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    logging.info('API is throttling, lowering concurrency '
+                                 'to {}.'.format(int(self.limit)))
+            elif succeeded:
+                self.limit = min(self.max_limit,
+                                 self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
@@ -0,0 +1,156 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from courseraresearchexports.constants.api_constants import \
+    HTTP_POOL_SIZE, RESEARCH_EXPORTS_APP
+from courseraresearchexports.lazy import lazy_module
+from courseraresearchexports.models.AdaptiveConcurrency import \
+    AdaptiveConcurrency
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+
+requests = lazy_module('requests')
+oauth2 = lazy_module('courseraoauth2client.oauth2')
+
+
+class ApiClient:
+    """
+    Shared connection to Coursera's APIs. Keeps a single keep-alive requests
+    session and reuses the OAuth2 authorizer until it is about to expire.
+    With adaptive_concurrency, the number of requests in flight shrinks below
+    pool_size while the API responds with throttling status codes.
+    """
+
+    # seconds of validity an authorizer must have left to be reused
+    AUTH_EXPIRY_MARGIN = 60
+
+    THROTTLED_STATUS_CODES = [429, 503]
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, app=RESEARCH_EXPORTS_APP, pool_size=HTTP_POOL_SIZE,
+                 auth=None, adaptive_concurrency=True):
+        self.app = app
+        self.pool_size = pool_size
+        self.concurrency = (AdaptiveConcurrency(pool_size)
+                            if adaptive_concurrency else None)
+        self._auth = auth
+        self._session = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """
+        Process wide client used by the API wrappers and lookups.
+        :return api_client: ApiClient
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        Replace the process wide client, e.g. to change the pool size.
+        :param kwargs: arguments for ApiClient
+        :return api_client: ApiClient
+        """
+        with cls._default_lock:
+            if cls._default is not None:
+                cls._default.close()
+            cls._default = cls(**kwargs)
+            return cls._default
+
+    @property
+    def session(self):
+        """
+        Keep-alive session with a connection pool of `pool_size` per host.
+        """
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def auth(self):
+        """
+        OAuth2 authorizer for the research exports app, rebuilt only when
+        the cached one is close to expiring.
+        """
+        with self._lock:
+            if self._auth is None or (
+                    hasattr(self._auth, 'expires') and
+                    time.time() + self.AUTH_EXPIRY_MARGIN >
+                    self._auth.expires):
+                self._auth = oauth2.build_oauth2(
+                    app=self.app).build_authorizer()
+            return self._auth
+
+    def get(self, url, authorize=True, **kwargs):
+        """
+        GET request over the shared session.
+        :param url:
+        :param authorize: attach OAuth2 credentials to the request
+        :return response:
+        """
+        if authorize:
+            kwargs['auth'] = self.auth
+        return self._send('GET', url, **kwargs)
+
+    def post(self, url, authorize=True, **kwargs):
+        """
+        POST request over the shared session.
+        :param url:
+        :param authorize: attach OAuth2 credentials to the request
+        :return response:
+        """
+        if authorize:
+            kwargs['auth'] = self.auth
+        return self._send('POST', url, **kwargs)
+
+    def _send(self, http_method, url, **kwargs):
+        method = getattr(self.session, http_method.lower())
+        generation = self.concurrency.acquire() if self.concurrency else None
+        response = None
+        try:
+            with MetricsRecorder.default().timed(
+                    'api_call', method=http_method, url=url) as metrics:
+                response = method(url, **kwargs)
+                metrics['status'] = response.status_code
+            return response
+        finally:
+            if self.concurrency is not None:
+                throttled = response is not None and \
+                    response.status_code in self.THROTTLED_STATUS_CODES
+                self.concurrency.release(generation, throttled=throttled,
+                                         succeeded=response is not None)
+
+    def close(self):
+        """
+        Release pooled connections.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
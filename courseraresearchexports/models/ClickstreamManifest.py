@@ -0,0 +1,143 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta
+import json
+import os
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+class ClickstreamManifest:
+    """
+    Record of the clickstream day files already downloaded to a folder for
+    one course or partner scope.
+    """
+
+    def __init__(self, scope=None, files_by_date=None, **kwargs):
+        self.scope = scope
+        self.files_by_date = files_by_date or {}
+
+    def to_json(self):
+        """
+        Serialize ClickstreamManifest to a dictionary representing a json
+        object.
+        :return json_manifest:
+        """
+        return {'scope': self.scope, 'filesByDate': self.files_by_date}
+
+    @classmethod
+    def from_json(cls, json_manifest):
+        """
+        Deserialize ClickstreamManifest from json object.
+        :param json_manifest:
+        :return manifest: ClickstreamManifest
+        """
+        return cls(scope=json_manifest.get('scope'),
+                   files_by_date=json_manifest.get('filesByDate'))
+
+    @staticmethod
+    def filename(folder, scope):
+        """
+        Location of the manifest for scope inside folder.
+        """
+        return os.path.join(folder, '{}.manifest.json'.format(scope))
+
+    @classmethod
+    def load(cls, folder, scope):
+        """
+        Read the manifest for scope from folder, or start an empty one.
+        :param folder:
+        :param scope: ClickstreamDownloadLinksRequest scope
+        :return manifest: ClickstreamManifest
+        """
+        manifest_filename = cls.filename(folder, scope)
+        if not os.path.exists(manifest_filename):
+            return cls(scope=scope)
+        with open(manifest_filename, 'r') as f:
+            return cls.from_json(json.load(f))
+
+    def save(self, folder):
+        with open(self.filename(folder, self.scope), 'w') as f:
+            json.dump(self.to_json(), f, indent=2, sort_keys=True)
+
+    def missing_dates(self, start, end, folder):
+        """
+        Dates between start and end, inclusive, without recorded files or
+        whose recorded files are no longer present in folder.
+        :param start: YYYY-MM-DD
+        :param end: YYYY-MM-DD
+        :param folder:
+        :return dates: [YYYY-MM-DD]
+        """
+        return [date for date in date_range(start, end)
+                if not self.files_by_date.get(date) or not all(
+                    os.path.exists(os.path.join(folder, filename))
+                    for filename in self.files_by_date[date])]
+
+    def record(self, date, filenames):
+        """
+        Mark date as downloaded to the given file names, relative to the
+        manifest's folder.
+        """
+        recorded = self.files_by_date.setdefault(date, [])
+        recorded.extend(filename for filename in filenames
+                        if filename not in recorded)
+
+
+def date_range(start, end):
+    """
+    All dates from start to end, inclusive.
+    :param start: YYYY-MM-DD
+    :param end: YYYY-MM-DD
+    :return dates: [YYYY-MM-DD]
+    """
+    start_date = datetime.strptime(start, DATE_FORMAT)
+    end_date = datetime.strptime(end, DATE_FORMAT)
+    return [(start_date + timedelta(days=days)).strftime(DATE_FORMAT)
+            for days in range((end_date - start_date).days + 1)]
+
+
+def contiguous_intervals(dates):
+    """
+    Group sorted dates into runs of consecutive days.
+    :param dates: [YYYY-MM-DD]
+    :return intervals: [[start, end]]
+    """
+    intervals = []
+    for date in dates:
+        if intervals and _next_date(intervals[-1][1]) == date:
+            intervals[-1][1] = date
+        else:
+            intervals.append([date, date])
+    return intervals
+
+
+def split_interval(start, end, days):
+    """
+    Split an interval into consecutive shards of at most `days` days.
+    :param start: YYYY-MM-DD
+    :param end: YYYY-MM-DD, inclusive
+    :param days:
+    :return intervals: [[start, end]]
+    """
+    dates = date_range(start, end)
+    return [[shard[0], shard[-1]]
+            for shard in (dates[i:i + days]
+                          for i in range(0, len(dates), days))]
+
+
+def _next_date(date):
+    return (datetime.strptime(date, DATE_FORMAT) +
+            timedelta(days=1)).strftime(DATE_FORMAT)
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import dateutil.parser
+from courseraresearchexports.lazy import lazy_module
+
+dateutil_parser = lazy_module('dateutil.parser')
 
 
 class ContainerInfo:
@@ -51,7 +53,7 @@ class ContainerInfo:
         return cls(
             name=container_dict['Name'][1:],  # remove prepended '\'
             id=container_dict['Id'],
-            creation_time=dateutil.parser.parse(container_dict['Created']),
+            creation_time=dateutil_parser.parse(container_dict['Created']),
             database_name=container_dict['Config']['Labels']['database_name'],
             status=container_dict['State']['Status'],
             host_port=assigned_port,
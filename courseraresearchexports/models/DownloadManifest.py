@@ -0,0 +1,121 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import threading
+
+from courseraresearchexports.constants.download_constants import \
+    DOWNLOAD_MANIFEST_SUFFIX
+
+
+class DownloadManifest:
+    """
+    Record of the files of one export request that were downloaded to a
+    folder and verified against their expected size and, when the server
+    published one, their MD5 digest. A file whose size and modification time
+    still match its entry is trusted without being read or fetched again.
+    """
+
+    def __init__(self, export_request_id=None, files=None, **kwargs):
+        self.export_request_id = export_request_id
+        self.files = files or {}
+        self._lock = threading.Lock()
+
+    def to_json(self):
+        """
+        Serialize DownloadManifest to a dictionary representing a json
+        object.
+        :return json_manifest:
+        """
+        return {'exportRequestId': self.export_request_id,
+                'files': self.files}
+
+    @classmethod
+    def from_json(cls, json_manifest):
+        """
+        Deserialize DownloadManifest from json object.
+        :param json_manifest:
+        :return manifest: DownloadManifest
+        """
+        return cls(export_request_id=json_manifest.get('exportRequestId'),
+                   files=json_manifest.get('files'))
+
+    @staticmethod
+    def filename(folder, export_request_id):
+        """
+        Location of the manifest for export_request_id inside folder.
+        """
+        return os.path.join(folder, '{}{}'.format(
+            export_request_id, DOWNLOAD_MANIFEST_SUFFIX))
+
+    @classmethod
+    def load(cls, folder, export_request_id):
+        """
+        Read the manifest for export_request_id from folder, or start an
+        empty one.
+        :param folder:
+        :param export_request_id:
+        :return manifest: DownloadManifest
+        """
+        manifest_filename = cls.filename(folder, export_request_id)
+        if not os.path.exists(manifest_filename):
+            return cls(export_request_id=export_request_id)
+        try:
+            with open(manifest_filename, 'r') as f:
+                return cls.from_json(json.load(f))
+        except ValueError:
+            return cls(export_request_id=export_request_id)
+
+    def save(self, folder):
+        with self._lock:
+            self._save(folder)
+
+    def _save(self, folder):
+        manifest_filename = self.filename(folder, self.export_request_id)
+        with open(manifest_filename + '.tmp', 'w') as f:
+            json.dump(self.to_json(), f, indent=2, sort_keys=True)
+        if os.path.exists(manifest_filename):
+            os.remove(manifest_filename)
+        os.rename(manifest_filename + '.tmp', manifest_filename)
+
+    def is_verified(self, folder, filename):
+        """
+        Whether filename was verified and is unchanged since, judged from its
+        size and modification time only.
+        :param folder:
+        :param filename: file name relative to folder
+        :return verified:
+        """
+        entry = self.files.get(filename)
+        full_filename = os.path.join(folder, filename)
+        if entry is None or not os.path.exists(full_filename):
+            return False
+        stat = os.stat(full_filename)
+        return entry['size'] == stat.st_size and \
+            entry['mtime'] == stat.st_mtime
+
+    def record(self, folder, filename, md5=None):
+        """
+        Mark filename as verified and save the manifest.
+        :param folder:
+        :param filename: file name relative to folder
+        :param md5: hex digest computed while the file was written, if any
+        """
+        stat = os.stat(os.path.join(folder, filename))
+        with self._lock:
+            self.files[filename] = {'size': stat.st_size,
+                                    'mtime': stat.st_mtime,
+                                    'md5': md5}
+            self._save(folder)
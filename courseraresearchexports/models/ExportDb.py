@@ -13,11 +13,14 @@
 # limitations under the License.
 
 import csv
+import os
 
-from sqlalchemy import create_engine
-from sqlalchemy.engine import reflection
-
+from courseraresearchexports.lazy import lazy_callable, lazy_module
 from courseraresearchexports.models.ContainerInfo import ContainerInfo
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+
+create_engine = lazy_callable('sqlalchemy', 'create_engine')
+reflection = lazy_module('sqlalchemy.engine.reflection')
 
 
 class ExportDb:
@@ -75,18 +78,22 @@ class ExportDb:
         :param output_filename:
         :return rowcount:
         """
-        result = self.engine.execute(query)
-
-        rowcount = result.rowcount
-
-        with open(output_filename, 'wb') as csv_file:
-            csv_obj = csv.writer(csv_file)
-            csv_obj.writerow(result.keys())
-            for row in result:
-                encoded_row = [col.encode('utf8')
-                               if isinstance(col, unicode) else col
-                               for col in row]
-                csv_obj.writerow(encoded_row)
+        with MetricsRecorder.default().timed(
+                'unload', rates=['rows'],
+                output=os.path.basename(output_filename)) as metrics:
+            result = self.engine.execute(query)
+
+            rowcount = result.rowcount
+
+            with open(output_filename, 'wb') as csv_file:
+                csv_obj = csv.writer(csv_file)
+                csv_obj.writerow(result.keys())
+                for row in result:
+                    encoded_row = [col.encode('utf8')
+                                   if isinstance(col, unicode) else col
+                                   for col in row]
+                    csv_obj.writerow(encoded_row)
+            metrics['rows'] = rowcount
 
         return rowcount
 
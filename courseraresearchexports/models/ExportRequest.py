@@ -267,3 +267,23 @@ class ExportRequest:
         if type(other) is type(self):
             return self.__dict__ == other.__dict__
         return False
+
+    def matches(self, other):
+        """
+        Whether other asks for the same data, i.e. the two are equal once
+        reduced to plain ExportRequests without the statement of purpose and
+        ignore_existing, and with schemas compared regardless of order.
+        :param other: ExportRequest
+        :return:
+        """
+        return self._data_request() == other._data_request()
+
+    def _data_request(self):
+        return ExportRequest(
+            course_id=self._course_id,
+            partner_id=self._partner_id,
+            group_id=self._group_id,
+            export_type=self._export_type,
+            anonymity_level=self._anonymity_level,
+            schema_names=sorted(self._schema_names or []),
+            interval=list(self._interval) if self._interval else None)
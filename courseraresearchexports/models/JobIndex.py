@@ -0,0 +1,239 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from contextlib import closing
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from courseraresearchexports.constants.api_constants import \
+    EXPORT_STATUSES_IN_PROGRESS, JOB_CACHE_TTL_SECONDS, JOB_INDEX_FILENAME, \
+    JOBS_PAGE_SIZE
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata, datetime_to_unix_ms
+
+
+class JobIndex:
+    """
+    Local SQLite index of export job metadata, for filtering a user's full
+    job history without fetching it from the API again. It doubles as a
+    cache for single job lookups: responses are stored with the time they
+    were fetched and their ETag, and `ttl` is how long the metadata of a job
+    that is still running is considered fresh.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            scope_context TEXT,
+            scope_id TEXT,
+            status TEXT,
+            export_type TEXT,
+            created_at INTEGER,
+            json TEXT,
+            fetched_at REAL,
+            etag TEXT);
+        CREATE INDEX IF NOT EXISTS jobs_scope ON jobs (scope_id);
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+        CREATE INDEX IF NOT EXISTS jobs_export_type ON jobs (export_type);
+        CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+    """
+
+    # columns added after the first version of the schema
+    ADDED_COLUMNS = [('fetched_at', 'REAL'), ('etag', 'TEXT')]
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, filename=JOB_INDEX_FILENAME,
+                 ttl=JOB_CACHE_TTL_SECONDS):
+        self.filename = filename
+        self.ttl = ttl
+        folder = os.path.dirname(filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with closing(self._connect()) as connection:
+            connection.executescript(self.SCHEMA)
+            columns = [row[1] for row in connection.execute(
+                'PRAGMA table_info(jobs)')]
+            for column, column_type in self.ADDED_COLUMNS:
+                if column not in columns:
+                    connection.execute('ALTER TABLE jobs ADD COLUMN {} {}'
+                                       .format(column, column_type))
+
+    @classmethod
+    def default(cls):
+        """
+        Process wide index used to cache export job metadata.
+        :return job_index: JobIndex
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        Replace the process wide index, e.g. to change the cache TTL.
+        :param kwargs: arguments for JobIndex
+        :return job_index: JobIndex
+        """
+        with cls._default_lock:
+            cls._default = cls(**kwargs)
+            return cls._default
+
+    def _connect(self):
+        return sqlite3.connect(self.filename, timeout=30)
+
+    def upsert(self, export_requests, etags=None):
+        """
+        Insert or replace export requests, marking them as fetched now.
+        :param export_requests: [ExportRequestWithMetadata]
+        :param etags: {export_job_id: ETag} of the responses, if known
+        """
+        etags = etags or {}
+        fetched_at = time.time()
+        rows = [(export_request.id,
+                 export_request.scope_context,
+                 (str(export_request.scope_id)
+                  if export_request.scope_id is not None else None),
+                 export_request.status,
+                 export_request.export_type,
+                 datetime_to_unix_ms(export_request.created_at),
+                 json.dumps(export_request.to_json()),
+                 fetched_at,
+                 etags.get(export_request.id))
+                for export_request in export_requests]
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO jobs (id, scope_context, '
+                    'scope_id, status, export_type, created_at, json, '
+                    'fetched_at, etag) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows)
+
+    def get_cached(self, export_job_id):
+        """
+        :param export_job_id:
+        :return (export_request, fetched_at, etag): all None if the job is
+            not in the index
+        """
+        rows = self._execute(
+            'SELECT json, fetched_at, etag FROM jobs WHERE id = ?',
+            [export_job_id])
+        if not rows:
+            return None, None, None
+        json_request, fetched_at, etag = rows[0]
+        return (ExportRequestWithMetadata.from_json(json.loads(json_request)),
+                fetched_at or 0, etag)
+
+    def is_fresh(self, export_request, fetched_at, max_age=None):
+        """
+        Finished jobs never change and are always fresh; running jobs are
+        fresh for max_age seconds, the index's ttl by default.
+        """
+        if max_age is None:
+            max_age = self.ttl
+        return (export_request.status not in EXPORT_STATUSES_IN_PROGRESS or
+                time.time() - fetched_at < max_age)
+
+    def touch(self, export_job_id):
+        """
+        Mark a job's metadata as revalidated now.
+        """
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(
+                    'UPDATE jobs SET fetched_at = ? WHERE id = ?',
+                    [time.time(), export_job_id])
+
+    def get(self, export_job_id):
+        """
+        :param export_job_id:
+        :return export_request: ExportRequestWithMetadata, or None if the job
+            is not in the index
+        """
+        export_requests = self._select('WHERE id = ?', [export_job_id])
+        return export_requests[0] if export_requests else None
+
+    def query(self, scope_id=None, status=None, export_type=None,
+              created_after=None, created_before=None):
+        """
+        Export requests matching every given filter, most recent first.
+        :param scope_id: course id, partner id or group id
+        :param status:
+        :param export_type:
+        :param created_after: datetime
+        :param created_before: datetime
+        :return export_requests: [ExportRequestWithMetadata]
+        """
+        clauses = []
+        params = []
+        for column, value in [('scope_id', scope_id), ('status', status),
+                              ('export_type', export_type)]:
+            if value is not None:
+                clauses.append('{} = ?'.format(column))
+                params.append(str(value))
+        if created_after is not None:
+            clauses.append('created_at >= ?')
+            params.append(datetime_to_unix_ms(created_after))
+        if created_before is not None:
+            clauses.append('created_at < ?')
+            params.append(datetime_to_unix_ms(created_before))
+
+        where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return self._select(where + ' ORDER BY created_at DESC', params)
+
+    def refresh(self, export_requests, page_size=JOBS_PAGE_SIZE):
+        """
+        Update the index from a stream of export requests, such as
+        exports.api.iter_all(). The API does not document the order of the
+        listing, so the whole stream is read, but jobs already indexed as
+        finished are not written again.
+        :param export_requests: iterable of ExportRequestWithMetadata
+        :param page_size: export requests written at once
+        :return stale_ids: ids of jobs indexed as in progress that were
+            missing from the stream, to be fetched individually
+        """
+        statuses = dict(self._execute('SELECT id, status FROM jobs', ()))
+
+        seen = set()
+        batch = []
+        for export_request in export_requests:
+            seen.add(export_request.id)
+            status = statuses.get(export_request.id)
+            if status and status not in EXPORT_STATUSES_IN_PROGRESS:
+                continue
+            batch.append(export_request)
+            if len(batch) >= page_size:
+                self.upsert(batch)
+                batch = []
+
+        self.upsert(batch)
+        return sorted(export_job_id
+                      for export_job_id, status in statuses.items()
+                      if status in EXPORT_STATUSES_IN_PROGRESS and
+                      export_job_id not in seen)
+
+    def _select(self, where, params):
+        return [ExportRequestWithMetadata.from_json(json.loads(row[0]))
+                for row in self._execute(
+                    'SELECT json FROM jobs ' + where, params)]
+
+    def _execute(self, statement, params):
+        with closing(self._connect()) as connection:
+            return connection.execute(statement, params).fetchall()
@@ -0,0 +1,184 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import threading
+import time
+
+from courseraresearchexports.constants.api_constants import \
+    LOOKUP_CACHE_FILENAME, LOOKUP_CACHE_MAX_AGE_SECONDS
+
+
+class LookupCache:
+    """
+    Persistent cache of course and partner slug, short name and id mappings.
+    These practically never change, so entries are kept on disk for max_age
+    seconds and shared between runs. Concurrent lookups of the same key wait
+    for the first one instead of repeating the request. With filename None
+    the cache only lives in memory.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, filename=LOOKUP_CACHE_FILENAME,
+                 max_age=LOOKUP_CACHE_MAX_AGE_SECONDS):
+        self.filename = filename
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._entries = None
+
+    @classmethod
+    def default(cls):
+        """
+        Process wide cache used by the lookups in models.utils.
+        :return lookup_cache: LookupCache
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        Replace the process wide cache, e.g. to change the expiry.
+        :param kwargs: arguments for LookupCache
+        :return lookup_cache: LookupCache
+        """
+        with cls._default_lock:
+            cls._default = cls(**kwargs)
+            return cls._default
+
+    def get(self, namespace, key, lookup):
+        """
+        Cached value of key in namespace, calling lookup(key) if it is
+        missing or expired.
+        :param namespace: kind of mapping, e.g. course_slug_by_id
+        :param key:
+        :param lookup: function(key) -> value, must return json values
+        :return value:
+        """
+        cache_key = self._cache_key(namespace, key)
+        while True:
+            with self._lock:
+                entry = self._load().get(cache_key)
+                if entry is not None and \
+                        time.time() - entry['fetched_at'] < self.max_age:
+                    return entry['value']
+                in_flight = self._in_flight.get(cache_key)
+                if in_flight is None:
+                    in_flight = self._in_flight[cache_key] = \
+                        threading.Event()
+                    break
+            # another thread is looking up the same key; if it fails, the
+            # entry is still missing and this thread tries on its own
+            in_flight.wait()
+
+        try:
+            value = lookup(key)
+            self.put(namespace, key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[cache_key]
+            in_flight.set()
+
+    def get_many(self, namespace, keys, lookup_many):
+        """
+        Cached values of several keys, calling lookup_many once with every
+        key that is missing or expired.
+        :param namespace:
+        :param keys:
+        :param lookup_many: function([key]) -> {key: value}, keys it leaves
+            out are not cached
+        :return values: {key: value}
+        """
+        values = {}
+        missing = []
+        with self._lock:
+            entries = self._load()
+            for key in sorted(set(keys)):
+                entry = entries.get(self._cache_key(namespace, key))
+                if entry is not None and \
+                        time.time() - entry['fetched_at'] < self.max_age:
+                    values[key] = entry['value']
+                else:
+                    missing.append(key)
+
+        if missing:
+            found = lookup_many(missing)
+            self.put_many(namespace, found)
+            values.update(found)
+        return values
+
+    def put(self, namespace, key, value):
+        """
+        Store the value of key in namespace.
+        """
+        self.put_many(namespace, {key: value})
+
+    def put_many(self, namespace, values):
+        """
+        Store several values of namespace at once.
+        :param namespace:
+        :param values: {key: value}
+        """
+        fetched_at = time.time()
+        new_entries = dict(
+            (self._cache_key(namespace, key),
+             {'value': value, 'fetched_at': fetched_at})
+            for key, value in values.items())
+        with self._lock:
+            self._load().update(new_entries)
+            if self.filename is None or not new_entries:
+                return
+            # merge with entries other processes wrote since we loaded
+            entries = self._read()
+            entries.update(new_entries)
+            self._write(entries)
+
+    @staticmethod
+    def _cache_key(namespace, key):
+        return '{}:{}'.format(namespace, key)
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read() if self.filename else {}
+        return self._entries
+
+    def _read(self):
+        if not os.path.exists(self.filename):
+            return {}
+        try:
+            with open(self.filename, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            logging.warning('Lookup cache {} is unreadable, ignoring it.'
+                            .format(self.filename))
+            return {}
+
+    def _write(self, entries):
+        folder = os.path.dirname(self.filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_filename = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmp_filename, 'w') as f:
+            json.dump(entries, f)
+        if os.name == 'nt' and os.path.exists(self.filename):
+            os.remove(self.filename)
+        os.rename(tmp_filename, self.filename)
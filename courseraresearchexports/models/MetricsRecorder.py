@@ -0,0 +1,108 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+
+class MetricsRecorder:
+    """
+    Writes performance measurements as JSON lines, one object per event with
+    its name, the time it was recorded and event specific fields. Without a
+    filename events are discarded, so instrumented code can always record.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._file = open(filename, 'a') if filename else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """
+        Process wide recorder used by the instrumented code paths.
+        :return metrics_recorder: MetricsRecorder
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        Replace the process wide recorder, e.g. to write to a file.
+        :param kwargs: arguments for MetricsRecorder
+        :return metrics_recorder: MetricsRecorder
+        """
+        with cls._default_lock:
+            if cls._default is not None:
+                cls._default.close()
+            cls._default = cls(**kwargs)
+            return cls._default
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def emit(self, event, **fields):
+        """
+        Record one event.
+        :param event: event name, e.g. 'api_call'
+        :param fields: json serializable measurements
+        """
+        if not self.enabled:
+            return
+        fields['event'] = event
+        fields['time'] = time.time()
+        line = json.dumps(fields, sort_keys=True)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    @contextmanager
+    def timed(self, event, rates=(), **fields):
+        """
+        Record the duration of a block as `seconds`, with `error` set to the
+        exception type if it raised. The block may add fields to the yielded
+        dictionary, e.g. the number of bytes it processed.
+        :param event:
+        :param rates: names of count fields set by the block that are also
+            recorded per second, as NAME_per_second
+        :param fields:
+        """
+        started_at = time.time()
+        try:
+            yield fields
+        except BaseException as err:
+            fields['error'] = type(err).__name__
+            raise
+        finally:
+            seconds = time.time() - started_at
+            fields['seconds'] = seconds
+            for name in rates:
+                if name in fields and seconds > 0:
+                    fields[name + '_per_second'] = fields[name] / seconds
+            self.emit(event, **fields)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
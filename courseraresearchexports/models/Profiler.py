@@ -0,0 +1,155 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter, defaultdict
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+
+COLLAPSED_SUFFIX = '.collapsed'
+
+# call paths carrying less than this share of the total time are dropped
+# when deriving stacks from a deterministic profile
+MIN_STACK_SHARE = 0.0001
+
+
+class Profiler:
+    """
+    Runs a function under cProfile and writes its stats to `filename`, which
+    can be sorted and browsed with `python -m pstats`, along with collapsed
+    stacks in `filename`.collapsed for flamegraph.pl or speedscope.
+
+    cProfile only sees the calling thread, and its call graph only records
+    caller and callee pairs, so by default the collapsed stacks are an
+    estimate spread over the call graph. With a sample_interval the stacks of
+    every thread are instead sampled at that interval, which also covers
+    work done on thread pools, such as parallel downloads.
+    """
+
+    def __init__(self, filename, sample_interval=None):
+        self.filename = filename
+        self.sample_interval = sample_interval
+
+    def run(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) while profiling it.
+        :return result: the return value of func
+        """
+        profile = cProfile.Profile()
+        sampler = (StackSampler(self.sample_interval)
+                   if self.sample_interval else None)
+        if sampler:
+            sampler.start()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            if sampler:
+                sampler.stop()
+            self.save(profile, sampler)
+
+    def save(self, profile, sampler=None):
+        profile.dump_stats(self.filename)
+        stacks = (sampler.stacks if sampler
+                  else collapsed_stacks(pstats.Stats(profile)))
+        collapsed_filename = self.filename + COLLAPSED_SUFFIX
+        with open(collapsed_filename, 'w') as f:
+            for stack, count in sorted(stacks.items()):
+                if count > 0:
+                    f.write('{} {}\n'.format(stack, int(count)))
+        logging.info('Wrote profile to {} and collapsed stacks to {}'.format(
+            self.filename, collapsed_filename))
+
+
+class StackSampler(threading.Thread):
+    """
+    Background thread counting the call stacks of all other threads every
+    `interval` seconds.
+    """
+
+    def __init__(self, interval):
+        threading.Thread.__init__(self, name='profile-sampler')
+        self.daemon = True
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def sample(self):
+        names = dict((thread.ident, thread.name)
+                     for thread in threading.enumerate())
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self.ident:
+                continue
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(_label(code.co_filename, code.co_firstlineno,
+                                     code.co_name))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)))
+            self.stacks[';'.join(reversed(labels))] += 1
+
+
+def collapsed_stacks(stats):
+    """
+    Estimate collapsed call stacks from a deterministic profile. Time spent
+    in a function is attributed to each of its call paths in proportion to
+    the time its callers spent calling it.
+    :param stats: pstats.Stats
+    :return stacks: {'root;...;function': microseconds}
+    """
+    callees = defaultdict(dict)
+    roots = []
+    total = 0
+    for func, (_, _, tt, ct, callers) in stats.stats.items():
+        total += tt
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    stacks = Counter()
+    threshold = total * MIN_STACK_SHARE
+
+    def walk(func, path, budget):
+        _, _, tt, ct, _ = stats.stats[func]
+        scale = budget / ct if ct > 0 else 0
+        path = path + [func]
+        stacks[';'.join(_label(*f) for f in path)] += tt * scale * 1e6
+        for callee, edge_ct in callees[func].items():
+            if callee not in path and edge_ct * scale >= threshold:
+                walk(callee, path, edge_ct * scale)
+
+    for root in roots:
+        walk(root, [], stats.stats[root][3])
+    return stacks
+
+
+def _label(filename, lineno, name):
+    if filename == '~':  # built-in functions
+        return name.replace(';', ',')
+    return '{} ({}:{})'.format(name, os.path.basename(filename),
+                               lineno).replace(';', ',')
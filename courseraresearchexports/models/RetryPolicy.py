@@ -0,0 +1,108 @@
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import threading
+import time
+
+from courseraresearchexports.constants.api_constants import \
+    API_BACKOFF_SECONDS, API_MAX_BACKOFF_SECONDS, API_MAX_RETRIES
+from courseraresearchexports.lazy import lazy_callable
+
+mktime_tz = lazy_callable('email.utils', 'mktime_tz')
+parsedate_tz = lazy_callable('email.utils', 'parsedate_tz')
+
+
+class RetryPolicy:
+    """
+    Decides whether, and after how long, to retry an API request that failed
+    with a transient error: throttling (429) or a server error (5xx). Delays
+    grow exponentially from `backoff` with full jitter, up to `max_delay`,
+    unless the response carries a Retry-After header. Requests that create
+    something (POST) are only retried when the server did not process them
+    (429, 503). Other 4xx responses, auth errors included, are never retried.
+    """
+
+    RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+    NOT_PROCESSED_STATUS_CODES = [429, 503]
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_retries=API_MAX_RETRIES,
+                 backoff=API_BACKOFF_SECONDS,
+                 max_delay=API_MAX_BACKOFF_SECONDS):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+
+    @classmethod
+    def default(cls):
+        """
+        Process wide policy used by models.utils.requests_response_to_model.
+        :return retry_policy: RetryPolicy
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        Replace the process wide policy.
+        :param kwargs: arguments for RetryPolicy
+        :return retry_policy: RetryPolicy
+        """
+        with cls._default_lock:
+            cls._default = cls(**kwargs)
+            return cls._default
+
+    def retry_delay(self, response, attempt):
+        """
+        :param response: response of the failed request
+        :param attempt: number of retries already made
+        :return delay: seconds to wait before retrying, or None to give up
+        """
+        if attempt >= self.max_retries:
+            return None
+        retryable = (self.NOT_PROCESSED_STATUS_CODES
+                     if getattr(response.request, 'method', None) == 'POST'
+                     else self.RETRY_STATUS_CODES)
+        if response.status_code not in retryable:
+            return None
+
+        retry_after = _retry_after_seconds(
+            response.headers.get('Retry-After'))
+        if retry_after is not None:
+            # waiting less than asked would only be throttled again
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(
+            0, min(self.max_delay, self.backoff * 2 ** attempt))
+
+
+def _retry_after_seconds(retry_after):
+    """
+    Seconds to wait from a Retry-After header, given either as a number of
+    seconds or as an HTTP date.
+    """
+    if not retry_after:
+        return None
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        parsed = parsedate_tz(retry_after)
+        if parsed is None:
+            return None
+        return max(0, mktime_tz(parsed) - time.time())
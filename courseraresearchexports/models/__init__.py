@@ -4,6 +4,16 @@ __all__ = [
     "ClickstreamDownloadLinksRequest",
     "ContainerInfo",
     "ExportDb",
+    "ApiClient",
+    "ClickstreamManifest",
+    "JobIndex",
+    "LookupCache",
+    "TokenBucket",
+    "RetryPolicy",
+    "AdaptiveConcurrency",
+    "DownloadManifest",
+    "MetricsRecorder",
+    "Profiler",
     "utils"
 ]
 
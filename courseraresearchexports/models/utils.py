@@ -12,18 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import logging
-
-import requests
+import time
 
 from courseraresearchexports.constants.api_constants import \
-    COURSE_API, PARTNER_API
+    COURSE_API, PARTNER_API, SCOPE_LOOKUP_BATCH_SIZE
+from courseraresearchexports.lazy import lazy_module
+from courseraresearchexports.models.ApiClient import ApiClient
+from courseraresearchexports.models.LookupCache import LookupCache
+from courseraresearchexports.models.RetryPolicy import RetryPolicy
+
+requests = lazy_module('requests')
 
 
 def requests_response_to_model(response_transformer):
     """
     Creates decorator to handles errors in response from API call and
-    transforms response with response_handler_func
+    transforms response with response_handler_func. Transient errors are
+    retried as decided by the default RetryPolicy.
     :param response_transformer: function(response) -> Any
     :return:
     """
@@ -36,7 +43,7 @@ def requests_response_to_model(response_transformer):
             Log errors and apply transformation in response_handler_func
             """
             try:
-                response = original_func(*args, **kwargs)
+                response = _call_with_retries(original_func, args, kwargs)
                 response.raise_for_status()
 
             except requests.exceptions.HTTPError:
@@ -69,15 +76,54 @@ def requests_response_to_model(response_transformer):
     return response_transform_decorator
 
 
+def _call_with_retries(original_func, args, kwargs):
+    """
+    Call original_func until it returns a response the default RetryPolicy
+    does not want retried.
+    """
+    retry_policy = RetryPolicy.default()
+    attempt = 0
+    while True:
+        response = original_func(*args, **kwargs)
+        delay = retry_policy.retry_delay(response, attempt)
+        if delay is None:
+            return response
+        attempt += 1
+        logging.warning(
+            'Request to {url} failed with status {status}, retrying in '
+            '{delay:.1f}s (retry {attempt} of {retries}).'.format(
+                url=response.url, status=response.status_code, delay=delay,
+                attempt=attempt, retries=retry_policy.max_retries))
+        time.sleep(delay)
+
+
+def cached_lookup(namespace):
+    """
+    Creates decorator memoizing a single argument lookup in the default
+    LookupCache.
+    :param namespace: name of the mapping in the cache
+    :return:
+    """
+    def cached_lookup_decorator(lookup):
+        @functools.wraps(lookup)
+        def cached_lookup_wrapper(key):
+            return LookupCache.default().get(namespace, key, lookup)
+        return cached_lookup_wrapper
+    return cached_lookup_decorator
+
+
+@cached_lookup('course_slug_by_id')
 @requests_response_to_model(
     lambda response: response.json()['elements'][0]['slug'])
 def lookup_course_slug_by_id(course_id):
     """
     Find the course slug given an course_id
     """
-    return requests.get(requests.compat.urljoin(COURSE_API, course_id))
+    return ApiClient.default().get(
+        requests.compat.urljoin(COURSE_API, course_id), authorize=False)
 
 
+@cached_lookup('course_id_by_slug')
 @requests_response_to_model(
     lambda response: response.json()['elements'][0]['id'])
 def lookup_course_id_by_slug(course_slug):
@@ -85,9 +131,11 @@ def lookup_course_id_by_slug(course_slug):
     Find the course_id given a course_slug
     """
     payload = {'q': 'slug', 'slug': course_slug}
-    return requests.get(COURSE_API, params=payload)
+    return ApiClient.default().get(
+        COURSE_API, authorize=False, params=payload)
 
 
+@cached_lookup('partner_id_by_short_name')
 @requests_response_to_model(
     lambda response: int(response.json()['elements'][0]['id']))
 def lookup_partner_id_by_short_name(partner_short_name):
@@ -95,13 +143,100 @@ def lookup_partner_id_by_short_name(partner_short_name):
     Find the partner_id by short name
     """
     payload = {'q': 'shortName', 'shortName': partner_short_name}
-    return requests.get(PARTNER_API, params=payload)
+    return ApiClient.default().get(
+        PARTNER_API, authorize=False, params=payload)
 
 
+@cached_lookup('partner_short_name_by_id')
 @requests_response_to_model(
     lambda response: response.json()['elements'][0]['shortName'])
 def lookup_partner_short_name_by_id(partner_id):
     """
     Find the partner_id by short name
     """
-    return requests.get(requests.compat.urljoin(PARTNER_API, str(partner_id)))
+    return ApiClient.default().get(
+        requests.compat.urljoin(PARTNER_API, str(partner_id)),
+        authorize=False)
+
+
+def resolve_scope_names(export_requests):
+    """
+    Look up the course slugs and partner short names of many export requests
+    with a few multi-id queries, so that their scope_name is then served from
+    the lookup cache instead of costing one request per export request.
+    :param export_requests: [ExportRequest]
+    """
+    course_ids = [export_request.course_id
+                  for export_request in export_requests
+                  if export_request.course_id]
+    partner_ids = [export_request.partner_id
+                   for export_request in export_requests
+                   if export_request.partner_id and
+                   not export_request.course_id]
+    try:
+        if course_ids:
+            lookup_course_slugs_by_ids(course_ids)
+        if partner_ids:
+            lookup_partner_short_names_by_ids(partner_ids)
+    except requests.exceptions.RequestException as err:
+        logging.warning('Batched scope name lookup failed, names will be '
+                        'looked up one at a time: {}'.format(err))
+
+
+def lookup_course_slugs_by_ids(course_ids):
+    """
+    Find the course slugs of several course ids
+    :param course_ids:
+    :return course_slugs: {course_id: course_slug}
+    """
+    return LookupCache.default().get_many(
+        'course_slug_by_id', course_ids,
+        lambda missing: _lookup_in_batches(_lookup_course_slugs, missing))
+
+
+def lookup_partner_short_names_by_ids(partner_ids):
+    """
+    Find the partner short names of several partner ids
+    :param partner_ids:
+    :return partner_short_names: {partner_id: partner_short_name}
+    """
+    return LookupCache.default().get_many(
+        'partner_short_name_by_id', partner_ids,
+        lambda missing: _lookup_in_batches(_lookup_partner_short_names,
+                                           missing))
+
+
+def _lookup_in_batches(lookup_batch, keys,
+                       batch_size=SCOPE_LOOKUP_BATCH_SIZE):
+    """
+    Call lookup_batch on batch_size keys at a time. Ids the API does not
+    return are left out.
+    :param lookup_batch: function([key]) -> {str(key): value}
+    :return values: {key: value}
+    """
+    values = {}
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        values_by_id = lookup_batch(batch)
+        values.update((key, values_by_id[str(key)]) for key in batch
+                      if str(key) in values_by_id)
+    return values
+
+
+@requests_response_to_model(
+    lambda response: dict((str(element['id']), element['slug'])
+                          for element in response.json()['elements']))
+def _lookup_course_slugs(course_ids):
+    payload = {'ids': ','.join(course_ids), 'fields': 'slug'}
+    return ApiClient.default().get(
+        COURSE_API, authorize=False, params=payload)
+
+
+@requests_response_to_model(
+    lambda response: dict((str(element['id']), element['shortName'])
+                          for element in response.json()['elements']))
+def _lookup_partner_short_names(partner_ids):
+    payload = {'ids': ','.join(str(partner_id) for partner_id in partner_ids),
+               'fields': 'shortName'}
+    return ApiClient.default().get(
+        PARTNER_API, authorize=False, params=payload)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.constants.container_constants import \
+    POSTGRES_INIT_MSG, POSTGRES_READY_MSG
+from courseraresearchexports.containers import client
+from courseraresearchexports.models.ContainerInfo import ContainerInfo
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from mock import Mock
+from mock import patch
+from nose.tools import raises
+import os
+import shutil
+import tempfile
+import time
+
+
+def test_setup_script_loads_every_part():
+    script = client.database_setup_script('fake_db', ['part_1', 'part_2'])
+
+    assert script.count('createdb') == 1
+    assert script.index('cd /mnt/exportData/part_1') < \
+        script.index('cd /mnt/exportData/part_2')
+    assert script.count('-f load.sql') == 2
+
+
+def test_setup_script_for_single_export():
+    script = client.database_setup_script('fake_db')
+
+    assert 'cd /mnt/exportData/.' in script
+    assert script.count('-f setup.sql') == 1
+
+
+@raises(ValueError)
+@patch('courseraresearchexports.containers.client.exports.concurrent_api.get')
+def test_parts_must_share_scope(concurrent_get):
+    concurrent_get.return_value = [
+        ExportRequestWithMetadata(course_id='course_1', id='1',
+                                  export_type='RESEARCH_WITH_SCHEMAS'),
+        ExportRequestWithMetadata(course_id='course_2', id='2',
+                                  export_type='RESEARCH_WITH_SCHEMAS')]
+
+    client.create_from_export_request_ids(['1', '2'], docker_client=None)
+
+
+def fake_docker_client(log_chunks, running=True):
+    docker_client = Mock()
+    docker_client.logs.side_effect = \
+        lambda container, stream=False, **kwargs: (
+            iter(log_chunks) if stream else ''.join(log_chunks))
+    docker_client.inspect_container.return_value = {
+        'State': {'Running': running}}
+    return docker_client
+
+
+fake_container_info = ContainerInfo(
+    id='fake_id', host_ip='127.0.0.1', host_port=5433, database_name='db')
+
+
+@patch('courseraresearchexports.containers.client.ContainerInfo.'
+       'from_container')
+@patch('courseraresearchexports.containers.client.container_utils.'
+       'is_database_ready')
+def test_start_waits_for_database(is_database_ready, from_container):
+    from_container.return_value = fake_container_info
+    is_database_ready.side_effect = [False, False, True]
+    docker_client = fake_docker_client(['starting\n', POSTGRES_READY_MSG])
+
+    started_at = time.time()
+    client.start('fake_container', docker_client)
+
+    assert time.time() - started_at < 1
+    assert is_database_ready.call_count == 3
+    is_database_ready.assert_called_with('127.0.0.1', 5433, 'db')
+
+
+@patch('courseraresearchexports.containers.client.ContainerInfo.'
+       'from_container')
+@patch('courseraresearchexports.containers.client.container_utils.'
+       'is_database_ready')
+def test_initialize_waits_for_init_message(is_database_ready,
+                                           from_container):
+    from_container.return_value = fake_container_info
+    is_database_ready.return_value = True
+    # the message is split across chunks of the log stream
+    docker_client = fake_docker_client(
+        ['running init scripts\n', POSTGRES_INIT_MSG[:10],
+         POSTGRES_INIT_MSG[10:]])
+
+    client.initialize('fake_container', docker_client)
+
+    assert is_database_ready.called
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.containers.client.container_utils.'
+       'is_database_ready')
+def test_initialize_fails_if_container_stops(is_database_ready):
+    docker_client = fake_docker_client(['FATAL: bad init script\n'],
+                                       running=False)
+
+    client.initialize('fake_container', docker_client)
+
+
+def write_part(folder, load_sql, sizes):
+    os.makedirs(folder)
+    with open(os.path.join(folder, 'load.sql'), 'w') as f:
+        f.write(load_sql)
+    for table, size in sizes.items():
+        with open(os.path.join(folder, table + '.csv'), 'w') as f:
+            f.write('x' * size)
+
+
+def test_plan_table_loads_largest_first():
+    export_data_folder = tempfile.mkdtemp()
+    try:
+        write_part(os.path.join(export_data_folder, 'part_1'),
+                   "\\copy small from 'small.csv' csv\n"
+                   "\\copy large from 'large.csv' csv\n"
+                   "CREATE INDEX ON large (id);\n",
+                   {'small': 10, 'large': 1000})
+        write_part(os.path.join(export_data_folder, 'part_2'),
+                   "\\copy medium from 'medium.csv' csv\n",
+                   {'medium': 100})
+
+        load_files, copy_jobs, finish_jobs = client.plan_table_loads(
+            export_data_folder, ['part_1', 'part_2'])
+
+        assert copy_jobs == ['load/000-0001-large.sql',
+                             'load/001-0000-medium.sql',
+                             'load/000-0000-small.sql']
+        assert load_files['load/000-0001-large.sql'].startswith(
+            '\\cd /mnt/exportData/part_1\n')
+        assert finish_jobs == ['load/000-finish.sql']
+        assert 'CREATE INDEX' in load_files['load/000-finish.sql']
+    finally:
+        shutil.rmtree(export_data_folder)
+
+
+def test_plan_table_loads_sizes_server_side_copies():
+    export_data_folder = tempfile.mkdtemp()
+    try:
+        write_part(os.path.join(export_data_folder, 'part_1'),
+                   "\\copy small from 'small.csv' csv\n"
+                   "COPY large FROM '/mnt/exportData/part_1/large.csv' CSV;\n",
+                   {'small': 10, 'large': 1000})
+
+        _, copy_jobs, _ = client.plan_table_loads(
+            export_data_folder, ['part_1'])
+
+        assert copy_jobs == ['load/000-0001-large.sql',
+                             'load/000-0000-small.sql']
+    finally:
+        shutil.rmtree(export_data_folder)
+
+
+def test_plan_table_loads_falls_back_to_one_session():
+    scripts = [
+        "BEGIN;\n\\copy a from 'a.csv' csv\n"
+        "\\copy b from 'b.csv' csv\nCOMMIT;\n",
+        "\\copy a from 'a.csv' csv\nCOMMIT;\n",
+        "TRUNCATE a;\n\\copy a from 'a.csv' csv\n",
+        "\\set AUTOCOMMIT off\n\\copy a from 'a.csv' csv\n"]
+    for load_sql in scripts:
+        export_data_folder = tempfile.mkdtemp()
+        try:
+            write_part(os.path.join(export_data_folder, 'part_1'), load_sql,
+                       {'a': 10, 'b': 10})
+
+            assert client.plan_table_loads(
+                export_data_folder, ['part_1']) is None, load_sql
+        finally:
+            shutil.rmtree(export_data_folder)
+
+
+def test_plan_table_loads_without_load_script():
+    export_data_folder = tempfile.mkdtemp()
+    try:
+        assert client.plan_table_loads(export_data_folder) is None
+    finally:
+        shutil.rmtree(export_data_folder)
+
+
+def test_setup_script_loads_tables_concurrently():
+    script = client.database_setup_script(
+        'fake_db', copy_jobs=['load/000-0000-large.sql'],
+        finish_jobs=['load/000-finish.sql'], load_sessions=4)
+
+    assert '-f load.sql' not in script
+    assert 'xargs -P 4' in script
+    assert script.index('/docker-entrypoint-initdb.d/load/000-0000') < \
+        script.index('/docker-entrypoint-initdb.d/load/000-finish.sql')
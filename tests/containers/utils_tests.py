@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.containers import utils
+import socket
+import struct
+import threading
+
+
+def fake_postgres(response):
+    """
+    Listen on a free port and answer one startup message with response.
+    :return port:
+    """
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def answer():
+        connection, _ = server.accept()
+        length, = struct.unpack('!i', connection.recv(4))
+        connection.recv(length - 4)
+        connection.sendall(response)
+        connection.close()
+        server.close()
+
+    thread = threading.Thread(target=answer)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+
+def error_response(sqlstate):
+    fields = b'SFATAL\0C' + sqlstate + b'\0Mfake error\0\0'
+    return b'E' + struct.pack('!i', len(fields) + 4) + fields
+
+
+def test_database_ready_when_asking_for_authentication():
+    port = fake_postgres(b'R' + struct.pack('!ii', 8, 0))
+
+    assert utils.is_database_ready('127.0.0.1', port, 'db')
+
+
+def test_database_not_ready_while_starting_up():
+    port = fake_postgres(error_response(b'57P03'))
+
+    assert not utils.is_database_ready('127.0.0.1', port, 'db')
+
+
+def test_database_ready_despite_other_errors():
+    port = fake_postgres(error_response(b'3D000'))
+
+    assert utils.is_database_ready('127.0.0.1', port, 'db')
+
+
+def test_database_not_ready_without_server():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    server.close()
+
+    assert not utils.is_database_ready('127.0.0.1', port, 'db')
+
+
+def test_split_load_script():
+    preamble, copies, postamble = utils.split_load_script(
+        "SET client_encoding = 'UTF8';\n"
+        "-- tables\n"
+        "\\copy \"course_progress\" from 'course_progress.csv' "
+        "with csv header\n"
+        "COPY users\n"
+        "    FROM '/mnt/exportData/users.csv' WITH CSV HEADER;\n"
+        "ANALYZE;\n")
+
+    assert preamble == ["SET client_encoding = 'UTF8';"]
+    assert [(table, source) for table, source, _ in copies] == [
+        ('course_progress', 'course_progress.csv'),
+        ('users', '/mnt/exportData/users.csv')]
+    assert copies[1][2].endswith('WITH CSV HEADER;')
+    assert postamble == ['ANALYZE;']
+
+
+def test_can_load_concurrently():
+    assert utils.can_load_concurrently(
+        ["SET client_encoding = 'UTF8';"], ['ANALYZE;'])
+    assert not utils.can_load_concurrently(['TRUNCATE users;'], [])
+    assert not utils.can_load_concurrently(
+        ["SET client_encoding = 'UTF8';"], ['COMMIT;'])
+    assert not utils.can_load_concurrently(['BEGIN;'], ['END;'])
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.exports import api
+from courseraresearchexports.models.ExportRequest import ExportRequest
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestMetadata, ExportRequestWithMetadata
+from courseraresearchexports.models.JobIndex import JobIndex
+from mock import Mock
+from mock import patch
+from datetime import datetime, timedelta
+import os
+import shutil
+import tempfile
+
+
+def fake_page(ids, next_start=None):
+    response = Mock()
+    response.json.return_value = {
+        'elements': [{'id': id, 'scope': {
+            'typeName': 'courseContext',
+            'definition': {'courseId': 'fake_course_id'}}} for id in ids],
+        'paging': {'next': next_start} if next_start else {}}
+    return response
+
+
+@patch('courseraresearchexports.exports.api.ApiClient.default')
+def test_iter_all_follows_cursor_lazily(default_client):
+    default_client.return_value.get.side_effect = [
+        fake_page(['1', '2'], next_start='2'),
+        fake_page(['3'])]
+
+    export_requests = api.iter_all(page_size=2)
+
+    assert next(export_requests).id == '1'
+    assert default_client.return_value.get.call_count == 1
+    assert [export_request.id for export_request in export_requests] == \
+        ['2', '3']
+    assert default_client.return_value.get.call_args[1]['params'] == {
+        'q': 'my', 'limit': 2, 'start': '2'}
+
+
+def fake_job(id, status, etag=None):
+    response = Mock()
+    response.status_code = 200
+    response.headers = {'ETag': etag} if etag else {}
+    response.json.return_value = {'elements': [{
+        'id': id, 'status': status, 'scope': {
+            'typeName': 'courseContext',
+            'definition': {'courseId': 'fake_course_id'}}}]}
+    return response
+
+
+def not_modified():
+    response = Mock()
+    response.status_code = 304
+    response.headers = {}
+    return response
+
+
+class TestJobCache:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.job_index = JobIndex(os.path.join(self.folder, 'jobs.sqlite'))
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    @patch('courseraresearchexports.exports.api.ApiClient.default')
+    def test_finished_jobs_are_not_fetched_again(self, default_client):
+        default_client.return_value.get.return_value = fake_job(
+            '1', 'SUCCESSFUL')
+
+        with patch.object(JobIndex, 'default', return_value=self.job_index):
+            first = api.get('1')
+            second = api.get('1', max_age=0)
+
+        assert first == second
+        assert default_client.return_value.get.call_count == 1
+
+    @patch('courseraresearchexports.exports.api.ApiClient.default')
+    def test_running_jobs_are_revalidated(self, default_client):
+        default_client.return_value.get.side_effect = [
+            fake_job('1', 'IN_PROGRESS', etag='"v1"'), not_modified()]
+
+        with patch.object(JobIndex, 'default', return_value=self.job_index):
+            first = api.get('1')
+            cached = api.get('1')
+            revalidated = api.get('1', max_age=0)
+
+        assert first == cached == revalidated
+        assert default_client.return_value.get.call_count == 2
+        assert default_client.return_value.get.call_args[1]['headers'] == {
+            'If-None-Match': '"v1"'}
+
+
+def fake_existing(id, status, age, course_id='fake_course_id'):
+    return ExportRequestWithMetadata(
+        course_id=course_id, id=id, status=status,
+        metadata=ExportRequestMetadata(created_at=datetime.now() - age))
+
+
+@patch('courseraresearchexports.exports.api.get_all')
+def test_find_existing_prefers_completed_recent_jobs(get_all):
+    get_all.return_value = [
+        fake_existing('running', 'IN_PROGRESS', timedelta(hours=1)),
+        fake_existing('done', 'SUCCESSFUL', timedelta(days=1)),
+        fake_existing('too_old', 'SUCCESSFUL', timedelta(days=30)),
+        fake_existing('failed', 'TERMINATED', timedelta(hours=2)),
+        fake_existing('other', 'SUCCESSFUL', timedelta(hours=1),
+                      course_id='other_course_id')]
+    export_request = ExportRequest(course_id='fake_course_id')
+
+    assert api.find_existing(export_request, timedelta(days=7)).id == 'done'
+    assert api.find_existing(
+        export_request, timedelta(hours=12)).id == 'running'
+    assert api.find_existing(export_request, timedelta(minutes=1)) is None
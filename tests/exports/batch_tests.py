@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.constants.api_constants import \
+    EXPORT_TYPE_CLICKSTREAM, EXPORT_TYPE_TABLES
+from courseraresearchexports.exports import batch
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from mock import patch
+from nose.tools import raises
+import csv
+import os
+import shutil
+import tempfile
+
+fake_purpose = 'fake_purpose'
+
+
+class TestManifest:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_read_csv_manifest(self):
+        filename = os.path.join(self.folder, 'manifest.csv')
+        with open(filename, 'wb') as f:
+            f.write('export_type,course_id,partner_id,schemas\n'
+                    'tables,course_1,,demographics users\n'
+                    'clickstream,,1,\n')
+
+        rows = batch.read_manifest(filename)
+
+        assert rows == [
+            {'export_type': 'tables', 'course_id': 'course_1',
+             'schemas': 'demographics users'},
+            {'export_type': 'clickstream', 'partner_id': '1'}]
+
+    def test_write_results(self):
+        filename = os.path.join(self.folder, 'results.csv')
+
+        batch.write_results([{'row': 1, 'export_type': 'tables',
+                              'scope': u'course_1', 'scope_id': u'course_1',
+                              'job_id': u'job_1', 'error': None}], filename)
+
+        with open(filename, 'rb') as f:
+            assert list(csv.DictReader(f))[0]['job_id'] == 'job_1'
+
+
+def test_export_request_from_row():
+    tables = batch.export_request_from_row(
+        {'course_id': 'course_1', 'schemas': 'demographics users'},
+        defaults={'purpose': fake_purpose})
+    clickstream = batch.export_request_from_row(
+        {'partner_id': '1', 'export_type': 'clickstream',
+         'interval_start': '2016-09-01', 'interval_end': '2016-09-02',
+         'purpose': fake_purpose})
+
+    assert tables.export_type == EXPORT_TYPE_TABLES
+    assert tables.schema_names == ['demographics', 'users']
+    assert clickstream.export_type == EXPORT_TYPE_CLICKSTREAM
+    assert clickstream.partner_id == 1
+    assert clickstream.interval == ['2016-09-01', '2016-09-02']
+
+
+@raises(ValueError)
+def test_export_request_from_row_requires_scope():
+    batch.export_request_from_row({'purpose': fake_purpose})
+
+
+@patch('courseraresearchexports.exports.concurrent_api.api.post')
+def test_submit_maps_rows_to_job_ids(api_post):
+    def fake_post(export_request):
+        if export_request.course_id == 'course_2':
+            raise ValueError('rate limited')
+        return [ExportRequestWithMetadata(
+            course_id=export_request.course_id,
+            id='job_for_' + export_request.course_id)]
+    api_post.side_effect = fake_post
+    rows = [{'course_id': 'course_1'}, {'course_id': 'course_2'},
+            {'schemas': 'users'}, {'course_id': 'course_3'}]
+
+    results = batch.submit(rows, defaults={'purpose': fake_purpose},
+                           max_concurrency=2, rate=1000, burst=10)
+
+    assert [result['job_id'] for result in results] == \
+        ['job_for_course_1', None, None, 'job_for_course_3']
+    assert results[1]['error'] == 'rate limited'
+    assert 'one of the columns' in results[2]['error']
+    assert api_post.call_count == 3
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.exports.cache import DownloadCache
+import os
+import shutil
+import tempfile
+
+fake_export_id = 'fake_export_id'
+
+
+class TestDownloadCache:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = DownloadCache(
+            folder=os.path.join(self.folder, 'cache'), max_bytes=10)
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, data):
+        filename = os.path.join(self.folder, name)
+        with open(filename, 'w') as f:
+            f.write(data)
+        return filename
+
+    def test_fetch_miss(self):
+        dest = os.path.join(self.folder, 'dest.zip')
+
+        assert not self.cache.fetch(fake_export_id, 'export.zip', dest)
+        assert not os.path.exists(dest)
+
+    def test_store_then_fetch(self):
+        src = self.write('export.zip', 'abc')
+        self.cache.store(fake_export_id, 'export.zip', src)
+        os.remove(src)
+
+        assert self.cache.fetch(fake_export_id, 'export.zip', src)
+        with open(src) as f:
+            assert f.read() == 'abc'
+
+    def test_least_recently_used_is_evicted(self):
+        dest = os.path.join(self.folder, 'dest')
+        self.cache.store('old', 'a.gz', self.write('a.gz', 'aaaa'))
+        self.cache.store('recent', 'b.gz', self.write('b.gz', 'bbbb'))
+        self.cache.fetch('old', 'a.gz', dest)
+        self.cache.store('new', 'c.gz', self.write('c.gz', 'cccc'))
+
+        assert self.cache.fetch('old', 'a.gz', dest)
+        assert not self.cache.fetch('recent', 'b.gz', dest)
+        assert self.cache.fetch('new', 'c.gz', dest)
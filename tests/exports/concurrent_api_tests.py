@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.exports import concurrent_api
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from mock import patch
+from nose.tools import raises
+
+fake_course_id = 'fake_course_id'
+fake_export_ids = ['1', '2', '3']
+
+
+def fake_get(export_job_id, max_age=None):
+    if export_job_id == '2':
+        raise ValueError('not found')
+    return [ExportRequestWithMetadata(course_id=fake_course_id,
+                                      id=export_job_id)]
+
+
+@patch('courseraresearchexports.exports.concurrent_api.api.get')
+def test_get_preserves_order(api_get):
+    api_get.side_effect = lambda export_job_id, max_age=None: [
+        ExportRequestWithMetadata(course_id=fake_course_id, id=export_job_id)]
+
+    export_requests = concurrent_api.get(fake_export_ids, max_concurrency=3)
+
+    assert [export_request.id for export_request in export_requests] == \
+        fake_export_ids
+
+
+@patch('courseraresearchexports.exports.concurrent_api.api.get')
+def test_get_return_exceptions(api_get):
+    api_get.side_effect = fake_get
+
+    export_requests = concurrent_api.get(
+        fake_export_ids, max_concurrency=3, return_exceptions=True)
+
+    assert isinstance(export_requests[1], ValueError)
+    assert export_requests[2].id == '3'
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.exports.concurrent_api.api.get')
+def test_get_raises_after_all_requests(api_get):
+    api_get.side_effect = fake_get
+
+    concurrent_api.get(fake_export_ids, max_concurrency=3)
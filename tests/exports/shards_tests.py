@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.constants.api_constants import \
+    EXPORT_TYPE_CLICKSTREAM
+from courseraresearchexports.exports import shards
+from courseraresearchexports.models.ExportRequest import ExportRequest
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from mock import patch
+from nose.tools import raises
+
+fake_course_id = 'fake_course_id'
+
+
+def fake_clickstream_request(start, end):
+    return ExportRequest(course_id=fake_course_id,
+                         export_type=EXPORT_TYPE_CLICKSTREAM,
+                         statement_of_purpose='backfill',
+                         interval=[start, end])
+
+
+def fake_job(id, status):
+    return ExportRequestWithMetadata(course_id=fake_course_id, id=id,
+                                     status=status)
+
+
+def test_shard_splits_interval():
+    shard_requests = shards.shard_interval(
+        fake_clickstream_request('2016-09-01', '2016-09-03'), 1)
+
+    assert shard_requests == [
+        fake_clickstream_request(day, day)
+        for day in ['2016-09-01', '2016-09-02', '2016-09-03']]
+
+
+@raises(ValueError)
+def test_shard_requires_interval():
+    shards.shard_interval(ExportRequest(course_id=fake_course_id), 1)
+
+
+@patch('courseraresearchexports.exports.shards.wait.wait')
+@patch('courseraresearchexports.exports.shards.concurrent_api.post')
+def test_failed_shards_are_requested_again(post, wait):
+    shard_requests = shards.shard_interval(
+        fake_clickstream_request('2016-09-01', '2016-09-03'), 1)
+    jobs = [fake_job('1', 'PENDING'), ValueError('rate limited'),
+            fake_job('3', 'PENDING')]
+    post.return_value = [fake_job('2b', 'PENDING'), fake_job('3b', 'PENDING')]
+    wait.side_effect = [
+        {'1': fake_job('1', 'SUCCESSFUL'), '3': fake_job('3', 'TERMINATED')},
+        {'2b': fake_job('2b', 'SUCCESSFUL'),
+         '3b': fake_job('3b', 'SUCCESSFUL')}]
+
+    done = shards.wait_for_shards(shard_requests, jobs, dest='fake_dest')
+
+    assert post.call_args[0][0] == shard_requests[1:]
+    assert sorted(job.id for job in done) == ['1', '2b', '3b']
+    assert wait.call_args[1]['dest'] == 'fake_dest'
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.exports.shards.wait.wait')
+def test_shards_give_up_after_retries(wait):
+    shard_requests = shards.shard_interval(
+        fake_clickstream_request('2016-09-01', '2016-09-01'), 1)
+    wait.return_value = {'1': fake_job('1', 'TERMINATED')}
+
+    shards.wait_for_shards(shard_requests, [fake_job('1', 'PENDING')],
+                           retries=0)
+
+
+def test_schema_groups():
+    schema_names = ['demographics', 'users', 'course_progress', 'feedback']
+
+    assert shards.schema_groups(schema_names) == [
+        ['demographics'], ['users'], ['course_progress'], ['feedback']]
+    assert shards.schema_groups(
+        schema_names, [['course_progress'], ['demographics', 'users']]) == [
+        ['course_progress'], ['demographics', 'users'], ['feedback']]
+
+
+def test_shard_schemas():
+    export_request = ExportRequest(course_id=fake_course_id,
+                                   statement_of_purpose='sweep',
+                                   schema_names=['demographics', 'users'])
+
+    shard_requests = shards.shard_schemas(
+        export_request, [['demographics'], ['users']])
+
+    assert [shard_request.schema_names for shard_request in shard_requests] \
+        == [['demographics'], ['users']]
+    assert shard_requests[0].statement_of_purpose == 'sweep'
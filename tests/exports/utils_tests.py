@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.constants.download_constants import \
+    DOWNLOAD_MIN_SEGMENT_SIZE
+from courseraresearchexports.exports import utils
+from courseraresearchexports.models.ClickstreamDownloadLinksRequest import \
+    ClickstreamDownloadLinksRequest
+from courseraresearchexports.models.ClickstreamManifest import \
+    ClickstreamManifest
+from courseraresearchexports.models.DownloadManifest import DownloadManifest
+from mock import Mock
+from mock import patch
+from nose.tools import raises
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+fake_dest = '/tmp/fake_dest'
+fake_urls = ['https://fake.s3.amazonaws.com/{}.gz'.format(day)
+             for day in ['2016-09-01', '2016-09-02', '2016-09-03']]
+
+
+def test_parallel_map_preserves_order():
+    results = utils.parallel_map(lambda x: x * 2, [1, 2, 3, 4], 3)
+
+    assert [result for _, result, _ in results] == [2, 4, 6, 8]
+
+
+def test_parallel_map_collects_errors():
+    def fail_on_two(x):
+        if x == 2:
+            raise ValueError(x)
+        return x
+
+    results = utils.parallel_map(fail_on_two, [1, 2, 3], 2)
+
+    assert [error is None for _, _, error in results] == [True, False, True]
+
+
+@patch('courseraresearchexports.exports.utils.download_url')
+def test_download_urls(download_url):
+    download_url.side_effect = lambda url, dest: url
+
+    assert utils.download_urls(fake_urls, fake_dest, parallel=2) == fake_urls
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.exports.utils.download_url')
+def test_download_urls_attempts_all_before_raising(download_url):
+    def fail_first(url, dest):
+        if url == fake_urls[0]:
+            raise IOError('connection reset')
+        return url
+    download_url.side_effect = fail_first
+
+    try:
+        utils.download_urls(fake_urls, fake_dest, parallel=2)
+    finally:
+        assert download_url.call_count == len(fake_urls)
+
+
+def fake_response(body, status_code=200, headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {'Content-length': str(len(body))}
+    response.iter_content.return_value = [body]
+    return response
+
+
+@patch('courseraresearchexports.exports.utils.requests.get')
+def test_download_url_resumes_partial_file(requests_get):
+    dest = tempfile.mkdtemp()
+    try:
+        partial = os.path.join(dest, 'export.zip.part')
+        with open(partial, 'wb') as f:
+            f.write(b'abc')
+        with open(partial + '.json', 'w') as f:
+            json.dump({'size': 6, 'etag': '"v1"'}, f)
+        requests_get.return_value = fake_response(
+            b'def', status_code=206,
+            headers={'Content-Range': 'bytes 3-5/6', 'ETag': '"v1"'})
+
+        filename = utils.download_url(
+            'https://fake.cdn/export.zip', dest, retries=0)
+
+        with open(filename, 'rb') as f:
+            assert f.read() == b'abcdef'
+        assert requests_get.call_args[1]['headers'] == {'Range': 'bytes=3-'}
+        assert not os.path.exists(partial + '.json')
+    finally:
+        shutil.rmtree(dest)
+
+
+@raises(IOError)
+@patch('courseraresearchexports.exports.utils.requests.get')
+def test_download_url_detects_truncation(requests_get):
+    dest = tempfile.mkdtemp()
+    try:
+        requests_get.return_value = fake_response(
+            b'abc', headers={'Content-length': '6'})
+
+        utils.download_url('https://fake.cdn/export.zip', dest, retries=0)
+    finally:
+        shutil.rmtree(dest)
+
+
+@patch('courseraresearchexports.exports.utils.time.sleep')
+@patch('courseraresearchexports.exports.utils.requests.get')
+def test_download_url_retries_from_last_byte(requests_get, sleep):
+    dest = tempfile.mkdtemp()
+    try:
+        requests_get.side_effect = [
+            fake_response(b'abc', headers={'Content-length': '6'}),
+            fake_response(b'def', status_code=206,
+                          headers={'Content-Range': 'bytes 3-5/6'})]
+
+        filename = utils.download_url(
+            'https://fake.cdn/export.zip', dest, retries=1)
+
+        with open(filename, 'rb') as f:
+            assert f.read() == b'abcdef'
+        assert sleep.call_count == 1
+    finally:
+        shutil.rmtree(dest)
+
+
+@raises(IOError)
+@patch('courseraresearchexports.exports.utils.requests.get')
+def test_download_url_checks_md5_etag(requests_get):
+    dest = tempfile.mkdtemp()
+    try:
+        requests_get.return_value = fake_response(b'abcdef', headers={
+            'Content-length': '6',
+            'ETag': '"{}"'.format(hashlib.md5(b'abcdeg').hexdigest())})
+
+        try:
+            utils.download_url('https://fake.cdn/export.zip', dest,
+                               retries=0)
+        finally:
+            assert os.listdir(dest) == []
+    finally:
+        shutil.rmtree(dest)
+
+
+@patch('courseraresearchexports.exports.utils.time.sleep')
+@patch('courseraresearchexports.exports.utils.requests.get')
+def test_download_url_records_streamed_md5(requests_get, sleep):
+    dest = tempfile.mkdtemp()
+    try:
+        md5 = hashlib.md5(b'abcdef').hexdigest()
+        etag = '"{}"'.format(md5)
+        requests_get.side_effect = [
+            fake_response(b'abc', headers={'Content-length': '6',
+                                           'ETag': etag}),
+            fake_response(b'def', status_code=206,
+                          headers={'Content-Range': 'bytes 3-5/6',
+                                   'ETag': etag})]
+        manifest = DownloadManifest(export_request_id='fake_id')
+
+        utils.download_url('https://fake.cdn/export.zip', dest, retries=1,
+                           manifest=manifest)
+
+        assert manifest.files['export.zip']['md5'] == md5
+        assert manifest.is_verified(dest, 'export.zip')
+    finally:
+        shutil.rmtree(dest)
+
+
+@patch('courseraresearchexports.exports.utils.download_url')
+def test_download_skips_verified_files(download_url):
+    dest = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(dest, '2016-09-01.gz'), 'wb') as f:
+            f.write(b'abc')
+        manifest = DownloadManifest(export_request_id='fake_id')
+        manifest.record(dest, '2016-09-01.gz')
+        download_url.side_effect = \
+            lambda url, dest, manifest: os.path.join(dest, url)
+
+        filenames = utils.download_urls(fake_urls, dest,
+                                        export_request_id='fake_id',
+                                        manifest=manifest)
+
+        assert filenames[0] == os.path.join(dest, '2016-09-01.gz')
+        assert download_url.call_count == len(fake_urls) - 1
+    finally:
+        shutil.rmtree(dest)
+
+
+def test_plan_segments_covers_file():
+    size = 3 * DOWNLOAD_MIN_SEGMENT_SIZE + 7
+
+    segments = utils._plan_segments(size, 4)
+
+    assert segments[0][0] == 0
+    assert segments[-1][1] == size - 1
+    assert all(prev[1] + 1 == cur[0]
+               for prev, cur in zip(segments, segments[1:]))
+    assert len(segments) == 3
+
+
+@patch('courseraresearchexports.exports.utils.download_url')
+@patch('courseraresearchexports.exports.utils.api.'
+       'get_clickstream_download_links')
+def test_sync_clickstream_requests_only_missing_days(get_links, download_url):
+    dest = tempfile.mkdtemp()
+    try:
+        manifest = ClickstreamManifest(scope='courseContext~fake_course_id')
+        manifest.record('2016-09-02', ['2016-09-02.gz'])
+        open(os.path.join(dest, '2016-09-02.gz'), 'w').close()
+        manifest.save(dest)
+        get_links.side_effect = lambda request: [
+            'https://fake.s3.amazonaws.com/{}.gz'.format(date)
+            for date in request.interval]
+        download_url.side_effect = lambda url, dest_folder: os.path.join(
+            dest_folder, url.split('/')[-1])
+
+        utils.sync_clickstream(ClickstreamDownloadLinksRequest(
+            course_id='fake_course_id',
+            interval=['2016-09-01', '2016-09-04']), dest)
+
+        intervals = [call[0][0].interval for call in get_links.call_args_list]
+        assert intervals == [['2016-09-01', '2016-09-01'],
+                             ['2016-09-03', '2016-09-04']]
+    finally:
+        shutil.rmtree(dest)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.exports import wait
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from mock import Mock
+from mock import patch
+from nose.tools import raises
+import requests
+
+fake_course_id = 'fake_course_id'
+fake_dest = '/tmp/fake_dest'
+
+
+def fake_statuses(statuses_by_id):
+    """
+    Fake concurrent_api.get returning the next status of each job per poll.
+    """
+    def get(export_job_ids, return_exceptions=False, max_age=None):
+        return [_status(export_job_id, statuses_by_id[export_job_id].pop(0))
+                for export_job_id in export_job_ids]
+    return get
+
+
+def _status(export_job_id, status):
+    if isinstance(status, Exception):
+        return status
+    return ExportRequestWithMetadata(
+        course_id=fake_course_id, id=export_job_id, status=status)
+
+
+def http_error(status_code):
+    return requests.exceptions.HTTPError(
+        response=Mock(status_code=status_code))
+
+
+@patch('courseraresearchexports.exports.wait.utils.download')
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_downloads_each_job_when_done(concurrent_get, download):
+    concurrent_get.side_effect = fake_statuses({
+        '1': ['PENDING', 'IN_PROGRESS', 'SUCCESSFUL'],
+        '2': ['SUCCESSFUL']})
+
+    finished = wait.wait(['1', '2'], dest=fake_dest, initial_interval=0)
+
+    assert sorted(finished.keys()) == ['1', '2']
+    assert sorted(call[0][0].id for call in download.call_args_list) == \
+        ['1', '2']
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_raises_for_terminated_jobs(concurrent_get):
+    concurrent_get.side_effect = fake_statuses({
+        '1': ['TERMINATED'], '2': ['SUCCESSFUL']})
+
+    wait.wait(['1', '2'], initial_interval=0)
+
+
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_returns_terminated_jobs(concurrent_get):
+    concurrent_get.side_effect = fake_statuses({
+        '1': ['TERMINATED'], '2': ['SUCCESSFUL']})
+
+    finished = wait.wait(['1', '2'], initial_interval=0,
+                         raise_on_terminated=False)
+
+    assert finished['1'].status == 'TERMINATED'
+
+
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_gives_up_on_unknown_job(concurrent_get):
+    concurrent_get.side_effect = fake_statuses({
+        '1': [http_error(404)], '2': ['PENDING', 'SUCCESSFUL']})
+
+    try:
+        wait.wait(['1', '2'], initial_interval=0)
+        assert False, 'expected RuntimeError'
+    except RuntimeError as err:
+        assert '1 of 2' in str(err)
+
+    # the unknown job was polled once, the other until it finished
+    assert sum(call[0][0].count('1')
+               for call in concurrent_get.call_args_list) == 1
+
+
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_retries_transient_errors(concurrent_get):
+    concurrent_get.side_effect = fake_statuses({
+        '1': [http_error(503), requests.exceptions.ConnectionError(),
+              'SUCCESSFUL']})
+
+    finished = wait.wait(['1'], initial_interval=0, max_errors=3)
+
+    assert finished['1'].status == 'SUCCESSFUL'
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.exports.wait.concurrent_api.get')
+def test_wait_limits_consecutive_errors(concurrent_get):
+    concurrent_get.side_effect = fake_statuses({
+        '1': [requests.exceptions.ConnectionError()] * 3})
+
+    wait.wait(['1'], initial_interval=0, max_errors=3)
+
+
+def test_jittered_interval_bounds():
+    assert all(5 <= wait._jittered(10) <= 10 for _ in range(100))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Startup checks for the command line entry point. Every invocation, and
+every tab completion, builds the full parser, so it must not import the
+dependencies that only subcommands need. Wall clock budgets depend on the
+machine, so they are only checked when CHECK_STARTUP_BUDGETS is set:
+
+    CHECK_STARTUP_BUDGETS=1 nosetests tests/main_tests.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHECK_BUDGETS = bool(os.environ.get('CHECK_STARTUP_BUDGETS'))
+# seconds to import the entry point and build the parser, best of REPEAT
+STARTUP_BUDGET_SECONDS = 0.3
+# seconds to answer a tab completion request, best of REPEAT
+COMPLETION_BUDGET_SECONDS = 0.4
+REPEAT = 3 if CHECK_BUDGETS else 1
+
+HEAVY_MODULES = ['courseraoauth2client', 'dateutil', 'docker',
+                 'pkg_resources', 'requests', 'sqlalchemy', 'tabulate',
+                 'tqdm', 'yaml']
+
+MEASURE = """
+import json, sys, time
+started_at = time.time()
+{code}
+seconds = time.time() - started_at
+print(json.dumps({{
+    'seconds': seconds,
+    'modules': sorted(set(name.split('.')[0] for name, module
+                          in sys.modules.items() if module is not None))}}))
+"""
+
+BUILD_PARSER = """
+import courseraresearchexports.main
+courseraresearchexports.main.build_parser()
+"""
+
+COMPLETE = """
+import argcomplete
+import courseraresearchexports.main
+with open({output!r}, 'wb') as output_stream:
+    try:
+        argcomplete.autocomplete(courseraresearchexports.main.build_parser(),
+                                 output_stream=output_stream,
+                                 exit_method=sys.exit)
+    except SystemExit:
+        pass
+"""
+
+
+def measure(code, env=None):
+    """
+    Run code in a fresh interpreter, REPEAT times.
+    :return (seconds, modules): fastest run time and the top level modules
+        imported by the end of the run
+    """
+    runs = []
+    for _ in range(REPEAT):
+        output = subprocess.check_output(
+            [sys.executable, '-c', MEASURE.format(code=code)],
+            env=dict(os.environ, **(env or {})),
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        runs.append(json.loads(output.decode('utf8').splitlines()[-1]))
+    return (min(run['seconds'] for run in runs), runs[0]['modules'])
+
+
+def test_startup_skips_heavy_imports():
+    seconds, modules = measure(BUILD_PARSER)
+
+    assert not set(HEAVY_MODULES) & set(modules), \
+        set(HEAVY_MODULES) & set(modules)
+    assert not CHECK_BUDGETS or seconds < STARTUP_BUDGET_SECONDS, seconds
+
+
+def test_completion_latency():
+    completions_file = tempfile.NamedTemporaryFile(delete=False)
+    completions_file.close()
+    command_line = 'courseraresearchexports jobs req'
+    try:
+        seconds, modules = measure(
+            COMPLETE.format(output=completions_file.name),
+            env={'_ARGCOMPLETE': '1',
+                 'COMP_LINE': command_line,
+                 'COMP_POINT': str(len(command_line))})
+
+        with open(completions_file.name, 'rb') as f:
+            completions = f.read().decode('utf8').split('\v')
+        assert 'request' in [c.strip() for c in completions], completions
+        assert not set(HEAVY_MODULES) & set(modules)
+        assert not CHECK_BUDGETS or seconds < COMPLETION_BUDGET_SECONDS, \
+            seconds
+    finally:
+        os.remove(completions_file.name)
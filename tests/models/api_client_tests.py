@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.ApiClient import ApiClient
+from mock import Mock
+from mock import patch
+import time
+
+fake_url = 'https://www.coursera.org/api/fake.v1/'
+
+
+def test_session_is_reused():
+    api_client = ApiClient(pool_size=2)
+
+    assert api_client.session is api_client.session
+
+
+@patch('courseraresearchexports.models.ApiClient.oauth2.build_oauth2')
+def test_authorizer_is_cached(build_oauth2):
+    build_oauth2.return_value.build_authorizer.return_value = Mock(
+        expires=time.time() + 3600)
+    api_client = ApiClient()
+
+    assert api_client.auth is api_client.auth
+    assert build_oauth2.call_count == 1
+
+
+@patch('courseraresearchexports.models.ApiClient.oauth2.build_oauth2')
+def test_expiring_authorizer_is_rebuilt(build_oauth2):
+    build_oauth2.return_value.build_authorizer.side_effect = [
+        Mock(expires=time.time()), Mock(expires=time.time() + 3600)]
+    api_client = ApiClient()
+
+    api_client.auth
+    api_client.auth
+
+    assert build_oauth2.call_count == 2
+
+
+def test_unauthorized_get_skips_oauth():
+    api_client = ApiClient()
+    api_client._session = Mock()
+
+    api_client.get(fake_url, authorize=False)
+
+    api_client._session.get.assert_called_with(fake_url)
+
+
+def test_throttled_responses_lower_concurrency():
+    api_client = ApiClient(pool_size=4)
+    api_client._session = Mock()
+    api_client._session.get.return_value = Mock(status_code=429)
+
+    api_client.get(fake_url, authorize=False)
+
+    assert api_client.concurrency.limit == 2
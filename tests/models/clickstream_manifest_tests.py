@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.ClickstreamManifest import \
+    ClickstreamManifest, contiguous_intervals, split_interval
+import os
+import shutil
+import tempfile
+
+fake_scope = 'courseContext~fake_course_id'
+
+
+def test_split_interval():
+    assert split_interval('2016-08-30', '2016-09-12', 7) == [
+        ['2016-08-30', '2016-09-05'], ['2016-09-06', '2016-09-12']]
+    assert split_interval('2016-08-30', '2016-09-01', 7) == [
+        ['2016-08-30', '2016-09-01']]
+
+
+def test_contiguous_intervals():
+    dates = ['2016-08-30', '2016-08-31', '2016-09-01', '2016-09-03']
+
+    assert contiguous_intervals(dates) == [
+        ['2016-08-30', '2016-09-01'], ['2016-09-03', '2016-09-03']]
+
+
+def test_missing_dates():
+    folder = tempfile.mkdtemp()
+    try:
+        open(os.path.join(folder, '2016-09-01.gz'), 'w').close()
+        manifest = ClickstreamManifest(scope=fake_scope)
+        manifest.record('2016-09-01', ['2016-09-01.gz'])
+        manifest.record('2016-09-02', ['2016-09-02.gz'])
+
+        assert manifest.missing_dates('2016-09-01', '2016-09-03', folder) == [
+            '2016-09-02', '2016-09-03']
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_manifest_round_trip():
+    folder = tempfile.mkdtemp()
+    try:
+        manifest = ClickstreamManifest(scope=fake_scope)
+        manifest.record('2016-09-01', ['2016-09-01.gz'])
+        manifest.save(folder)
+
+        loaded = ClickstreamManifest.load(folder, fake_scope)
+
+        assert loaded.files_by_date == {'2016-09-01': ['2016-09-01.gz']}
+    finally:
+        shutil.rmtree(folder)
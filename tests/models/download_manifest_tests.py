@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.DownloadManifest import DownloadManifest
+import os
+import shutil
+import tempfile
+
+
+def test_is_verified():
+    folder = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(folder, 'export.zip'), 'wb') as f:
+            f.write(b'abcdef')
+        manifest = DownloadManifest(export_request_id='fake_id')
+
+        assert not manifest.is_verified(folder, 'export.zip')
+        manifest.record(folder, 'export.zip', md5='fake_md5')
+        assert manifest.is_verified(folder, 'export.zip')
+
+        with open(os.path.join(folder, 'export.zip'), 'ab') as f:
+            f.write(b'g')
+        assert not manifest.is_verified(folder, 'export.zip')
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_manifest_round_trip():
+    folder = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(folder, 'export.zip'), 'wb') as f:
+            f.write(b'abcdef')
+        DownloadManifest(export_request_id='fake_id').record(
+            folder, 'export.zip', md5='fake_md5')
+
+        manifest = DownloadManifest.load(folder, 'fake_id')
+
+        assert manifest.files['export.zip']['md5'] == 'fake_md5'
+        assert manifest.is_verified(folder, 'export.zip')
+        assert DownloadManifest.load(folder, 'other_id').files == {}
+    finally:
+        shutil.rmtree(folder)
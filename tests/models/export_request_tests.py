@@ -133,3 +133,20 @@ def test_export_request_with_metadata_deserialize_from_json():
 
     assert export_request == ExportRequestWithMetadata(
         course_id=fake_course_id, id=fake_export_id)
+
+
+def test_matches_ignores_purpose_and_schema_order():
+    export_request = ExportRequest(
+        course_id=fake_course_id, export_type=EXPORT_TYPE_TABLES,
+        statement_of_purpose='new purpose',
+        schema_names=['users', 'demographics'])
+    existing = ExportRequestWithMetadata(
+        course_id=fake_course_id, export_type=EXPORT_TYPE_TABLES,
+        statement_of_purpose='old purpose', id=fake_export_id,
+        schema_names=['demographics', 'users'])
+    other_schemas = ExportRequest(
+        course_id=fake_course_id, export_type=EXPORT_TYPE_TABLES,
+        schema_names=['users'])
+
+    assert export_request.matches(existing)
+    assert not export_request.matches(other_schemas)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.constants.api_constants import \
+    EXPORT_TYPE_CLICKSTREAM, EXPORT_TYPE_TABLES
+from courseraresearchexports.models.ExportRequestWithMetadata import \
+    ExportRequestWithMetadata
+from courseraresearchexports.models.JobIndex import JobIndex
+import os
+import shutil
+import sqlite3
+import tempfile
+
+fake_course_id = 'fake_course_id'
+fake_partner_id = 1
+
+
+def fake_export_request(id, status='SUCCESSFUL', **kwargs):
+    kwargs.setdefault('course_id', fake_course_id)
+    return ExportRequestWithMetadata(id=id, status=status, **kwargs)
+
+
+class TestJobIndex:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.job_index = JobIndex(os.path.join(self.folder, 'jobs.sqlite'))
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_upsert_and_get(self):
+        self.job_index.upsert([fake_export_request('1', status='PENDING')])
+        self.job_index.upsert([fake_export_request('1')])
+
+        assert self.job_index.get('1') == fake_export_request('1')
+        assert self.job_index.get('2') is None
+
+    def test_query_filters(self):
+        self.job_index.upsert([
+            fake_export_request('1', export_type=EXPORT_TYPE_TABLES),
+            fake_export_request('2', export_type=EXPORT_TYPE_CLICKSTREAM),
+            fake_export_request('3', course_id=None,
+                                partner_id=fake_partner_id,
+                                export_type=EXPORT_TYPE_TABLES)])
+
+        tables = self.job_index.query(export_type=EXPORT_TYPE_TABLES)
+        partner = self.job_index.query(scope_id=fake_partner_id)
+
+        assert sorted(job.id for job in tables) == ['1', '3']
+        assert [job.id for job in partner] == ['3']
+
+    def test_refresh_reads_whole_stream(self):
+        self.job_index.upsert([fake_export_request(str(i))
+                               for i in range(10)] +
+                              [fake_export_request('20', status='PENDING'),
+                               fake_export_request('21', status='PENDING')])
+
+        # a listing in no particular order: new and updated jobs come after
+        # many jobs indexed as finished
+        stale_ids = self.job_index.refresh(
+            [fake_export_request(str(i)) for i in range(10)] +
+            [fake_export_request('15'),
+             fake_export_request('20', status='SUCCESSFUL')],
+            page_size=3)
+
+        assert self.job_index.get('15') is not None
+        assert self.job_index.get('20').status == 'SUCCESSFUL'
+        assert stale_ids == ['21']
+
+    def test_freshness(self):
+        self.job_index.upsert([fake_export_request('1', status='PENDING'),
+                               fake_export_request('2')],
+                              etags={'1': '"v1"'})
+        pending, fetched_at, etag = self.job_index.get_cached('1')
+        done, done_fetched_at, _ = self.job_index.get_cached('2')
+
+        assert etag == '"v1"'
+        assert self.job_index.is_fresh(pending, fetched_at)
+        assert not self.job_index.is_fresh(pending, fetched_at, max_age=0)
+        assert self.job_index.is_fresh(done, done_fetched_at - 10 ** 9)
+        assert self.job_index.get_cached('3') == (None, None, None)
+
+    def test_adds_cache_columns_to_old_index(self):
+        filename = os.path.join(self.folder, 'old.sqlite')
+        connection = sqlite3.connect(filename)
+        connection.execute(
+            'CREATE TABLE jobs (id TEXT PRIMARY KEY, scope_context TEXT, '
+            'scope_id TEXT, status TEXT, export_type TEXT, '
+            'created_at INTEGER, json TEXT)')
+        connection.close()
+
+        job_index = JobIndex(filename)
+        job_index.upsert([fake_export_request('1')], etags={'1': '"v1"'})
+
+        assert job_index.get_cached('1')[2] == '"v1"'
@@ -15,12 +15,17 @@
 # limitations under the License.
 
 from courseraresearchexports.commands import jobs
+from courseraresearchexports.constants.api_constants import \
+    CLICKSTREAM_SHARD_RETRIES
 from courseraresearchexports.models.ExportRequest import ExportRequest
 from courseraresearchexports.models.ExportRequestWithMetadata import \
     ExportRequestWithMetadata
 from mock import MagicMock
 from mock import patch
+from nose.tools import raises
 import argparse
+from datetime import datetime
+from datetime import timedelta
 
 
 fake_course_id = 'fake_course_id'
@@ -71,3 +76,110 @@ def test_request(api_post):
 
     export_request, = api_post.call_args[0]
     assert export_request.course_id == fake_course_id
+
+
+@patch('courseraresearchexports.commands.jobs.tabulate')
+@patch('courseraresearchexports.models.utils.lookup_course_slug_by_id')
+@patch('courseraresearchexports.models.utils.lookup_course_slugs_by_ids')
+@patch('courseraresearchexports.commands.jobs.concurrent_api.api.get')
+def test_get_many(api_get, lookup_course_slugs_by_ids,
+                  lookup_course_slug_by_id, tabulate):
+    lookup_course_slug_by_id.return_value = fake_course_slug
+    api_get.side_effect = lambda export_job_id, max_age=None: [
+        ExportRequestWithMetadata(course_id=fake_course_id, id=export_job_id,
+                                  created_at=datetime(2016, 9, 1))
+    ]
+    args = argparse.Namespace()
+    args.id = ['1', '2', '3']
+
+    jobs.get(args)
+
+    assert sorted(call[0][0] for call in api_get.call_args_list) == \
+        args.id
+    lookup_course_slugs_by_ids.assert_called_once_with([fake_course_id] * 3)
+    # a fetch that raised would be missing from the printed rows
+    table = tabulate.call_args[0][0]
+    assert sorted(row[1] for row in table[1:]) == args.id
+
+
+@raises(RuntimeError)
+@patch('courseraresearchexports.commands.jobs.concurrent_api.api.get')
+def test_get_many_fails_if_any_fetch_fails(api_get):
+    def get(export_job_id, max_age=None):
+        raise ValueError('No export request {}'.format(export_job_id))
+    api_get.side_effect = get
+    args = argparse.Namespace()
+    args.id = ['1', '2']
+
+    jobs.get(args)
+
+
+@patch('courseraresearchexports.commands.jobs.api.post')
+@patch('courseraresearchexports.commands.jobs.api.find_existing')
+def test_request_reuses_existing(api_find_existing, api_post):
+    api_find_existing.return_value = ExportRequestWithMetadata(
+        course_id=fake_course_id, id='existing_id', status='SUCCESSFUL')
+    args = argparse.Namespace(
+        course_id=fake_course_id, course_slug=None, partner_id=None,
+        partner_short_name=None, group_id=None, user_id_hashing=None,
+        purpose=None, schemas=None, reuse_existing=timedelta(days=7))
+
+    jobs.request_tables(args)
+
+    assert api_find_existing.call_args[0][1] == timedelta(days=7)
+    assert not api_post.called
+
+
+def test_parse_max_age():
+    assert jobs.parse_max_age('36h') == timedelta(hours=36)
+    assert jobs.parse_max_age('7d') == timedelta(days=7)
+    assert jobs.parse_max_age('2') == timedelta(days=2)
+
+
+@patch('courseraresearchexports.exports.shards.concurrent_api.api.post')
+def test_request_split_schemas(api_post):
+    api_post.side_effect = lambda export_request: [ExportRequestWithMetadata(
+        course_id=fake_course_id, id=export_request.schema_names[0])]
+    args = argparse.Namespace(
+        course_id=fake_course_id, course_slug=None, partner_id=None,
+        partner_short_name=None, group_id=None, user_id_hashing=None,
+        purpose=None, schemas=['demographics', 'users'], split_schemas=True,
+        schema_groups=None, reuse_existing=None)
+
+    jobs.request_tables(args)
+
+    assert sorted(call[0][0].schema_names[0]
+                  for call in api_post.call_args_list) == \
+        ['demographics', 'users']
+
+
+@raises(ValueError)
+@patch('courseraresearchexports.commands.jobs.api.post')
+def test_request_clickstream_wait_requires_shard_by(api_post):
+    args = argparse.Namespace(
+        course_id=fake_course_id, course_slug=None, partner_id=None,
+        partner_short_name=None, group_id=None, purpose=None,
+        interval=['2016-09-01', '2016-09-02'], ignore_existing=False,
+        shard_by=None, wait=True, dest=None, parallel=None, retries=None)
+
+    try:
+        jobs.request_clickstream(args)
+    finally:
+        assert not api_post.called
+
+
+@raises(ValueError)
+@patch('courseraresearchexports.commands.jobs.api.post')
+def test_request_clickstream_retries_require_shard_by(api_post):
+    # rejected even when equal to the default number of retries
+    args = argparse.Namespace(
+        course_id=fake_course_id, course_slug=None, partner_id=None,
+        partner_short_name=None, group_id=None, purpose=None,
+        interval=['2016-09-01', '2016-09-02'], ignore_existing=False,
+        shard_by=None, wait=False, dest=None, parallel=None,
+        retries=CLICKSTREAM_SHARD_RETRIES)
+
+    try:
+        jobs.request_clickstream(args)
+    finally:
+        assert not api_post.called
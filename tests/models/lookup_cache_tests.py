@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.LookupCache import LookupCache
+from mock import Mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+class TestLookupCache:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'lookups.json')
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def test_persists_between_instances(self):
+        lookup = Mock(return_value='fake_slug')
+
+        LookupCache(self.filename).get('slug_by_id', 'id', lookup)
+        value = LookupCache(self.filename).get('slug_by_id', 'id', lookup)
+
+        assert value == 'fake_slug'
+        assert lookup.call_count == 1
+
+    def test_expired_entries_are_looked_up_again(self):
+        lookup = Mock(side_effect=['old_slug', 'new_slug'])
+        LookupCache(self.filename).get('slug_by_id', 'id', lookup)
+
+        value = LookupCache(self.filename, max_age=0).get(
+            'slug_by_id', 'id', lookup)
+
+        assert value == 'new_slug'
+        assert lookup.call_count == 2
+
+    def test_concurrent_lookups_are_coalesced(self):
+        cache = LookupCache(filename=None)
+        calls = []
+
+        def slow_lookup(key):
+            calls.append(key)
+            time.sleep(0.1)
+            return 'fake_slug'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get('slug_by_id', 'id', slow_lookup))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ['id']
+        assert results == ['fake_slug'] * 5
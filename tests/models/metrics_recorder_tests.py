@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.MetricsRecorder import MetricsRecorder
+from nose.tools import raises
+import json
+import os
+import shutil
+import tempfile
+
+
+class TestMetricsRecorder:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'metrics.jsonl')
+        self.recorder = MetricsRecorder(filename=self.filename)
+
+    def teardown(self):
+        self.recorder.close()
+        shutil.rmtree(self.folder)
+
+    def events(self):
+        with open(self.filename, 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_emit_writes_json_lines(self):
+        self.recorder.emit('api_call', status=200)
+        self.recorder.emit('api_call', status=429)
+
+        events = self.events()
+        assert [event['status'] for event in events] == [200, 429]
+        assert all(event['event'] == 'api_call' for event in events)
+
+    def test_timed_records_duration_and_rates(self):
+        with self.recorder.timed('download', rates=['bytes'],
+                                 filename='export.zip') as metrics:
+            metrics['bytes'] = 1024
+
+        event = self.events()[0]
+        assert event['filename'] == 'export.zip'
+        assert event['seconds'] >= 0
+        assert 'error' not in event
+        if event['seconds'] > 0:
+            assert event['bytes_per_second'] == 1024 / event['seconds']
+
+    @raises(IOError)
+    def test_timed_records_errors(self):
+        try:
+            with self.recorder.timed('extract'):
+                raise IOError('truncated archive')
+        finally:
+            assert self.events()[0]['error'] == 'IOError'
+
+
+def test_disabled_recorder_discards_events():
+    recorder = MetricsRecorder()
+
+    recorder.emit('api_call', status=200)
+    with recorder.timed('unload'):
+        pass
+
+    assert not recorder.enabled
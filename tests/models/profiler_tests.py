@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.Profiler import Profiler
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+
+def busy(seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        pass
+    return seconds
+
+
+def outer():
+    return busy(0.05)
+
+
+class TestProfiler:
+
+    def setup(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'command.prof')
+
+    def teardown(self):
+        shutil.rmtree(self.folder)
+
+    def collapsed(self):
+        with open(self.filename + '.collapsed', 'r') as f:
+            return [line.rsplit(' ', 1)[0] for line in f]
+
+    def test_writes_stats_and_collapsed_stacks(self):
+        assert Profiler(self.filename).run(outer) == 0.05
+
+        stats = pstats.Stats(self.filename)
+        assert any(func[2] == 'busy' for func in stats.stats)
+        assert any(stack.startswith('outer') and 'busy' in stack
+                   for stack in self.collapsed())
+
+    def test_samples_stacks(self):
+        Profiler(self.filename, sample_interval=0.001).run(outer)
+
+        assert any(stack.startswith('MainThread;') and
+                   stack.split(';')[-1].startswith('busy (profiler_tests.py')
+                   for stack in self.collapsed())
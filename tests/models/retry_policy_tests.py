@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.AdaptiveConcurrency import \
+    AdaptiveConcurrency
+from courseraresearchexports.models.RetryPolicy import RetryPolicy
+from mock import Mock
+
+
+def fake_response(status_code, method='GET', headers=None):
+    response = Mock(status_code=status_code, headers=headers or {})
+    response.request.method = method
+    return response
+
+
+def test_retries_throttling_and_server_errors():
+    retry_policy = RetryPolicy(max_retries=2, backoff=1, max_delay=10)
+
+    assert 0 <= retry_policy.retry_delay(fake_response(429), 0) <= 1
+    assert 0 <= retry_policy.retry_delay(fake_response(502), 1) <= 2
+    assert retry_policy.retry_delay(fake_response(502), 2) is None
+
+
+def test_does_not_retry_client_errors():
+    retry_policy = RetryPolicy()
+
+    for status_code in [200, 400, 401, 403, 404]:
+        assert retry_policy.retry_delay(fake_response(status_code), 0) is None
+
+
+def test_post_is_only_retried_when_not_processed():
+    retry_policy = RetryPolicy()
+
+    assert retry_policy.retry_delay(fake_response(500, 'POST'), 0) is None
+    assert retry_policy.retry_delay(fake_response(503, 'POST'), 0) is not None
+
+
+def test_respects_retry_after():
+    retry_policy = RetryPolicy(max_delay=30)
+
+    assert retry_policy.retry_delay(
+        fake_response(429, headers={'Retry-After': '7'}), 0) == 7
+    assert retry_policy.retry_delay(
+        fake_response(429, headers={'Retry-After': '3600'}), 0) is None
+
+
+def test_adaptive_concurrency_halves_once_per_generation():
+    concurrency = AdaptiveConcurrency(max_limit=8)
+    generations = [concurrency.acquire() for _ in range(4)]
+
+    for generation in generations:
+        concurrency.release(generation, throttled=True)
+    halved = concurrency.limit
+    for _ in range(8):
+        concurrency.release(concurrency.acquire())
+
+    assert halved == 4
+    assert 4 < concurrency.limit <= 8
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Coursera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from courseraresearchexports.models.TokenBucket import TokenBucket
+import time
+
+
+def test_token_bucket_allows_burst_then_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    started_at = time.time()
+    bucket.acquire()
+    bucket.acquire()
+    burst_seconds = time.time() - started_at
+    bucket.acquire()
+    bucket.acquire()
+    total_seconds = time.time() - started_at
+
+    assert burst_seconds < 0.04
+    assert total_seconds >= 0.09
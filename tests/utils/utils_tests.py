@@ -15,8 +15,12 @@
 # limitations under the License.
 
 from courseraresearchexports.models import utils
+from courseraresearchexports.models.ExportRequest import ExportRequest
+from courseraresearchexports.models.LookupCache import LookupCache
+from courseraresearchexports.models.RetryPolicy import RetryPolicy
 from mock import Mock
 from mock import patch
+from nose.tools import raises
 import requests
 
 fake_partner_short_name = 'fake_partner_short_name'
@@ -24,7 +28,11 @@ fake_partner_id = 1
 fake_partner_response = {'elements': [{"id": str(fake_partner_id)}]}
 
 
-@patch.object(requests, 'get')
+def setup():
+    LookupCache.configure(filename=None)
+
+
+@patch.object(requests.Session, 'get')
 def test_partner_id_lookup(mockget):
     mock_partners_get_response = Mock()
     mock_partners_get_response.json.return_value = fake_partner_response
@@ -33,3 +41,67 @@ def test_partner_id_lookup(mockget):
         fake_partner_short_name)
 
     assert inferred_partner_id == fake_partner_id
+
+
+@patch.object(requests.Session, 'get')
+def test_lookups_are_cached(mockget):
+    mock_partners_get_response = Mock()
+    mock_partners_get_response.json.return_value = fake_partner_response
+    mockget.return_value = mock_partners_get_response
+    LookupCache.configure(filename=None)
+
+    utils.lookup_partner_id_by_short_name(fake_partner_short_name)
+    utils.lookup_partner_id_by_short_name(fake_partner_short_name)
+
+    assert mockget.call_count == 1
+
+
+@patch.object(requests.Session, 'get')
+def test_resolve_scope_names_batches_lookups(mockget):
+    mock_courses_get_response = Mock()
+    mock_courses_get_response.json.return_value = {'elements': [
+        {'id': 'course_{}'.format(i), 'slug': 'slug_{}'.format(i)}
+        for i in range(3)]}
+    mockget.return_value = mock_courses_get_response
+    LookupCache.configure(filename=None)
+    export_requests = [ExportRequest(course_id='course_{}'.format(i % 3))
+                       for i in range(10)]
+
+    utils.resolve_scope_names(export_requests)
+
+    assert [export_request.scope_name
+            for export_request in export_requests[:3]] == \
+        ['slug_0', 'slug_1', 'slug_2']
+    assert mockget.call_count == 1
+    assert mockget.call_args[1]['params']['ids'] == \
+        'course_0,course_1,course_2'
+
+
+@patch('courseraresearchexports.models.utils.time.sleep')
+def test_transient_errors_are_retried(sleep):
+    throttled = Mock(status_code=429, headers={'Retry-After': '2'})
+    throttled.request.method = 'GET'
+    ok = Mock(status_code=200)
+    original_func = Mock(side_effect=[throttled, ok])
+    RetryPolicy.configure()
+
+    response = utils.requests_response_to_model(lambda r: r)(original_func)()
+
+    assert response is ok
+    sleep.assert_called_once_with(2)
+
+
+@raises(requests.exceptions.HTTPError)
+@patch('courseraresearchexports.models.utils.time.sleep')
+def test_auth_errors_are_not_retried(sleep):
+    forbidden = Mock(status_code=403)
+    forbidden.request.method = 'GET'
+    forbidden.raise_for_status.side_effect = requests.exceptions.HTTPError()
+    original_func = Mock(return_value=forbidden)
+    RetryPolicy.configure()
+
+    try:
+        utils.requests_response_to_model(lambda r: r)(original_func)()
+    finally:
+        assert original_func.call_count == 1
+        assert not sleep.called